@@ -0,0 +1,249 @@
+"""
+Headless rendering benchmark for every scene.
+
+Runs each scene through its states with the SDL dummy video driver, timing event handling,
+update and draw per frame, and writes the percentiles as JSON:
+
+    python benchmark.py --output results.json
+    python benchmark.py --baseline results.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+import config
+import constants as const
+
+PHASES = ('event', 'update', 'draw')
+PERCENTILES = (50, 90, 99)
+STATES = ('READY', 'PLAYING', 'PAUSED', 'FINISHED')
+
+# the percentiles compared against a baseline
+COMPARED_STATS = ('p50', 'p90')
+
+# a small absolute allowance so sub-microsecond noise isn't reported as a regression
+MIN_REGRESSION_MS = 0.05
+
+
+def _fretboard_click(frame):
+    """Cycle through clicks across the fretboard"""
+    x = config.FRETBOARD_X_MARGIN + (frame * 37) % (config.SCREEN_WIDTH - 2 * config.FRETBOARD_X_MARGIN)
+    y = config.SCREEN_HEIGHT / 2 - 3 * config.STRING_SPACING + (frame * 7) % (6 * config.STRING_SPACING)
+    return pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=(int(x), int(y)), button=1)
+
+
+def _note_key(frame):
+    return pygame.event.Event(pygame.KEYDOWN, key=ord('cdefgab'[frame % 7]))
+
+
+def _mouse_motion(frame):
+    return pygame.event.Event(pygame.MOUSEMOTION, pos=(frame % config.SCREEN_WIDTH, 5), rel=(1, 0), buttons=(0, 0, 0))
+
+
+def _scene_factories():
+    from scenes import MenuScene
+    from games.notes import NameTheNote, FindAllNotes
+    from games.scales import FindScaleDegrees
+    from games.chords import FindTheChord
+
+    return [
+        ('MenuScene', lambda: MenuScene(), _mouse_motion, ('MENU',)),
+        ('NameTheNote', lambda: NameTheNote({'tuning': const.GUITAR_STANDARD_TUNING}), _note_key, STATES),
+        ('FindAllNotes', lambda: FindAllNotes({'tuning': const.GUITAR_STANDARD_TUNING}), _fretboard_click, STATES),
+        # the largest board, 8 strings and 24 frets
+        ('FindAllNotes 8x24', lambda: FindAllNotes({'instrument': 'guitar_8', 'frets': 25}), _fretboard_click, STATES),
+        ('FindScaleDegrees', lambda: FindScaleDegrees({
+            'tuning': const.GUITAR_STANDARD_TUNING,
+            'key': 'C',
+            'scale': 'major',
+            'shape': 'E',
+        }), _fretboard_click, STATES),
+        ('FindTheChord', lambda: FindTheChord({'tuning': const.GUITAR_STANDARD_TUNING}), _fretboard_click, STATES),
+    ]
+
+
+def _enter_state(scene, state):
+    if state in ('PLAYING', 'PAUSED', 'FINISHED'):
+        scene.start()
+
+    if state == 'PAUSED':
+        scene.pause()
+    elif state == 'FINISHED':
+        scene.quit()
+
+
+def percentiles(samples):
+    """Summarise a list of durations in seconds as milliseconds"""
+    ordered = sorted(samples)
+    summary = {}
+
+    for percentile in PERCENTILES:
+        index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+        summary['p{}'.format(percentile)] = ordered[index] * 1000
+
+    summary['mean'] = sum(ordered) / len(ordered) * 1000
+    summary['max'] = ordered[-1] * 1000
+    return summary
+
+
+def run_state(screen, factory, make_event, state, frames, warmup):
+    random.seed(0)
+
+    scene = factory()
+    _enter_state(scene, state)
+
+    timings = {phase: [] for phase in PHASES}
+
+    # elements only know where they are once drawn
+    scene.draw(screen)
+
+    try:
+        for frame in range(warmup + frames):
+            event = make_event(frame)
+
+            start = time.perf_counter()
+            new_scene = scene.handle_event(event)
+            handled = time.perf_counter()
+            scene.update()
+            updated = time.perf_counter()
+            scene.draw(screen)
+            drawn = time.perf_counter()
+
+            if new_scene is not None and new_scene is not scene:
+                raise RuntimeError('benchmark event switched scene in state {}'.format(state))
+
+            if frame >= warmup:
+                timings['event'].append(handled - start)
+                timings['update'].append(updated - handled)
+                timings['draw'].append(drawn - updated)
+    finally:
+        scene.cleanup()
+
+    return {phase: percentiles(samples) for phase, samples in timings.items()}
+
+
+def run(frames, warmup):
+    # don't log benchmark input as practice history, or use the voicing cache in the user's home, so
+    # that runs leave no files behind and every run searches the voicings from scratch
+    config.HISTORY_PATH = None
+    config.VOICING_CACHE_DIR = None
+
+    pygame.init()
+    screen = pygame.display.set_mode((config.SCREEN_WIDTH, config.SCREEN_HEIGHT))
+
+    results = {}
+
+    for name, factory, make_event, states in _scene_factories():
+        results[name] = {}
+
+        for state in states:
+            try:
+                results[name][state] = run_state(screen, factory, make_event, state, frames, warmup)
+            except NotImplementedError:
+                results[name][state] = {'skipped': 'not implemented by the scene'}
+
+    pygame.quit()
+
+    return {
+        'meta': {
+            'frames': frames,
+            'warmup': warmup,
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+            'timestamp': time.time(),
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    Compare two benchmark reports
+    :return: a list of regressions, each describing a statistic that got more than `threshold` slower
+    """
+    regressions = []
+
+    for scene, states in current['results'].items():
+        for state, phases in states.items():
+            base_phases = baseline['results'].get(scene, {}).get(state)
+
+            if not base_phases or 'skipped' in phases or 'skipped' in base_phases:
+                continue
+
+            for phase, stats in phases.items():
+                for stat in COMPARED_STATS:
+                    old = base_phases[phase][stat]
+                    new = stats[stat]
+
+                    if new > old * (1 + threshold) and new - old > MIN_REGRESSION_MS:
+                        regressions.append({
+                            'scene': scene,
+                            'state': state,
+                            'phase': phase,
+                            'stat': stat,
+                            'baseline_ms': old,
+                            'current_ms': new,
+                            'change': new / old - 1 if old else None,
+                        })
+
+    return regressions
+
+
+def print_report(report):
+    for scene, states in report['results'].items():
+        for state, phases in states.items():
+            if 'skipped' in phases:
+                print('{:<18} {:<9} skipped ({})'.format(scene, state, phases['skipped']))
+                continue
+
+            print('{:<18} {:<9} '.format(scene, state) + '  '.join(
+                '{} p50 {:.3f}ms p99 {:.3f}ms'.format(phase, phases[phase]['p50'], phases[phase]['p99'])
+                for phase in PHASES
+            ))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=300, help='measured frames per scene state')
+    parser.add_argument('--warmup', type=int, default=30, help='unmeasured frames per scene state')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='compare against a previously written results file')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='fractional slowdown of p50/p90 reported as a regression')
+    args = parser.parse_args(argv)
+
+    report = run(args.frames, args.warmup)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        regressions = compare(report, baseline, args.threshold)
+
+        for regression in regressions:
+            print('REGRESSION {scene} {state} {phase} {stat}: {baseline_ms:.3f}ms -> {current_ms:.3f}ms'.format(
+                **regression))
+
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,16 +1,97 @@
+import os
+
 import pygame
 
 # ----------
 # dimensions
 
+# scenes are laid out at this size and scaled to the window, which opens at this size
 SCREEN_WIDTH = 640
 SCREEN_HEIGHT = 480
 
-# fretboard dimensions
+# let the window be resized, relaying scenes out at the new size rather than stretching a 640x480 image
+RESIZABLE = True
+
+# fretboard dimensions, the frets are spread across whatever fits between the margins
 FRET_WIDTH = 50
 STRING_SPACING = 20
 FRETBOARD_X_MARGIN = 50
-FRET_SPACING = (SCREEN_WIDTH - 2 * FRETBOARD_X_MARGIN) / 12
+
+# space the frets as on a real neck, narrowing towards the body, rather than evenly
+TEMPERED_FRETS = True
+
+# ----------
+# instrument
+
+# the instruments.INSTRUMENTS entry the games are played on, and the positions shown on each string
+# counting the open string, up to 25 for a 24 fret neck; None for the instrument's own
+INSTRUMENT = 'guitar'
+FRETS = None
+
+# ----------
+# rendering
+
+# only push the regions each scene reports as changed to the display,
+# rather than flipping the whole screen every frame
+DIRTY_RECTS = True
+
+# frame rate while something is animating, and how often an idle screen
+# wakes up when there's no input (0 to sleep until the next event)
+ACTIVE_FPS = 60
+IDLE_FPS = 4
+
+# handle input as soon as it arrives rather than at the next frame, queue only the events the
+# games use, and time responses from when each question reached the screen
+LOW_LATENCY = False
+
+# number of rendered text surfaces kept by ui.text_cache
+TEXT_CACHE_SIZE = 256
+
+# ----------
+# profiling
+
+# toggles the frame profiler overlay
+PROFILER_OVERLAY_KEY = pygame.K_F3
+
+# number of recent frames the profiler keeps
+PROFILER_WINDOW = 600
+
+# if set, the frame profile is written to this file as JSON on exit
+PROFILER_DUMP_PATH = None
+
+# if set, the session's input is recorded to this file on exit, for recording.py to replay
+RECORDING_PATH = None
+
+# ----------
+# practice history
+
+# SQLite file every attempt is logged to, None to disable
+HISTORY_PATH = os.path.join(os.path.expanduser('~'), '.fretboard-trainer', 'history.sqlite3')
+
+# ----------
+# chord voicings
+
+# directory the chord voicings of each tuning are cached in once searched for, None to disable
+VOICING_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.fretboard-trainer', 'cache')
+
+# ----------
+# audio input
+
+# where NameTheNote's guitar input mode listens: 'microphone', 'synthetic' (a test tone)
+# or the path of a WAV file
+AUDIO_INPUT = 'microphone'
+AUDIO_SAMPLE_RATE = 44100
+
+# play the pitch of positions as they're shown or clicked, and how many synthesised notes to keep
+NOTE_PLAYBACK = True
+SAMPLE_CACHE_SIZE = 128
+
+# a small mixer buffer keeps the delay between input and sound low
+MIXER_BUFFER = 256
+
+# samples analysed per pitch estimate, and how many new samples trigger the next estimate
+PITCH_WINDOW = 1024
+PITCH_HOP = 256
 
 # ----------
 # Colours
@@ -23,19 +104,64 @@ COLOUR_BACKGROUND = (255, 255, 255)
 # ----------
 # fonts
 
-FONTS = {
+# fonts are found relative to the package rather than the working directory
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class FontRegistry:
+    """
+    Maps font names to (path, size) and loads each pygame font on first use, so nothing is loaded at
+    startup that isn't drawn. Fonts are shared between names with the same path and size. Sizes are
+    for the design layout and are scaled with the window.
+    """
+
+    def __init__(self, specs):
+        self._specs = specs
+        self._scale = 1
+        self._fonts = {}
+        self._loaded = {}
+
+    def set_scale(self, scale):
+        """Scale every font's size, for a window bigger or smaller than the layout's design size"""
+        if scale != self._scale:
+            self._scale = scale
+            # fonts loaded at other scales are kept, for when the window goes back to that size
+            self._fonts = {}
+
+    def __getitem__(self, name):
+        try:
+            return self._fonts[name]
+        except KeyError:
+            pass
+
+        path, size = self._specs[name]
+        key = (os.path.join(PACKAGE_DIR, path), max(1, round(size * self._scale)))
+
+        if key not in self._loaded:
+            # pygame.init() must have been called by now
+            self._loaded[key] = pygame.font.Font(*key)
+
+        font = self._fonts[name] = self._loaded[key]
+        return font
+
+    def __contains__(self, name):
+        return name in self._specs
+
+    def clear(self):
+        """Forget every loaded font, they can't be used after pygame.quit()"""
+        self._fonts = {}
+        self._loaded = {}
+
+
+FONTS = FontRegistry({
     'heading': ('fonts/Amatic-Bold.ttf', 72),
     'heading2': ('fonts/Amatic-Bold.ttf', 50),
     'button': ('fonts/Amatic-Bold.ttf', 32),
     'default': ('fonts/Amatic-Bold.ttf', 25),
-
-}
+})
 
 # ----------
+# startup
 
-def init_fonts():
-    """
-    initialise fonts - this must be called after pygame.init()
-    """
-    for key, args in FONTS.items():
-        FONTS[key] = pygame.font.Font(*args)
+# print how long each startup step took once the first frame is on screen, when measuring startup
+STARTUP_REPORT = False
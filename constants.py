@@ -5,22 +5,61 @@ WHOLE_NOTES = ['C', 'D', 'E', 'F', 'G', 'A', 'B']
 INTERVALS = ['R', 'min 2nd', '2nd', 'min 3rd', '3rd', '4th', 'tritone',
              '5th', 'min 6th', 'maj 6th', 'min 7th', 'maj 7th']
 
-GUITAR_DOTS = [
-    [2, 2],
-    [4, 2],
-    [6, 2],
-    [8, 2],
-    [11, 1],
-    [11, 3]
-]
+# frets marked with an inlay dot, and those marked with two
+INLAY_FRETS = (3, 5, 7, 9, 15, 17, 19, 21)
+DOUBLE_INLAY_FRETS = (12, 24)
 
+# tunings list the open strings highest string first
 GUITAR_STANDARD_TUNING = ['E', 'B', 'G', 'D', 'A', 'E']
+GUITAR_DROP_D_TUNING = ['E', 'B', 'G', 'D', 'A', 'D']
+GUITAR_DADGAD_TUNING = ['D', 'A', 'G', 'D', 'A', 'D']
+GUITAR_OPEN_G_TUNING = ['D', 'B', 'G', 'D', 'G', 'D']
+GUITAR_7_STRING_TUNING = ['E', 'B', 'G', 'D', 'A', 'E', 'B']
+GUITAR_8_STRING_TUNING = ['E', 'B', 'G', 'D', 'A', 'E', 'B', 'F#']
+BASS_STANDARD_TUNING = ['G', 'D', 'A', 'E']
+BASS_5_STRING_TUNING = ['G', 'D', 'A', 'E', 'B']
+
+# semitones above the root of each note of a scale
+SCALES = {
+    'major': (0, 2, 4, 5, 7, 9, 11),
+    'dorian': (0, 2, 3, 5, 7, 9, 10),
+    'phrygian': (0, 1, 3, 5, 7, 8, 10),
+    'lydian': (0, 2, 4, 6, 7, 9, 11),
+    'mixolydian': (0, 2, 4, 5, 7, 9, 10),
+    'minor': (0, 2, 3, 5, 7, 8, 10),
+    'locrian': (0, 1, 3, 5, 6, 8, 10),
+    'harmonic minor': (0, 2, 3, 5, 7, 8, 11),
+    'melodic minor': (0, 2, 3, 5, 7, 9, 11),
+    'major pentatonic': (0, 2, 4, 7, 9),
+    'minor pentatonic': (0, 3, 5, 7, 10),
+}
 
-C_SHAPE_MAJOR = [
-    [0, 1, 3],
-    [1, 3],
-    [0, 2, 3],
-    [0, 2, 3],
-    [0, 1, 3],
-    [1, 3],
+# chord qualities: the symbol written after the root, and semitones above the root of each note
+CHORDS = {
+    'major': ('', (0, 4, 7)),
+    'minor': ('m', (0, 3, 7)),
+    'diminished': ('dim', (0, 3, 6)),
+    'augmented': ('aug', (0, 4, 8)),
+    'sus2': ('sus2', (0, 2, 7)),
+    'sus4': ('sus4', (0, 5, 7)),
+    'dominant 7th': ('7', (0, 4, 7, 10)),
+    'major 7th': ('maj7', (0, 4, 7, 11)),
+    'minor 7th': ('m7', (0, 3, 7, 10)),
+    'half diminished': ('m7b5', (0, 3, 6, 10)),
+    'diminished 7th': ('dim7', (0, 3, 6, 9)),
+    'major 6th': ('6', (0, 4, 7, 9)),
+    'minor 6th': ('m6', (0, 3, 7, 9)),
+}
+
+# the CAGED shapes in the order they climb the neck: name, the string the root is played on counted
+# up from a guitar's low E string, and the shape's first fret relative to that root
+CAGED_SHAPES = [
+    ('C', 1, -3),
+    ('A', 1, -1),
+    ('G', 0, -3),
+    ('E', 0, -1),
+    ('D', 2, 0),
 ]
+
+# frets spanned by each CAGED shape
+CAGED_SHAPE_FRETS = 4
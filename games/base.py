@@ -1,13 +1,71 @@
-from ui import Button
+from ui import Button, ElementIndex, layout, render_text
 from timer import GameTimer
 import pygame
 
 import config
+import synth
+import timer
+
+
+def key_char(key_pressed):
+    """Return the upper-cased character for a key code, or '' for keys like shift or the arrows."""
+    if 0 <= key_pressed < 0x110000:
+        return chr(key_pressed).upper()
+    return ''
 
 
 class Scene:
     def __init__(self):
-        pass
+        self._active_elements = []
+        self._element_index = ElementIndex()
+        self._dirty_rects = []
+        self._full_redraw = True
+
+        self.hovered_element = None
+        self.dragging = False
+
+    def element_at(self, x, y):
+        """Return the active element under a screen position, if any"""
+        self._element_index.sync(self._active_elements)
+        return self._element_index.element_at(x, y)
+
+    def track_pointer(self, event):
+        """On MOUSEMOTION, keep the hovered element current and note whether the left button is held"""
+        self.hovered_element = self.element_at(*event.pos)
+        self.dragging = bool(event.buttons[0])
+
+    def invalidate(self, rect=None):
+        """Mark a region of the screen as changed, or the whole screen when no rect is given"""
+        if rect is None:
+            self._full_redraw = True
+        else:
+            self._dirty_rects.append(pygame.Rect(rect))
+
+    def needs_redraw(self):
+        """Whether something was invalidated after the last frame was drawn, such as by update()"""
+        return self._full_redraw or bool(self._dirty_rects)
+
+    def get_dirty_rects(self):
+        """
+        Collect the regions changed since the last call
+        :return: a list of rects, or None when the whole screen needs repainting
+        """
+        if self._full_redraw:
+            self._full_redraw = False
+            self._dirty_rects = []
+            for elem in self._active_elements:
+                elem.pop_dirty_rect()
+            return None
+
+        rects = self._dirty_rects
+        self._dirty_rects = []
+
+        for elem in self._active_elements:
+            rect = elem.pop_dirty_rect()
+            if rect is not None:
+                rects.append(rect)
+
+        return rects
 
     def render(self, screen):
         raise NotImplementedError
@@ -15,6 +73,25 @@ class Scene:
     def update(self):
         raise NotImplementedError
 
+    def activate(self):
+        """Called each time the scene becomes the current scene"""
+        self.invalidate()
+
+    def is_animating(self):
+        """Whether the scene has frame-driven work pending and needs the full frame rate"""
+        return False
+
+    def next_wakeup(self):
+        """Seconds until the scene needs redrawing without any input, or None if it can wait"""
+        return None
+
+    def presented(self, at):
+        """
+        Called with the game clock's time once the scene's last drawn frame is on screen
+        :return: whether that changed anything, such as when a response time is measured from
+        """
+        return False
+
     def handle_event(self, event):
         raise NotImplementedError
 
@@ -33,7 +110,8 @@ class GameBase(Scene):
 
         self._timer = GameTimer()
 
-        self._active_elements = []
+        self._time_text = None
+        self._time_rect = None
 
         self._start_button = Button(
             'start_button', 'Start Game!', Button.CENTRE, 400)
@@ -44,33 +122,108 @@ class GameBase(Scene):
         self._resume_button = Button(
             'resume_button', 'Resume!', Button.CENTRE, 400)
 
+        self._menu_button = Button(
+            'main_menu', 'Return to main menu', Button.CENTRE, 400)
+
         self._active_elements = [
             self._start_button
         ]
 
+    def activate(self):
+        # a scene being reused starts a new game
+        if self.state != self.READY:
+            self.reset()
+
+        super().activate()
+
+    @property
+    def game_stats(self):
+        """The stats of the game in progress, or of the last one played"""
+        return self._model.game_stats
+
+    def reset(self):
+        """Return to the start screen for a new game, reusing the scene's widgets and model"""
+        self.cleanup()
+
+        self._game_data = {}
+        self.state = self.READY
+
+        # the timer is shared with the model, and restarts when the game starts
+        self._time_text = None
+        self._time_rect = None
+
+        self._active_elements = [
+            self._start_button
+        ]
+        self.invalidate()
+
     def clear_screen(self, screen):
-        if '_flash_background' in self._game_data:
-            self._game_data['_flash_background']['duration'] -= 1
-            screen.fill(self._game_data['_flash_background']['colour'])
+        flash = self._game_data.get('_flash_background')
 
-            if self._game_data['_flash_background']['duration'] == 0:
-                self._game_data.pop('_flash_background')
+        # a flash is shown for at least one frame, however late that frame is
+        if flash is not None and (not flash['shown'] or not self.delay_ended(flash['until'])):
+            flash['shown'] = True
+            screen.fill(flash['colour'])
+            self.invalidate()
         else:
             screen.fill(config.COLOUR_BACKGROUND)
 
+            if flash is not None:
+                # restore the background colour everywhere
+                self._game_data.pop('_flash_background')
+                self.invalidate()
+
+    def is_animating(self):
+        return '_flash_background' in self._game_data
+
+    def next_wakeup(self):
+        if self.state == self.PLAYING:
+            # the timer text changes on each whole second
+            return 1 - self._timer.duration % 1
+        return None
+
+    def prepare_notes(self, midi_notes):
+        """Have the notes the game may play synthesised in the background"""
+        samples = synth.get_sample_cache()
+        if samples is not None:
+            samples.prepare(midi_notes)
+
+    def play_note(self, midi_note):
+        samples = synth.get_sample_cache()
+        if samples is not None:
+            samples.play(midi_note)
+
+    def delay_end(self, frames):
+        """
+        When a delay of `frames` frames at config.ACTIVE_FPS will end. Delays are timed by the clock
+        rather than counted in frames, as low latency mode draws extra frames for input.
+        """
+        return timer.default_clock() + frames / config.ACTIVE_FPS
+
+    def delay_ended(self, end):
+        return timer.default_clock() >= end
+
     def flash_background(self, colour, duration):
+        """Fill the background with a colour for `duration` frames"""
         self._game_data['_flash_background'] = {
             'colour': colour,
-            'duration': duration
+            'until': self.delay_end(duration),
+            'shown': False,
         }
 
     def draw_header(self, screen):
-        text = config.FONTS['heading'].render(self.TITLE, True, config.COLOUR_DEFAULT)
-        screen.blit(text, (screen.get_width() / 2 - text.get_width() / 2, 10))
+        text = render_text(config.FONTS['heading'], self.TITLE)
+        screen.blit(text, (screen.get_width() / 2 - text.get_width() / 2, layout.y(10)))
 
     def draw_time(self, screen):
-        text = config.FONTS['default'].render(str(self._timer), True, config.COLOUR_DEFAULT)
-        screen.blit(text, (screen.get_width() - text.get_width() - 10, 10))
+        time_text = str(self._timer)
+        text = render_text(config.FONTS['default'], time_text)
+        rect = screen.blit(text, (screen.get_width() - text.get_width() - layout.x(10), layout.y(10)))
+
+        if time_text != self._time_text:
+            self.invalidate(rect.union(self._time_rect) if self._time_rect else rect)
+            self._time_text = time_text
+            self._time_rect = rect
 
     def draw(self, screen):
         self.clear_screen(screen)
@@ -95,6 +248,12 @@ class GameBase(Scene):
         elif self.state == self.FINISHED:
             self.draw_final_screen(screen)
 
+        self._timer.drawn()
+
+    def presented(self, at):
+        # response times run from when the question reached the screen
+        return self._timer.presented(at)
+
     def start(self):
         assert self.state == self.READY
 
@@ -104,6 +263,7 @@ class GameBase(Scene):
         self._active_elements = [
             self._pause_button
         ]
+        self.invalidate()
 
     def resume(self):
         assert self.state == self.PAUSED
@@ -115,6 +275,7 @@ class GameBase(Scene):
         self._active_elements = [
             self._pause_button
         ]
+        self.invalidate()
 
     def pause(self):
         assert self.state == self.PLAYING
@@ -126,6 +287,7 @@ class GameBase(Scene):
         self._active_elements = [
             self._resume_button
         ]
+        self.invalidate()
 
     def quit(self):
         self.state = self.FINISHED
@@ -133,13 +295,17 @@ class GameBase(Scene):
         self._timer.stop()
 
         self._active_elements = [
-            Button('main_menu', 'Return to main menu', Button.CENTRE, 400)
+            self._menu_button
         ]
+        self.invalidate()
 
     def handle_event(self, event):
         if event.type == pygame.QUIT:
             self.quit()
 
+        if event.type == pygame.MOUSEMOTION:
+            self.track_pointer(event)
+
         if event.type == pygame.MOUSEBUTTONDOWN:
             x, y = event.pos
             return self._handle_mouse_input(x, y)
@@ -151,21 +317,21 @@ class GameBase(Scene):
         pass
 
     def _handle_mouse_input(self, mouse_x, mouse_y):
-        for elem in self._active_elements:
-            if elem.is_clicked(mouse_x, mouse_y):
-                if elem.value == 'start_button':
-                    self.start()
-                    return
-                elif elem.value == 'resume_button':
-                    self.resume()
-                    return
-                elif elem.value == 'pause_button':
-                    self.pause()
-                    return
-                elif elem.value == 'main_menu':
-                    from scenes import MenuScene
-                    self.cleanup()
-                    return MenuScene()
+        elem = self.element_at(mouse_x, mouse_y)
+
+        if elem is not None:
+            if elem.value == 'start_button':
+                self.start()
+                return
+            elif elem.value == 'resume_button':
+                self.resume()
+                return
+            elif elem.value == 'pause_button':
+                self.pause()
+                return
+            elif elem.value == 'main_menu':
+                self.cleanup()
+                return 'menu'
 
         return self.handle_mouse_input(mouse_x, mouse_y)
 
@@ -173,7 +339,7 @@ class GameBase(Scene):
         raise NotImplementedError
 
     def handle_keyboard_input(self, key_pressed):
-        key = chr(key_pressed).upper()
+        key = key_char(key_pressed)
 
         if key == 'P':
             if self.state == self.PLAYING:
@@ -0,0 +1,308 @@
+import random
+import threading
+
+import pygame
+
+import config
+from instruments import get_instrument
+from pcset import PitchClassSet
+from timer import GameTimer
+from ui import Button, FretboardDisplay, layout, render_text
+from utils import compile_tuning
+from voicings import all_voicings, chord_name
+
+from .base import GameBase
+
+
+class FindTheChord(GameBase):
+    """This game names a chord and the player frets a voicing of it"""
+
+    TITLE = 'Find the chord'
+
+    def __init__(self, game_config, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        instrument = get_instrument(game_config)
+        self._fretboard = FretboardDisplay(instrument.frets, instrument.strings)
+        self._model = ChordData(game_config, frets=self._fretboard.fret_count, timer=self._timer)
+        self._restart_at = None
+
+        self._check_button = Button('check_chord', 'Check', 440, 400)
+
+        # the position under the pointer, and the name of what's fretted last drawn
+        self._hovered = None
+        self._selection_text = None
+        self._selection_rect = None
+
+    def draw_start_screen(self, screen):
+        self._fretboard.render(screen)
+
+        text = render_text(config.FONTS['default'], 'Fret a chord, then press check or enter')
+        rect = text.get_rect(center=(screen.get_width() / 2, layout.y(130)))
+        screen.blit(text, rect)
+
+    def draw_chord_text(self, screen):
+        if self._restart_at is not None:
+            text = render_text(config.FONTS['button'], 'Correct!')
+        else:
+            text = render_text(config.FONTS['button'], 'Play {}'.format(chord_name(*self._model.current_chord)))
+        rect = text.get_rect(center=(screen.get_width() / 2, layout.y(130)))
+        screen.blit(text, rect)
+
+    def draw_game_screen(self, screen):
+        self._fretboard.render(screen)
+        self.draw_chord_text(screen)
+
+        if self._model.hint is not None:
+            self.draw_voicing(screen, self._model.hint.frets, (204, 153, 255), shape=2)
+
+        self.draw_voicing(screen, self._model.selection, (255, 0, 0))
+        self.draw_selection_name(screen)
+
+    def draw_selection_name(self, screen):
+        """Name the chord or scale fretted so far, as it would be if the hovered position were clicked"""
+        name = self._model.selection_set(self._hovered).name()
+        text = render_text(config.FONTS['default'], 'Fretted: {}'.format(name) if name else '')
+        rect = screen.blit(text, text.get_rect(center=(screen.get_width() / 2, layout.y(330))))
+
+        if name != self._selection_text:
+            self.invalidate(rect.union(self._selection_rect) if self._selection_rect else rect)
+            self._selection_text = name
+            self._selection_rect = rect
+
+    def draw_voicing(self, screen, frets, colour, shape=1):
+        for string, fret in enumerate(frets):
+            if fret is not None:
+                self._fretboard.render_dot(screen, fret, string, colour, shape)
+
+    def draw_pause_screen(self, screen):
+        self._fretboard.render(screen)
+
+    def draw_final_screen(self, screen):
+        font = config.FONTS['default']
+        stats = self._model.game_stats
+
+        lines = [
+            render_text(font, '~ Game over ~'),
+            render_text(font, 'Duration: {}'.format(str(self._timer))),
+            render_text(font, 'Chords found: {}'.format(stats['found'])),
+            render_text(font, 'Average response time: {} seconds'.format(stats['average_response_time'])),
+            render_text(font, 'Accuracy: {}%'.format(stats['accuracy'])),
+        ]
+
+        width = max(line.get_width() for line in lines)
+        stats_image = pygame.Surface((width * 2, lines[0].get_height() * 7))
+        stats_image.fill(config.COLOUR_BACKGROUND)
+
+        for i, image in enumerate(lines):
+            y = (i + 1) * (lines[0].get_height() + 3)
+            rect = image.get_rect(center=(stats_image.get_width()/2, y))
+            stats_image.blit(image, rect)
+
+        pygame.draw.rect(
+            stats_image,
+            (0, 0, 0),
+            pygame.Rect(0, 0, stats_image.get_width()-1, stats_image.get_height()-1),
+            1
+        )
+
+        rect = stats_image.get_rect(center=(screen.get_width()/2, screen.get_height()/2))
+        screen.blit(stats_image, rect)
+
+    def is_animating(self):
+        return super().is_animating() or self._restart_at is not None
+
+    def update(self):
+        if self._restart_at is not None and self.delay_ended(self._restart_at):
+            self._restart_at = None
+            self._model.choose_next_chord()
+            self.invalidate()
+
+    def activate(self):
+        super().activate()
+        self.prepare_notes(self._model.midi_notes())
+
+    def start(self):
+        super().start()
+        self._active_elements.append(self._check_button)
+        self._model.choose_next_chord()
+        self._restart_at = None
+
+    def resume(self):
+        super().resume()
+        self._active_elements.append(self._check_button)
+
+    def reset(self):
+        super().reset()
+        self._model.reset()
+        self._restart_at = None
+        self._hovered = None
+        self._selection_text = None
+        self._selection_rect = None
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEMOTION:
+            self._hovered = self._fretboard.get_index(*event.pos)
+
+        return super().handle_event(event)
+
+    def check(self):
+        if self.state != self.PLAYING or self._restart_at is not None:
+            return
+
+        if self._model.check():
+            self.flash_background(config.COLOUR_SUCCESS, 5)
+            self._restart_at = self.delay_end(60)
+        else:
+            # show the easiest voicing after a wrong answer
+            self.flash_background(config.COLOUR_FAILURE, 5)
+
+    def handle_keyboard_input(self, key_pressed):
+        if key_pressed in (pygame.K_RETURN, pygame.K_SPACE):
+            self.check()
+            return
+
+        super().handle_keyboard_input(key_pressed)
+
+    def handle_mouse_input(self, x, y):
+        if self.state != self.PLAYING or self._restart_at is not None:
+            return
+
+        elem = self.element_at(x, y)
+        if elem is not None and elem.value == 'check_chord':
+            self.check()
+            return
+
+        index = self._fretboard.get_index(x, y)
+
+        if index:
+            if self._model.toggle(*index):
+                self.play_note(self._model.midi_note(*index))
+            self.invalidate(self._fretboard.cell_rect(*index))
+
+
+class ChordData:
+    """
+    Each round names a chord, and any voicing of it the voicing search accepts is an answer. Voicings
+    come from the search's disk cache, so only the first game on a tuning pays for the search, and
+    they're loaded on a background thread so that building the model doesn't stall the render
+    thread. The first round waits for them if they aren't ready yet.
+    """
+
+    DEFAULT_QUALITIES = ('major', 'minor', 'dominant 7th', 'major 7th', 'minor 7th')
+
+    def __init__(self, game_config, frets=13, timer=None, rng=random):
+        instrument = get_instrument(game_config)
+        self._tuning = instrument.tuning
+        self._frets = frets
+        self._table = compile_tuning(self._tuning, frets, instrument.lowest_octave)
+        self._rng = rng
+
+        self._voicings = None
+        self._chords = None
+        self._search_error = None
+        self._search = threading.Thread(
+            target=self._load_voicings, args=(game_config.get('qualities', self.DEFAULT_QUALITIES),),
+            name='chord-voicings', daemon=True)
+        self._search.start()
+
+        if timer is None:
+            timer = GameTimer()
+            timer.start()
+
+        # response times are laps of the game timer, so time spent paused doesn't count
+        self._timer = timer
+
+        self.reset()
+
+    def _load_voicings(self, qualities):
+        try:
+            voicings = {
+                chord: voicings for chord, voicings in all_voicings(self._tuning, frets=self._frets).items()
+                if chord[1] in qualities and voicings
+            }
+        except Exception as error:
+            # raised on the render thread when a round needs the voicings
+            self._search_error = error
+            return
+
+        self._chords = sorted(voicings)
+        self._voicings = voicings
+
+    def wait_for_voicings(self):
+        """Block until the voicing search has finished"""
+        self._search.join()
+
+        if self._search_error is not None:
+            raise self._search_error
+
+    def reset(self):
+        """Start a new game"""
+        self.current_chord = None
+        self.selection = [None] * len(self._tuning)
+        self.hint = None
+        self._answers = {}
+
+        self.game_stats = {
+            'found': 0,
+            'incorrect': 0,
+            'accuracy': 0,
+            'total_response_time': 0,
+            'average_response_time': 0,
+        }
+
+    def choose_next_chord(self):
+        self.wait_for_voicings()
+
+        self.current_chord = self._rng.choice(self._chords)
+        self.selection = [None] * len(self._tuning)
+        self.hint = None
+        self._timer.lap()
+
+        # voicing frets -> voicing, so checking an answer is a single lookup
+        self._answers = {voicing.frets: voicing for voicing in self._voicings[self.current_chord]}
+
+    def toggle(self, fret, string):
+        """Fret a string, or mute it if it's already fretted there. Returns whether the string now sounds."""
+        self.selection[string] = None if self.selection[string] == fret else fret
+        return self.selection[string] is not None
+
+    def check(self):
+        correct = tuple(self.selection) in self._answers
+
+        if correct:
+            response_time = self._timer.current_lap()
+            self.game_stats['found'] += 1
+            self.game_stats['total_response_time'] += response_time
+            self.game_stats['average_response_time'] = \
+                round(self.game_stats['total_response_time'] / self.game_stats['found'], 2)
+        else:
+            self.game_stats['incorrect'] += 1
+            self.hint = self._voicings[self.current_chord][0]
+
+        total = self.game_stats['found'] + self.game_stats['incorrect']
+        self.game_stats['accuracy'] = round(100 * self.game_stats['found'] / total, 2)
+
+        return correct
+
+    def selection_set(self, hovered=None):
+        """
+        The pitch classes of the fretted strings. A hovered (fret, string) is included as though it had
+        been clicked, replacing whatever is fretted on its string.
+        """
+        frets = list(self.selection)
+        if hovered is not None and frets[hovered[1]] != hovered[0]:
+            frets[hovered[1]] = hovered[0]
+
+        return PitchClassSet.from_pitch_classes(
+            self._table.pitch_class(fret, string) for string, fret in enumerate(frets) if fret is not None
+        )
+
+    def midi_note(self, fret, string):
+        return self._table.midi_note(fret, string)
+
+    def midi_notes(self):
+        """MIDI note numbers of every position on the board, which can all be clicked"""
+        return {self._table.midi_note(fret, string)
+                for string in range(len(self._tuning))
+                for fret in range(self._frets)}
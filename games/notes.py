@@ -1,14 +1,20 @@
+import logging
 import random
-import time
 
 import pygame
 
 import constants as const
 import config
-from ui import FretboardDisplay
-from utils import NoteIterator
+import history
+from instruments import get_instrument
+from sampling import WeightedSampler
+from timer import GameTimer
+from ui import FretboardDisplay, layout, render_text
+from utils import compile_tuning
 
-from .base import GameBase
+from .base import GameBase, key_char
+
+logger = logging.getLogger(__name__)
 
 
 class NameTheNote(GameBase):
@@ -19,8 +25,14 @@ class NameTheNote(GameBase):
     def __init__(self, game_config, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        self._fretboard = FretboardDisplay()
-        self._model = NoteData(game_config)
+        instrument = get_instrument(game_config)
+        self._fretboard = FretboardDisplay(instrument.frets, instrument.strings)
+        self._model = NoteData(game_config, timer=self._timer, history=history.get_store())
+
+        # in audio mode notes are played on a guitar rather than typed
+        self._audio_input = game_config.get('input') == 'audio'
+        self._listener = None
+        self._audio_error = None
 
     def draw_start_screen(self, screen):
         self._fretboard.render(screen)
@@ -32,24 +44,28 @@ class NameTheNote(GameBase):
         current = self._model.get_current_note()
         self._fretboard.render_dot(screen, current['fret'], current['string'])
 
+        if self._audio_error is not None:
+            text = render_text(config.FONTS['default'], self._audio_error)
+            screen.blit(text, text.get_rect(center=(screen.get_width() / 2, layout.y(130))))
+
     def draw_pause_screen(self, screen):
         self._fretboard.render(screen)
 
     def draw_stats(self, screen):
-        text = config.FONTS['default'].render('Correct {correct} // Incorrect {incorrect}'.format(
+        text = render_text(config.FONTS['default'], 'Correct {correct} // Incorrect {incorrect}'.format(
             **self._model.game_stats
-        ), True, config.COLOUR_DEFAULT)
-        screen.blit(text, (10, 10))
+        ))
+        screen.blit(text, (layout.x(10), layout.y(10)))
 
     def draw_final_screen(self, screen):
         font = config.FONTS['default']
 
-        title = font.render('~ Game over ~', True, config.COLOUR_DEFAULT)
-        duration = font.render('Duration: {}'.format(str(self._timer)), True, config.COLOUR_DEFAULT)
-        total = font.render('Total notes: {}'.format(self._model.game_stats['total']), True, config.COLOUR_DEFAULT)
-        average = font.render('Average response time: {} seconds'.format(
-            self._model.game_stats['average_response_time']), True, config.COLOUR_DEFAULT)
-        accuracy = font.render('Accuracy: {}%'.format(self._model.game_stats['accuracy']), True, config.COLOUR_DEFAULT)
+        title = render_text(font, '~ Game over ~')
+        duration = render_text(font, 'Duration: {}'.format(str(self._timer)))
+        total = render_text(font, 'Total notes: {}'.format(self._model.game_stats['total']))
+        average = render_text(font, 'Average response time: {} seconds'.format(
+            self._model.game_stats['average_response_time']))
+        accuracy = render_text(font, 'Accuracy: {}%'.format(self._model.game_stats['accuracy']))
 
         stats_image = pygame.Surface((average.get_width() * 2, title.get_height() * 7))
         stats_image.fill(config.COLOUR_BACKGROUND)
@@ -74,34 +90,128 @@ class NameTheNote(GameBase):
         for note in self._model.notes:
             self._fretboard.render_dot(screen, note['fret'], note['string'])
 
+    def activate(self):
+        super().activate()
+
+        # the note being asked is played, except when listening to a guitar that would hear it
+        if not self._audio_input:
+            self.prepare_notes(self._model.midi_note(note) for note in self._model.notes)
+
+    def play_current_note(self):
+        if not self._audio_input:
+            self.play_note(self._model.midi_note(self._model.get_current_note()))
+
     def start(self):
         super().start()
         self._model.choose_next_note()
+        self.play_current_note()
+
+        if self._audio_input:
+            self._start_listening()
+
+    def reset(self):
+        super().reset()
+        self._model.reset()
+
+    def cleanup(self):
+        super().cleanup()
+
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def _start_listening(self):
+        # imported here so keyboard play doesn't pay for loading the audio pipeline
+        import pitch
+
+        try:
+            source = pitch.create_source(config.AUDIO_INPUT, config.AUDIO_SAMPLE_RATE)
+            listener = pitch.PitchListener(source, window_size=config.PITCH_WINDOW, hop_size=config.PITCH_HOP)
+            listener.start()
+        except Exception:
+            # no microphone, or one that won't open: carry on with the keyboard
+            logger.exception('could not listen to %s', config.AUDIO_INPUT)
+            self._audio_error = "Can't listen for notes, type them instead"
+            self._audio_input = False
+            self.play_current_note()
+            return
+
+        self._listener = listener
+
+    def handle_event(self, event):
+        if self._listener is not None and event.type == self._listener.EVENT:
+            self.handle_note_input(event.note)
+            return None
+
+        return super().handle_event(event)
+
+    def handle_note_input(self, note):
+        if self.state == self.PLAYING and self._model.valid_input(note):
+            if self._model.handle_input(note):
+                self.flash_background(config.COLOUR_SUCCESS, 5)
+                self.play_current_note()
+            else:
+                self.flash_background(config.COLOUR_FAILURE, 5)
 
     def handle_keyboard_input(self, key_pressed):
         super().handle_keyboard_input(key_pressed)
-        key = chr(key_pressed).upper()
 
-        if self._model.valid_input(key):
-            if self._model.handle_input(key):
-                self.flash_background(config.COLOUR_SUCCESS, 5)
-            else:
-                self.flash_background(config.COLOUR_FAILURE, 5)
+        if not self._audio_input:
+            self.handle_note_input(key_char(key_pressed))
 
     def handle_mouse_input(self, x, y):
         pass
 
 
 class NoteData:
-    def __init__(self, game_config):
-        self._bounds = game_config.get('bounds', (0, 5, 0, 13))
-        self._tuning = game_config['tuning']
+    GAME = 'name_the_note'
+
+    # how NoteData weights positions when choosing the next note, overridden with game_config['weighting']
+    DEFAULT_WEIGHTING = {
+        # weight of a position that hasn't been answered yet
+        'unseen_weight': 2.0,
+        # a position answered in this many seconds gets weight 1, slower ones proportionally more
+        'target_latency': 2.0,
+        # floor so that positions answered quickly still come up occasionally
+        'min_weight': 0.05,
+        # the weight is multiplied by 1 + error_weight * (incorrect / selected)
+        'error_weight': 3.0,
+        # how far each new response time moves a position's smoothed latency
+        'latency_smoothing': 0.5,
+    }
+
+    def __init__(self, game_config, timer=None, history=None, rng=random):
+        instrument = get_instrument(game_config)
+        self._bounds = game_config.get('bounds', instrument.bounds)
+        self._tuning = instrument.tuning
+        self._rng = rng
+        self._weighting = dict(self.DEFAULT_WEIGHTING, **game_config.get('weighting', {}))
+        self._table = compile_tuning(self._tuning, self._bounds[3], instrument.lowest_octave)
+
+        if timer is None:
+            timer = GameTimer()
+            timer.start()
+
+        # response times are laps of the game timer, so time spent paused doesn't count
+        self._timer = timer
+
+        # where each attempt is logged, if anywhere, and what it was played on
+        self._history = history
+        self._instrument_name = instrument.name
+
+        self.notes = self._build_note_list()
 
+        self.reset()
+
+    def reset(self):
+        """Start a new game, forgetting the stats and response times of the previous one"""
         self._current_note = None
-        self._note_start_time = None
         self._failed_attempt = False
 
-        self.notes = self._build_note_list()
+        for note in self.notes:
+            note['selected'] = 0
+            note['incorrect'] = 0
+            note['latency'] = None
 
         self.game_stats = {
             'correct': 0,
@@ -112,20 +222,19 @@ class NoteData:
             'average_response_time': 0,
         }
 
-        self._reset_active_notes()
+        self._sampler = WeightedSampler([self._weighting['unseen_weight']] * len(self.notes))
 
     def _build_note_list(self):
         """Generate a 1d list of notes that maps to string/fret"""
 
         notes = []
 
-        fret_count = self._bounds[3] - self._bounds[2]
-
-        for string_index in range(self._bounds[1] - self._bounds[0] + 1):
-            for fret_index, note in enumerate(NoteIterator(self._tuning[string_index], fret_count)):
+        for string_index in range(self._bounds[0], self._bounds[1] + 1):
+            for fret_index in range(self._bounds[2], self._bounds[3]):
+                note = self._table.note(fret_index, string_index)
                 if len(note) == 1:  # whole note
                     notes.append({
-                        'fret': fret_index + self._bounds[2],
+                        'fret': fret_index,
                         'string': string_index,
                         'note': note,
                         'selected': 0,
@@ -135,8 +244,27 @@ class NoteData:
 
         return notes
 
-    def _reset_active_notes(self):
-        self._active_notes = list(range(len(self.notes)))
+    def _note_weight(self, note):
+        """How likely a position is to be chosen: slow and frequently missed positions come up more"""
+        if note['latency'] is None:
+            return self._weighting['unseen_weight']
+
+        weight = max(self._weighting['min_weight'], note['latency'] / self._weighting['target_latency'])
+        error_rate = note['incorrect'] / note['selected'] if note['selected'] else 0
+
+        return weight * (1 + self._weighting['error_weight'] * error_rate)
+
+    def _record_response(self, response_time):
+        """Fold a response time into the current position's smoothed latency and update its weight"""
+        note = self.notes[self._current_note]
+
+        if note['latency'] is None:
+            note['latency'] = response_time
+        else:
+            smoothing = self._weighting['latency_smoothing']
+            note['latency'] += smoothing * (response_time - note['latency'])
+
+        self._sampler.update(self._current_note, self._note_weight(note))
 
     def _calculate_stats(self, response_time):
         """
@@ -152,39 +280,43 @@ class NoteData:
             100 * ((self.game_stats['total'] - self.game_stats['incorrect']) / self.game_stats['total']), 2)
 
     def choose_next_note(self):
+        note_time = self._timer.lap()
+
         if self._current_note is not None:
-            note_time = int(time.time() - self._note_start_time)
             self._calculate_stats(note_time)
-            if note_time <= 2:
-                # remove all notes that the user selects withint 2 seconds
-                print('removing {} {}'.format(
-                    self._current_note,
-                    self.notes[self._current_note]['note']
-                ))
-                self._active_notes.pop(self._active_notes.index(self._current_note))
-
-                if len(self._active_notes) <= 2:
-                    print('resetting notes')
-                    self._reset_active_notes()
+            self._record_response(note_time)
 
+        # don't ask for the same position twice in a row
         prev_note = self._current_note
-        while True:
-            self._current_note = random.choice(self._active_notes)
-            if self._current_note != prev_note:
-                break
+        if prev_note is not None and len(self.notes) > 1:
+            prev_weight = self._sampler.weight(prev_note)
+            self._sampler.update(prev_note, 0)
+            self._current_note = self._sampler.sample(self._rng)
+            self._sampler.update(prev_note, prev_weight)
+        else:
+            self._current_note = self._sampler.sample(self._rng)
 
-        self._note_start_time = time.time()
         self.notes[self._current_note]['selected'] += 1
         self._failed_attempt = False
 
     def get_current_note(self):
         return self.notes[self._current_note]
 
+    def midi_note(self, note):
+        """MIDI note number of one of the note list's positions"""
+        return self._table.midi_note(note['fret'], note['string'])
+
     def valid_input(self, note):
         return note in const.NOTES
 
     def handle_input(self, note):
-        if note == self.notes[self._current_note]['note']:
+        current = self.notes[self._current_note]
+
+        if self._history is not None:
+            self._history.record(self.GAME, self._instrument_name, current['fret'], current['string'],
+                                 current['note'], note, note == current['note'], self._timer.current_lap())
+
+        if note == current['note']:
             if not self._failed_attempt:
                 self.game_stats['correct'] += 1
             self.choose_next_note()
@@ -192,6 +324,7 @@ class NoteData:
         else:
             if not self._failed_attempt:
                 self.game_stats['incorrect'] += 1
+                self.notes[self._current_note]['incorrect'] += 1
                 self._failed_attempt = True
             return False
 
@@ -204,9 +337,10 @@ class FindAllNotes(GameBase):
     def __init__(self, game_config, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        self._fretboard = FretboardDisplay()
-        self._model = FindTheNoteData(game_config)
-        self._restart_delay = None
+        instrument = get_instrument(game_config)
+        self._fretboard = FretboardDisplay(instrument.frets, instrument.strings)
+        self._model = FindTheNoteData(game_config, timer=self._timer, history=history.get_store())
+        self._restart_at = None
 
     def draw_start_screen(self, screen):
         self._fretboard.render(screen)
@@ -214,13 +348,10 @@ class FindAllNotes(GameBase):
 
     def draw_note_text(self, screen):
         if self._model.success():
-            text = config.FONTS['button'].render(
-                'Success!', True, config.COLOUR_DEFAULT
-            )
+            text = render_text(config.FONTS['button'], 'Success!')
         else:
-            text = config.FONTS['button'].render(
-                'Find all the {} notes'.format(self._model.current_note), True, config.COLOUR_DEFAULT)
-        rect = text.get_rect(center=(screen.get_width() / 2, 130))
+            text = render_text(config.FONTS['button'], 'Find all the {} notes'.format(self._model.current_note))
+        rect = text.get_rect(center=(screen.get_width() / 2, layout.y(130)))
         screen.blit(text, rect)
 
     def draw_game_screen(self, screen):
@@ -231,6 +362,37 @@ class FindAllNotes(GameBase):
     def draw_pause_screen(self, screen):
         self._fretboard.render(screen)
 
+    def draw_final_screen(self, screen):
+        font = config.FONTS['default']
+        stats = self._model.game_stats
+
+        lines = [
+            render_text(font, '~ Game over ~'),
+            render_text(font, 'Duration: {}'.format(str(self._timer))),
+            render_text(font, 'Rounds completed: {}'.format(stats['rounds'])),
+            render_text(font, 'Average round time: {} seconds'.format(stats['average_round_time'])),
+            render_text(font, 'Accuracy: {}%'.format(stats['accuracy'])),
+        ]
+
+        width = max(line.get_width() for line in lines)
+        stats_image = pygame.Surface((width * 2, lines[0].get_height() * 7))
+        stats_image.fill(config.COLOUR_BACKGROUND)
+
+        for i, image in enumerate(lines):
+            y = (i + 1) * (lines[0].get_height() + 3)
+            rect = image.get_rect(center=(stats_image.get_width()/2, y))
+            stats_image.blit(image, rect)
+
+        pygame.draw.rect(
+            stats_image,
+            (0, 0, 0),
+            pygame.Rect(0, 0, stats_image.get_width()-1, stats_image.get_height()-1),
+            1
+        )
+
+        rect = stats_image.get_rect(center=(screen.get_width()/2, screen.get_height()/2))
+        screen.blit(stats_image, rect)
+
     def draw_selected_notes(self, screen):
         for note in self._model.get_selected_notes():
             self._fretboard.render_dot(screen, note['fret'], note['string'], (255, 0, 0))
@@ -240,30 +402,41 @@ class FindAllNotes(GameBase):
         for note in self._model.notes:
             self._fretboard.render_dot(screen, note['fret'], note['string'])
 
+    def is_animating(self):
+        return super().is_animating() or self._restart_at is not None
+
     def update(self):
-        if self._model.success() and not self._restart_delay:
-            self._restart_delay = 120
+        if self._model.success() and self._restart_at is None:
+            self._restart_at = self.delay_end(120)
 
-        if self._restart_delay is not None:
-            self._restart_delay -= 1
+        if self._restart_at is not None and self.delay_ended(self._restart_at):
+            self._restart_at = None
+            self._model.choose_next_note()
+            self.invalidate()
 
-            if self._restart_delay <= 0:
-                self._restart_delay = None
-                self._model.choose_next_note()
+    def activate(self):
+        super().activate()
+        self.prepare_notes(self._model.midi_notes())
 
     def start(self):
         super().start()
         self._model.choose_next_note()
-        self._restart_delay = None
+        self._restart_at = None
 
-    def handle_keyboard_input(self, key_pressed):
-        super().handle_keyboard_input(key_pressed)
-        key = chr(key_pressed).upper()
+    def reset(self):
+        super().reset()
+        self._model.reset()
+        self._restart_at = None
 
     def handle_mouse_input(self, x, y):
+        if self.state != self.PLAYING:
+            return
+
         index = self._fretboard.get_index(x, y)
 
         if index:
+            self.play_note(self._model.midi_note(*index))
+
             if self._model.handle_note_selection(*index):
                 self.flash_background(config.COLOUR_SUCCESS, 5)
             else:
@@ -271,32 +444,72 @@ class FindAllNotes(GameBase):
 
 
 class FindTheNoteData:
-    def __init__(self, game_config):
-        self._bounds = game_config.get('bounds', (0, 5, 0, 13))
-        self._tuning = game_config['tuning']
+    GAME = 'find_all_notes'
+
+    def __init__(self, game_config, timer=None, history=None, rng=random):
+        instrument = get_instrument(game_config)
+        self._bounds = game_config.get('bounds', instrument.bounds)
+        self._tuning = instrument.tuning
+        self._rng = rng
+        self._table = compile_tuning(self._tuning, self._bounds[3], instrument.lowest_octave)
+
+        if timer is None:
+            timer = GameTimer()
+            timer.start()
+
+        # latencies are measured from the start of each round
+        self._timer = timer
+        self._history = history
+        self._instrument_name = instrument.name
 
         self._config = game_config
 
         self.notes = self._build_note_list()
 
+        # note name -> its entries in self.notes, and -> {(fret, string): index into those entries}
+        self._notes_by_name = {}
+        self._positions_by_name = {}
+        self._index_note_list()
+
+        self.reset()
+
+    def reset(self):
+        """Start a new game"""
         self._available_notes = None
         self.current_note = None
         self.current_note_list = []
+        self._current_positions = {}
         self._found_note_indexes = set()
         self._wrong_notes = 0
 
-    @staticmethod
-    def _get_available_notes():
-        notes = const.WHOLE_NOTES
-        random.shuffle(notes)
+        self.game_stats = {
+            'rounds': 0,
+            'found': 0,
+            'incorrect': 0,
+            'accuracy': 0,
+            'total_round_time': 0,
+            'average_round_time': 0,
+        }
+
+    def _get_available_notes(self):
+        notes = list(const.WHOLE_NOTES)
+        self._rng.shuffle(notes)
         return notes
 
+    def _index_note_list(self):
+        for note in self.notes:
+            same_notes = self._notes_by_name.setdefault(note['note'], [])
+            self._positions_by_name.setdefault(note['note'], {})[(note['fret'], note['string'])] = len(same_notes)
+            same_notes.append(note)
+
     def choose_next_note(self):
         if not self._available_notes:
             self._available_notes = self._get_available_notes()
 
         self.current_note = self._available_notes.pop()
-        self.current_note_list = [note for note in self.notes if note['note'] == self.current_note]
+        self._timer.lap()
+        self.current_note_list = self._notes_by_name.get(self.current_note, [])
+        self._current_positions = self._positions_by_name.get(self.current_note, {})
         self._found_note_indexes = set()
         self._wrong_notes = 0
 
@@ -305,13 +518,12 @@ class FindTheNoteData:
 
         notes = []
 
-        fret_count = self._bounds[3] - self._bounds[2]
-
-        for string_index in range(self._bounds[1] - self._bounds[0] + 1):
-            for fret_index, note in enumerate(NoteIterator(self._tuning[string_index], fret_count)):
+        for string_index in range(self._bounds[0], self._bounds[1] + 1):
+            for fret_index in range(self._bounds[2], self._bounds[3]):
+                note = self._table.note(fret_index, string_index)
                 if len(note) == 1:  # whole note
                     notes.append({
-                        'fret': fret_index + self._bounds[2],
+                        'fret': fret_index,
                         'string': string_index,
                         'note': note,
                         'selected': 0,
@@ -322,13 +534,38 @@ class FindTheNoteData:
         return notes
 
     def handle_note_selection(self, fret, string):
-        for i, note in enumerate(self.current_note_list):
-            if (fret, string) == (note['fret'], note['string']):
-                self._found_note_indexes.add(i)
-                return True
+        index = self._current_positions.get((fret, string))
+
+        if self._history is not None:
+            self._history.record(self.GAME, self._instrument_name, fret, string, self.current_note,
+                                 self._table.note(fret, string), index is not None, self._timer.current_lap())
+
+        if index is None:
+            self._wrong_notes += 1
+            self.game_stats['incorrect'] += 1
+        elif index not in self._found_note_indexes:
+            self._found_note_indexes.add(index)
+            self.game_stats['found'] += 1
+
+            if self.success():
+                self.game_stats['rounds'] += 1
+                self.game_stats['total_round_time'] += self._timer.current_lap()
+                self.game_stats['average_round_time'] = \
+                    round(self.game_stats['total_round_time'] / self.game_stats['rounds'], 2)
+
+        self.game_stats['accuracy'] = round(
+            100 * self.game_stats['found'] / (self.game_stats['found'] + self.game_stats['incorrect']), 2)
+
+        return index is not None
+
+    def midi_note(self, fret, string):
+        return self._table.midi_note(fret, string)
 
-        self._wrong_notes += 1
-        return False
+    def midi_notes(self):
+        """MIDI note numbers of every position within the game's bounds, which can all be clicked"""
+        return {self._table.midi_note(fret, string)
+                for string in range(self._bounds[0], self._bounds[1] + 1)
+                for fret in range(self._bounds[2], self._bounds[3])}
 
     def get_selected_notes(self):
         return [self.current_note_list[index] for index in self._found_note_indexes]
@@ -1,6 +1,17 @@
-from .base import GameBase
+import random
+
+import pygame
 
-from ui import FretboardDisplay, Text
+import constants as const
+import config
+import history
+from instruments import get_instrument
+from scale_shapes import degree_name, scale_map, all_shapes
+from timer import GameTimer
+from ui import FretboardDisplay, Text, layout, render_text
+from utils import compile_tuning, PITCH_CLASSES
+
+from .base import GameBase
 
 
 class FindScaleDegrees(GameBase):
@@ -13,20 +24,238 @@ class FindScaleDegrees(GameBase):
 
         self._config = game_config
 
-        self._fretboard = FretboardDisplay()
+        self._instrument = get_instrument(game_config)
+        self._fretboard = FretboardDisplay(self._instrument.frets, self._instrument.strings)
+        self._model = ScaleDegreeData(game_config, frets=self._fretboard.fret_count, timer=self._timer,
+                                      history=history.get_store())
+        self._restart_at = None
 
-        self._active_elements.append(
-            Text('Key: C / shape: C Caged', 10, 450),
-        )
+        # the start screen shows an example shape
+        self._example = self._model.example_shape()
+        self._shape_text = self._describe(*self._example)
+        self._active_elements.append(self._shape_text)
+
+    @staticmethod
+    def _describe(scale_positions, shape):
+        return Text('Key: {} {} / shape: {} Caged'.format(scale_positions.key, scale_positions.scale, shape.name),
+                    10, 450)
+
+    def _show_shape_text(self, text):
+        if self._shape_text in self._active_elements:
+            self._active_elements.remove(self._shape_text)
+
+        self._shape_text = text
+        self._active_elements.append(text)
+        self.invalidate()
+
+    def draw_shape(self, screen, shape):
+        self._fretboard.draw_bounding_box(screen, shape.min_fret, shape.max_fret, 0, self._fretboard.string_count - 1)
 
     def draw_start_screen(self, screen):
+        scale_positions, shape = self._example
+
         self._fretboard.render(screen)
-        self._fretboard.render_scale(screen, self._config['scale_pattern'], 7)
-        self._fretboard.show_root_notes(screen, self._config['tuning'], self._config['key'])
-        self._fretboard.draw_bounding_box(screen, 7, 10, 0, 5)
+        self._fretboard.render_scale(screen, shape.positions)
+        self._fretboard.show_root_notes(screen, self._instrument.tuning, scale_positions.key)
+        self.draw_shape(screen, shape)
+
+    def draw_degree_text(self, screen):
+        if self._model.success():
+            text = render_text(config.FONTS['button'], 'Success!')
+        else:
+            text = render_text(config.FONTS['button'], 'Find every {} in the shape'.format(
+                degree_name(self._model.current_degree)))
+        rect = text.get_rect(center=(screen.get_width() / 2, layout.y(130)))
+        screen.blit(text, rect)
 
     def draw_game_screen(self, screen):
         self._fretboard.render(screen)
+        self.draw_shape(screen, self._model.current_shape)
+        self.draw_degree_text(screen)
+        self._fretboard.render_scale(screen, self._model.get_found_positions(), (255, 0, 0))
 
     def draw_pause_screen(self, screen):
-        self._fretboard.render(screen)
\ No newline at end of file
+        self._fretboard.render(screen)
+
+    def draw_final_screen(self, screen):
+        font = config.FONTS['default']
+        stats = self._model.game_stats
+
+        lines = [
+            render_text(font, '~ Game over ~'),
+            render_text(font, 'Duration: {}'.format(str(self._timer))),
+            render_text(font, 'Shapes completed: {}'.format(stats['rounds'])),
+            render_text(font, 'Correct {correct} // Incorrect {incorrect}'.format(**stats)),
+            render_text(font, 'Accuracy: {}%'.format(stats['accuracy'])),
+        ]
+
+        width = max(line.get_width() for line in lines)
+        stats_image = pygame.Surface((width * 2, lines[0].get_height() * 7))
+        stats_image.fill(config.COLOUR_BACKGROUND)
+
+        for i, image in enumerate(lines):
+            y = (i + 1) * (lines[0].get_height() + 3)
+            rect = image.get_rect(center=(stats_image.get_width()/2, y))
+            stats_image.blit(image, rect)
+
+        pygame.draw.rect(
+            stats_image,
+            (0, 0, 0),
+            pygame.Rect(0, 0, stats_image.get_width()-1, stats_image.get_height()-1),
+            1
+        )
+
+        rect = stats_image.get_rect(center=(screen.get_width()/2, screen.get_height()/2))
+        screen.blit(stats_image, rect)
+
+    def is_animating(self):
+        return super().is_animating() or self._restart_at is not None
+
+    def update(self):
+        if self.state == self.PLAYING and self._model.success() and self._restart_at is None:
+            self._restart_at = self.delay_end(120)
+
+        if self._restart_at is not None and self.delay_ended(self._restart_at):
+            self._restart_at = None
+            self.next_round()
+
+    def next_round(self):
+        self._model.choose_next_round()
+        self._show_shape_text(self._describe(self._model.current_scale, self._model.current_shape))
+
+    def activate(self):
+        super().activate()
+        self.prepare_notes(self._model.midi_notes())
+
+    def start(self):
+        super().start()
+        self._restart_at = None
+        self.next_round()
+
+    def reset(self):
+        super().reset()
+        self._model.reset()
+        self._restart_at = None
+        self._show_shape_text(self._describe(*self._example))
+
+    def handle_mouse_input(self, x, y):
+        if self.state != self.PLAYING or self._model.success():
+            return
+
+        index = self._fretboard.get_index(x, y)
+
+        if index:
+            self.play_note(self._model.midi_note(*index))
+
+            if self._model.handle_position_selection(*index):
+                self.flash_background(config.COLOUR_SUCCESS, 5)
+            else:
+                self.flash_background(config.COLOUR_FAILURE, 5)
+
+
+class ScaleDegreeData:
+    """
+    Each round picks a key, scale and CAGED shape and one degree of the scale, and the player finds
+    every position of that degree within the shape
+    """
+
+    GAME = 'find_scale_degrees'
+
+    def __init__(self, game_config, frets=13, timer=None, history=None, rng=random):
+        instrument = get_instrument(game_config)
+        self._tuning = instrument.tuning
+        self._frets = frets
+        self._table = compile_tuning(self._tuning, frets, instrument.lowest_octave)
+        self._rng = rng
+
+        # the example on the start screen, and what rounds are drawn from
+        self._key = game_config.get('key', 'C')
+        self._scale = game_config.get('scale', 'major')
+        self._shape = game_config.get('shape', 'E')
+        keys = game_config.get('keys', const.NOTES)
+        scales = game_config.get('scales', list(const.SCALES))
+
+        self._choices = [
+            (scale_positions, shape) for scale_positions, shape in all_shapes(self._tuning, frets)
+            if scale_positions.key in keys and scale_positions.scale in scales
+        ]
+
+        if timer is None:
+            timer = GameTimer()
+            timer.start()
+
+        # latencies are measured from the start of each round
+        self._timer = timer
+        self._history = history
+        self._instrument_name = instrument.name
+
+        self.reset()
+
+    def reset(self):
+        """Start a new game"""
+        self.current_scale = None
+        self.current_shape = None
+        self.current_degree = None
+        self._targets = {}
+        self._found = set()
+
+        self.game_stats = {
+            'rounds': 0,
+            'correct': 0,
+            'incorrect': 0,
+            'accuracy': 0,
+        }
+
+    def example_shape(self):
+        scale_positions = scale_map(self._tuning, self._key, self._scale, self._frets)
+        shape = next(shape for shape in scale_positions.shapes if shape.name == self._shape)
+        return scale_positions, shape
+
+    def choose_next_round(self):
+        self.current_scale, self.current_shape = self._rng.choice(self._choices)
+        self.current_degree = self._rng.choice(const.SCALES[self.current_scale.scale])
+
+        self._targets = {
+            (position.fret, position.string): position
+            for position in self.current_shape.positions if position.degree == self.current_degree
+        }
+        self._found = set()
+        self._timer.lap()
+
+    def handle_position_selection(self, fret, string):
+        correct = (fret, string) in self._targets
+
+        if self._history is not None:
+            expected = const.NOTES[(PITCH_CLASSES[self.current_scale.key] + self.current_degree) % 12]
+            self._history.record(self.GAME, self._instrument_name, fret, string, expected,
+                                 self._table.note(fret, string), correct, self._timer.current_lap())
+
+        if correct:
+            if (fret, string) not in self._found:
+                self._found.add((fret, string))
+                self.game_stats['correct'] += 1
+
+                if self.success():
+                    self.game_stats['rounds'] += 1
+        else:
+            self.game_stats['incorrect'] += 1
+
+        total = self.game_stats['correct'] + self.game_stats['incorrect']
+        self.game_stats['accuracy'] = round(100 * self.game_stats['correct'] / total, 2)
+
+        return correct
+
+    def get_found_positions(self):
+        return [self._targets[position] for position in self._found]
+
+    def success(self):
+        return len(self._found) == len(self._targets)
+
+    def midi_note(self, fret, string):
+        return self._table.midi_note(fret, string)
+
+    def midi_notes(self):
+        """MIDI note numbers of every position on the board, which can all be clicked"""
+        return {self._table.midi_note(fret, string)
+                for string in range(len(self._tuning))
+                for fret in range(self._frets)}
@@ -0,0 +1,284 @@
+import threading
+
+import numpy as np
+import pygame
+
+import config
+import history
+from instruments import get_instrument
+from ui import Button, FretboardDisplay, layout, render_text
+
+from .base import Scene
+
+# response times are bucketed so median latencies can be kept up to date incrementally
+LATENCY_BIN_WIDTH = 0.1
+LATENCY_BINS = 100  # the last bin collects everything slower than 9.9 seconds
+
+
+class HeatmapData:
+    """
+    Strings x frets aggregates of the practice history. Attempts are folded in with vectorised
+    scatter-adds, so refreshing only touches the rows logged since the previous refresh. The history
+    is queried on a background thread, so the render thread never waits on SQLite or contends with
+    the history writer; collect() folds in whatever the last query fetched. Given an instrument name,
+    only attempts played on that instrument are counted.
+    """
+
+    METRICS = ('accuracy', 'latency', 'attempts')
+
+    def __init__(self, store, strings, frets, instrument=None):
+        self._store = store
+        self._instrument = instrument
+        self._strings = strings
+        self._frets = frets
+        self._fetched_id = 0
+        self._lock = threading.Lock()
+        self._fetched = []
+        self._worker = None
+
+        # whether a query has finished since the data was created, so "no attempts" can be told
+        # apart from "not loaded yet"
+        self.loaded = False
+
+        self.attempts = np.zeros((strings, frets), dtype=np.int64)
+        self.correct = np.zeros((strings, frets), dtype=np.int64)
+        self.latency_histogram = np.zeros((strings, frets, LATENCY_BINS), dtype=np.int64)
+
+    def _fetch(self):
+        rows = self._store.position_rows(self._fetched_id, self._instrument)
+        if rows:
+            # rows come in id order, and only one query runs at a time
+            self._fetched_id = rows[-1][0]
+
+        with self._lock:
+            self._fetched.append(np.array(rows, dtype=np.float64) if rows else None)
+            self._worker = None
+
+    def refresh(self):
+        """Query attempts logged since the last refresh on a background thread, unless one is running"""
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._fetch, name='heatmap-refresh', daemon=True)
+                self._worker.start()
+
+    @property
+    def refreshing(self):
+        with self._lock:
+            return self._worker is not None
+
+    def collect(self):
+        """Fold in the rows fetched by finished refreshes, returning whether the data changed"""
+        with self._lock:
+            fetched, self._fetched = self._fetched, []
+
+        changed = bool(fetched) and not self.loaded
+        self.loaded = self.loaded or bool(fetched)
+
+        for rows in fetched:
+            if rows is not None:
+                self.add_rows(rows)
+                changed = True
+
+        return changed
+
+    def add_rows(self, rows):
+        """Aggregate an array of (id, fret, string, correct, latency) rows, latency NaN when unknown"""
+        frets = rows[:, 1].astype(np.int64)
+        strings = rows[:, 2].astype(np.int64)
+        on_board = (frets >= 0) & (frets < self._frets) & (strings >= 0) & (strings < self._strings)
+
+        frets, strings, rows = frets[on_board], strings[on_board], rows[on_board]
+
+        np.add.at(self.attempts, (strings, frets), 1)
+        np.add.at(self.correct, (strings, frets), rows[:, 3].astype(np.int64))
+
+        latency = rows[:, 4]
+        timed = ~np.isnan(latency)
+        bins = np.minimum((latency[timed] / LATENCY_BIN_WIDTH).astype(np.int64), LATENCY_BINS - 1)
+        np.add.at(self.latency_histogram, (strings[timed], frets[timed], bins), 1)
+
+    def accuracy(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.attempts > 0, self.correct / self.attempts, np.nan)
+
+    def median_latency(self):
+        """Median response time of each position in seconds, to the resolution of the latency bins"""
+        cumulative = np.cumsum(self.latency_histogram, axis=2)
+        counts = cumulative[:, :, -1]
+        median_bin = np.argmax(cumulative * 2 >= counts[:, :, np.newaxis], axis=2)
+        return np.where(counts > 0, (median_bin + 0.5) * LATENCY_BIN_WIDTH, np.nan)
+
+    def metric(self, name):
+        if name == 'accuracy':
+            return self.accuracy()
+        elif name == 'latency':
+            return self.median_latency()
+
+        return np.where(self.attempts > 0, self.attempts.astype(np.float64), np.nan)
+
+
+def heatmap_colours(values, good_is_high):
+    """
+    Map a strings x frets array to RGB, from COLOUR_FAILURE for the worst position to COLOUR_SUCCESS
+    for the best. NaN (no data) positions come back as NaN.
+    """
+    low, high = np.nanmin(values), np.nanmax(values)
+    scaled = (values - low) / (high - low) if high > low else np.ones_like(values)
+
+    if not good_is_high:
+        scaled = 1 - scaled
+
+    bad = np.array(config.COLOUR_FAILURE, dtype=np.float64)
+    good = np.array(config.COLOUR_SUCCESS, dtype=np.float64)
+
+    return bad + scaled[:, :, np.newaxis] * (good - bad)
+
+
+class StatisticsScene(Scene):
+    """Heatmap of the practice history over the fretboard"""
+
+    TITLE = 'Practice statistics'
+
+    METRIC_LABELS = {
+        'accuracy': 'Accuracy',
+        'latency': 'Median response time',
+        'attempts': 'Attempts',
+    }
+
+    # how often the history is checked for new attempts, in seconds
+    REFRESH_INTERVAL = 2
+    # how often a refresh running in the background is checked for its result, in seconds
+    COLLECT_INTERVAL = 0.05
+
+    def __init__(self, game_config, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # the heatmap covers the board of the instrument the games are played on
+        instrument = get_instrument(game_config)
+        self._fretboard = FretboardDisplay(instrument.frets, instrument.strings)
+        self._metric = 0
+        self._heatmap = None
+        self._heatmap_layout = None
+        self._legend = ''
+        self._last_refresh = None
+
+        store = history.get_store()
+
+        if store is not None:
+            self._data = HeatmapData(store, self._fretboard.string_count, self._fretboard.fret_count,
+                                     instrument.name)
+            self._data.refresh()
+            self._last_refresh = pygame.time.get_ticks()
+        else:
+            self._data = None
+
+        self._active_elements = [
+            Button('next_metric', 'Next statistic', 120, 400),
+            Button('main_menu', 'Return to main menu', 320, 400),
+        ]
+
+    def activate(self):
+        if self._data is not None:
+            self._data.refresh()
+            self._last_refresh = pygame.time.get_ticks()
+
+        super().activate()
+
+    @property
+    def metric(self):
+        return HeatmapData.METRICS[self._metric]
+
+    def _build_heatmap(self):
+        """Draw the current metric onto a cached surface covering the board"""
+        values = self._data.metric(self.metric)
+        board = self._fretboard.cell_rect(0, 0).union(
+            self._fretboard.cell_rect(self._fretboard.fret_count - 1, self._fretboard.string_count - 1))
+
+        self._heatmap = (pygame.Surface(board.size, pygame.SRCALPHA), board.topleft)
+        self._heatmap_layout = layout.version
+
+        if np.isnan(values).all():
+            self._legend = 'No attempts recorded yet'
+            return
+
+        colours = heatmap_colours(values, good_is_high=self.metric == 'accuracy')
+
+        for string, fret in zip(*np.nonzero(~np.isnan(values))):
+            rect = self._fretboard.cell_rect(fret, string).move(-board.x, -board.y)
+            self._heatmap[0].fill(tuple(int(c) for c in colours[string, fret]), rect)
+
+        if self.metric == 'accuracy':
+            low, high = '{:.0%}'.format(np.nanmin(values)), '{:.0%}'.format(np.nanmax(values))
+        elif self.metric == 'latency':
+            low, high = '{:.1f}s'.format(np.nanmin(values)), '{:.1f}s'.format(np.nanmax(values))
+        else:
+            low, high = int(np.nanmin(values)), int(np.nanmax(values))
+
+        self._legend = '{}: {} to {}'.format(self.METRIC_LABELS[self.metric], low, high)
+
+    def draw(self, screen):
+        screen.fill(config.COLOUR_BACKGROUND)
+
+        title = render_text(config.FONTS['heading'], self.TITLE)
+        screen.blit(title, (screen.get_width() / 2 - title.get_width() / 2, layout.y(10)))
+
+        if self._data is None:
+            legend = 'Practice history is disabled'
+        elif not self._data.loaded:
+            legend = 'Loading practice history'
+        else:
+            if self._heatmap is None or self._heatmap_layout != layout.version:
+                self._build_heatmap()
+
+            screen.blit(*self._heatmap)
+            legend = self._legend
+
+        self._fretboard.render(screen)
+
+        text = render_text(config.FONTS['button'], legend)
+        screen.blit(text, text.get_rect(center=(screen.get_width() / 2, layout.y(130))))
+
+        for elem in self._active_elements:
+            elem.render(screen)
+
+    def update(self):
+        if self._data is None:
+            return
+
+        if self._data.collect():
+            self._heatmap = None
+            self.invalidate()
+
+        now = pygame.time.get_ticks()
+        if now - self._last_refresh >= self.REFRESH_INTERVAL * 1000:
+            self._last_refresh = now
+            self._data.refresh()
+
+    def next_wakeup(self):
+        if self._data is None:
+            return None
+
+        if self._data.refreshing:
+            return self.COLLECT_INTERVAL
+
+        return max(0, self.REFRESH_INTERVAL - (pygame.time.get_ticks() - self._last_refresh) / 1000)
+
+    def cleanup(self):
+        pass
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEMOTION:
+            self.track_pointer(event)
+
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            elem = self.element_at(*event.pos)
+
+            if elem is not None:
+                if elem.value == 'next_metric':
+                    self._metric = (self._metric + 1) % len(HeatmapData.METRICS)
+                    self._heatmap = None
+                    self.invalidate()
+                elif elem.value == 'main_menu':
+                    return 'menu'
+
+        return None
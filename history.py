@@ -0,0 +1,262 @@
+from collections import namedtuple
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import config
+
+logger = logging.getLogger(__name__)
+
+Attempt = namedtuple('Attempt', [
+    'id', 'game', 'fret', 'string', 'expected', 'answered', 'correct', 'latency', 'timestamp', 'instrument'
+])
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY,
+    game TEXT NOT NULL,
+    fret INTEGER NOT NULL,
+    string INTEGER NOT NULL,
+    expected TEXT NOT NULL,
+    answered TEXT,
+    correct INTEGER NOT NULL,
+    latency REAL,
+    timestamp REAL NOT NULL,
+    instrument TEXT
+);
+CREATE INDEX IF NOT EXISTS attempts_expected ON attempts (expected);
+CREATE INDEX IF NOT EXISTS attempts_string ON attempts (string);
+CREATE INDEX IF NOT EXISTS attempts_timestamp ON attempts (timestamp);
+'''
+
+# databases from before attempts were recorded with their instrument, whose old attempts are left
+# without one as it isn't known
+MIGRATE_INSTRUMENT = 'ALTER TABLE attempts ADD COLUMN instrument TEXT'
+
+INSTRUMENT_INDEX = 'CREATE INDEX IF NOT EXISTS attempts_instrument ON attempts (instrument, id)'
+
+COLUMNS = ', '.join(Attempt._fields)
+
+INSERT = '''
+INSERT INTO attempts (game, instrument, fret, string, expected, answered, correct, latency, timestamp)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+class HistoryStore:
+    """
+    Durable log of every attempt, kept in SQLite. record() only queues the attempt; a background
+    thread creates the database and writes queued attempts in batches, so the render thread never
+    waits on the disk. A batch that can't be written is logged and dropped, and if the writer can't
+    open the database at all the store stops accepting attempts and queries return nothing.
+    """
+
+    _STOP = object()
+
+    def __init__(self, path, batch_size=64, flush_interval=1.0):
+        self._path = path
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._queue = queue.Queue()
+        # guards _accepting, so nothing is queued after the writer has stopped taking items
+        self._lock = threading.Lock()
+        self._accepting = True
+
+        # set once the writer has created the database, or given up on it
+        self._ready = threading.Event()
+        self._opened = False
+
+        self._writer = threading.Thread(target=self._write_loop, name='history-writer', daemon=True)
+        self._writer.start()
+
+    @property
+    def failed(self):
+        """Whether the writer couldn't open the database"""
+        return self._ready.is_set() and not self._opened
+
+    def _connect(self):
+        connection = sqlite3.connect(self._path)
+        # readers don't block the writer thread, and vice versa
+        connection.execute('PRAGMA journal_mode=WAL')
+        return connection
+
+    def record(self, game, instrument, fret, string, expected, answered, correct, latency, timestamp=None):
+        """Queue an attempt, instrument being the name of the instrument it was played on"""
+        with self._lock:
+            if not self._accepting:
+                return
+
+            self._queue.put((
+                game, instrument, fret, string, expected, answered, int(correct), latency,
+                time.time() if timestamp is None else timestamp,
+            ))
+
+    def _stop_accepting(self):
+        """Refuse further attempts and drop the queued ones, so flush() doesn't wait on a dead writer"""
+        with self._lock:
+            self._accepting = False
+
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._queue.task_done()
+
+    def _open(self):
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        connection = self._connect()
+        try:
+            connection.executescript(SCHEMA)
+
+            columns = [row[1] for row in connection.execute('PRAGMA table_info(attempts)')]
+            if 'instrument' not in columns:
+                connection.execute(MIGRATE_INSTRUMENT)
+            connection.execute(INSTRUMENT_INDEX)
+        except Exception:
+            connection.close()
+            raise
+
+        return connection
+
+    def _write_loop(self):
+        try:
+            connection = self._open()
+        except Exception:
+            logger.exception('could not open the practice history at %s, attempts will not be saved', self._path)
+            self._ready.set()
+            self._stop_accepting()
+            return
+
+        self._opened = True
+        self._ready.set()
+
+        stopping = False
+
+        while not stopping:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self._flush_interval
+
+            # close() shouldn't wait out the flush interval
+            while len(batch) < self._batch_size and batch[-1] is not self._STOP:
+                try:
+                    batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+
+            rows = [item for item in batch if item is not self._STOP]
+            stopping = len(rows) != len(batch)
+
+            try:
+                if rows:
+                    with connection:
+                        connection.executemany(INSERT, rows)
+            except Exception:
+                logger.exception('could not write %d attempts to the practice history', len(rows))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+        connection.close()
+
+    def flush(self):
+        """Block until every attempt recorded so far has been written"""
+        self._ready.wait()
+        self._queue.join()
+
+    def close(self):
+        with self._lock:
+            if self._accepting:
+                self._accepting = False
+                self._queue.put(self._STOP)
+
+        self._writer.join()
+
+    def attempts(self, note=None, string=None, start=None, end=None, game=None, instrument=None):
+        """
+        Query the written attempts, oldest first. Attempts still queued for the writer aren't included,
+        call flush() first if they're needed.
+        :param note: expected note name
+        :param string: string index
+        :param start: earliest timestamp (inclusive)
+        :param end: latest timestamp (exclusive)
+        :param game: game name
+        :param instrument: instrument name
+        """
+        clauses = []
+        params = []
+
+        for clause, value in (('expected = ?', note), ('string = ?', string), ('timestamp >= ?', start),
+                              ('timestamp < ?', end), ('game = ?', game), ('instrument = ?', instrument)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+
+        sql = 'SELECT {} FROM attempts'.format(COLUMNS)
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY id'
+
+        return [Attempt(*row) for row in self._query(sql, params)]
+
+    def position_rows(self, after_id=0, instrument=None):
+        """
+        Return (id, fret, string, correct, latency) for every written attempt with an id above after_id,
+        as plain tuples suitable for bulk conversion into arrays. Given an instrument name, only attempts
+        played on that instrument are returned, as positions on different boards don't add up.
+        """
+        if instrument is None:
+            return self._query(
+                'SELECT id, fret, string, correct, latency FROM attempts WHERE id > ? ORDER BY id', (after_id,)
+            )
+
+        return self._query(
+            'SELECT id, fret, string, correct, latency FROM attempts WHERE instrument = ? AND id > ? ORDER BY id',
+            (instrument, after_id)
+        )
+
+    def _query(self, sql, params):
+        """Run a query on a connection of its own, once the writer has created the database"""
+        self._ready.wait()
+        if not self._opened:
+            return []
+
+        connection = self._connect()
+        try:
+            return connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+
+
+_store = None
+
+
+def get_store():
+    """Return the shared history store, opening it on first use. None if history is disabled or unavailable."""
+    global _store
+
+    if _store is None and config.HISTORY_PATH:
+        try:
+            _store = HistoryStore(config.HISTORY_PATH)
+        except Exception:
+            logger.exception('could not start the practice history, attempts will not be saved')
+
+    if _store is not None and _store.failed:
+        return None
+
+    return _store
+
+
+def close_store():
+    """Write any outstanding attempts and close the shared store"""
+    global _store
+
+    if _store is not None:
+        _store.close()
+        _store = None
@@ -0,0 +1,96 @@
+"""
+The instruments games can be played on, and the fretboard geometry derived from them
+"""
+from array import array
+from collections import namedtuple
+from functools import lru_cache
+
+import constants as const
+from utils import compile_tuning
+
+# frets counts the positions on each string shown, the open string being fret 0, and lowest_octave is
+# the octave of the lowest open string
+_Instrument = namedtuple('Instrument', ['name', 'tuning', 'frets', 'lowest_octave'])
+
+
+class Instrument(_Instrument):
+    __slots__ = ()
+
+    @property
+    def strings(self):
+        return len(self.tuning)
+
+    @property
+    def bounds(self):
+        """Every position on the board as (min string, max string, min fret, max fret + 1)"""
+        return 0, self.strings - 1, 0, self.frets
+
+    @property
+    def table(self):
+        return compile_tuning(self.tuning, self.frets, self.lowest_octave)
+
+
+INSTRUMENTS = {
+    'guitar': Instrument('Guitar', tuple(const.GUITAR_STANDARD_TUNING), 13, 2),
+    'guitar_drop_d': Instrument('Guitar, drop D', tuple(const.GUITAR_DROP_D_TUNING), 13, 2),
+    'guitar_dadgad': Instrument('Guitar, DADGAD', tuple(const.GUITAR_DADGAD_TUNING), 13, 2),
+    'guitar_open_g': Instrument('Guitar, open G', tuple(const.GUITAR_OPEN_G_TUNING), 13, 2),
+    'guitar_7': Instrument('7 string guitar', tuple(const.GUITAR_7_STRING_TUNING), 13, 1),
+    'guitar_8': Instrument('8 string guitar', tuple(const.GUITAR_8_STRING_TUNING), 13, 1),
+    'bass': Instrument('Bass', tuple(const.BASS_STANDARD_TUNING), 13, 1),
+    'bass_5': Instrument('5 string bass', tuple(const.BASS_5_STRING_TUNING), 13, 0),
+}
+
+
+def get_instrument(game_config):
+    """
+    The instrument a game config asks for, either an 'instrument' name from INSTRUMENTS or just a
+    'tuning', with an optional 'frets' for a longer or shorter board
+    """
+    if 'instrument' in game_config:
+        instrument = INSTRUMENTS[game_config['instrument']]
+    else:
+        tuning = tuple(game_config['tuning'])
+        # a registered tuning knows its octave. Custom tunings are named after their strings, so
+        # the practice history keeps each one apart
+        instrument = next((instrument for instrument in INSTRUMENTS.values() if instrument.tuning == tuning),
+                          Instrument('Custom ' + ' '.join(tuning), tuning, 13, 2))
+
+    if game_config.get('frets'):
+        instrument = instrument._replace(frets=game_config['frets'])
+
+    return instrument
+
+
+@lru_cache(maxsize=None)
+def fret_positions(frets, tempered=True):
+    """
+    Where each fret lies between the nut (0) and the last fret (1). Tempered frets are placed as on a
+    real neck, each 2 ** (-1/12) of the distance from the previous fret to the bridge, so that every
+    fret raises the string a semitone; otherwise they're evenly spaced.
+    """
+    last = frets - 1
+
+    if tempered:
+        length = 1 - 2 ** (-last / 12)
+        return array('d', ((1 - 2 ** (-fret / 12)) / length for fret in range(frets)))
+
+    return array('d', (fret / last for fret in range(frets)))
+
+
+@lru_cache(maxsize=None)
+def inlays(frets, strings):
+    """
+    The (fret, string position) of each inlay dot on a board, string positions counting from the top
+    string with halves falling between two strings
+    """
+    middle = (strings - 1) / 2
+    dots = []
+
+    for fret in range(1, frets):
+        if fret in const.INLAY_FRETS:
+            dots.append((fret, middle))
+        elif fret in const.DOUBLE_INLAY_FRETS:
+            dots.extend(((fret, middle - 1), (fret, middle + 1)))
+
+    return tuple(dots)
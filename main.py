@@ -1,39 +1,167 @@
+import time
+
+# taken before the other imports so the startup report includes them
+_process_start = time.perf_counter()
+
 import pygame
 
 import config
-from scenes import MenuScene
+import history
+import recording
+import synth
+import timer
+from profiler import FrameProfiler, StartupTimer
+from scenes import SceneManager
+from scheduler import FrameScheduler
+from timer import FrameClock
+from ui import layout
+
+# custom events such as detected notes are allocated upwards from USEREVENT
+USER_EVENTS = list(range(pygame.USEREVENT, pygame.USEREVENT + 64))
+
+# the only events queued in low latency mode, resizes arriving as window events
+INPUT_EVENTS = [
+    pygame.QUIT, pygame.KEYDOWN, pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.VIDEORESIZE,
+    pygame.WINDOWRESIZED, pygame.WINDOWSIZECHANGED,
+] + USER_EVENTS
+
+# events whose response is timed from their arrival to the screen
+FEEDBACK_EVENTS = (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN)
+
+# in low latency mode these draw a frame as soon as they arrive, rather than at the next frame
+WAKE_EVENTS = (pygame.QUIT,) + FEEDBACK_EVENTS + tuple(USER_EVENTS)
+
+
+def _input_time(events, received_at):
+    """When the earliest input among a frame's events arrived, or None if there was none"""
+    times = [
+        getattr(event, 'detected_at', received_at) for event in events
+        if event.type in FEEDBACK_EVENTS or event.type >= pygame.USEREVENT
+    ]
+    return min(times) if times else None
 
 
 def game_loop():
 
-    current_scene = MenuScene()
+    scenes = SceneManager()
+    current_scene = scenes.switch('menu')
 
     while True:
-        if pygame.event.get(pygame.QUIT):
+        profiler.begin_frame()
+
+        events = scheduler.get_events(current_scene)
+        # in whole microseconds, so that a replay reads exactly the same times
+        received_at = round(time.perf_counter() * 1e6)
+
+        if frame_clock is not None:
+            frame_clock.advance_to(received_at / 1e6)
+
+        if recorder is not None:
+            recorder.record_frame(events, received_at)
+        profiler.end_phase('events')
+
+        if any(event.type == pygame.QUIT for event in events):
             current_scene.cleanup()
+
+            if recorder is not None:
+                recorder.save(scenes)
             break
 
-        for event in pygame.event.get():
+        for event in events:
+            if event.type == pygame.KEYDOWN and event.key == config.PROFILER_OVERLAY_KEY:
+                profiler.toggle_overlay()
+                current_scene.invalidate()
+                continue
+
+            if event.type == pygame.VIDEORESIZE:
+                # the display surface follows the window, so lay the scene out again to fit it
+                layout.resize(*screen.get_size())
+                current_scene.invalidate()
+                continue
+
             new_scene = current_scene.handle_event(event)
 
             if new_scene:
-                current_scene = new_scene
+                current_scene = scenes.switch(new_scene)
+        profiler.end_phase('handle_event')
 
         current_scene.draw(screen)
+        dirty_rects = current_scene.get_dirty_rects()
+
+        if profiler.overlay_visible:
+            overlay_rect = profiler.draw_overlay(screen)
+            if dirty_rects is not None:
+                dirty_rects.append(overlay_rect)
+        profiler.end_phase('draw')
+
         current_scene.update()
+        profiler.end_phase('update')
+
+        if not config.DIRTY_RECTS or dirty_rects is None:
+            pygame.display.flip()
+        elif dirty_rects:
+            pygame.display.update(dirty_rects)
+        profiler.end_phase('present')
+
+        presented_at = round(time.perf_counter() * 1e6)
+
+        input_at = _input_time(events, received_at / 1e6)
+        if input_at is not None:
+            profiler.record_input_latency(presented_at / 1e6 - input_at)
+
+        # response times are measured from the frame showing the question reaching the screen
+        if config.LOW_LATENCY and current_scene.presented(presented_at / 1e6) and recorder is not None:
+            recorder.record_present(presented_at)
 
-        pygame.display.flip()
-        clock.tick(60)
+        if not startup.finished:
+            startup.finish()
+
+            if config.STARTUP_REPORT:
+                print(startup.report())
+
+        # use idle time to get the next scene ready
+        if not current_scene.is_animating():
+            scenes.prebuild()
 
 
 if __name__ == "__main__":
+    startup = StartupTimer(_process_start)
+    startup.mark('import')
+
+    pygame.mixer.pre_init(config.AUDIO_SAMPLE_RATE, -16, 1, config.MIXER_BUFFER)
     pygame.init()
+    startup.mark('pygame.init')
+
+    scheduler = FrameScheduler(config.ACTIVE_FPS, config.IDLE_FPS, WAKE_EVENTS if config.LOW_LATENCY else ())
+    profiler = FrameProfiler(config.PROFILER_WINDOW)
+    profiler.startup = startup
+    screen = pygame.display.set_mode((config.SCREEN_WIDTH, config.SCREEN_HEIGHT),
+                                     pygame.RESIZABLE if config.RESIZABLE else 0)
+    layout.resize(*screen.get_size())
+    startup.mark('display setup')
+
+    if config.LOW_LATENCY:
+        # nothing else wakes the loop or queues up ahead of input
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(INPUT_EVENTS)
+
+    recorder = None
+    if config.RECORDING_PATH:
+        recorder = recording.Recorder(config.RECORDING_PATH)
+        recorder.start(screen.get_size())
 
-    clock = pygame.time.Clock()
-    screen = pygame.display.set_mode((config.SCREEN_WIDTH, config.SCREEN_HEIGHT))
+    # game timers read the time each frame's input arrived, the same throughout the frame
+    frame_clock = None
+    if recorder is not None or config.LOW_LATENCY:
+        frame_clock = timer.default_clock = FrameClock()
 
-    config.init_fonts()
+    try:
+        game_loop()
+    finally:
+        history.close_store()
+        synth.close_sample_cache()
 
-    game_loop()
+        if config.PROFILER_DUMP_PATH:
+            profiler.dump(config.PROFILER_DUMP_PATH)
 
     pygame.quit()
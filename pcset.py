@@ -0,0 +1,109 @@
+"""
+Pitch class sets as 12 bit integers, bit n set when the pitch class n semitones above C is in the set
+"""
+import constants as const
+from utils import PITCH_CLASSES
+
+FULL_MASK = 0xFFF
+
+
+class PitchClassSet(int):
+    """An immutable set of pitch classes. It's an int, so it can index a table directly."""
+
+    __slots__ = ()
+
+    def __new__(cls, mask=0):
+        return super().__new__(cls, mask & FULL_MASK)
+
+    @classmethod
+    def from_pitch_classes(cls, pitch_classes):
+        mask = 0
+        for pitch_class in pitch_classes:
+            mask |= 1 << pitch_class % 12
+        return cls(mask)
+
+    @classmethod
+    def from_notes(cls, notes):
+        """From note names, sharps or flats"""
+        return cls.from_pitch_classes(PITCH_CLASSES[note] for note in notes)
+
+    def transpose(self, semitones):
+        """Move every pitch class up by `semitones`, a rotation of the 12 bits"""
+        semitones %= 12
+        return PitchClassSet((self << semitones | self >> (12 - semitones)) & FULL_MASK)
+
+    def issubset(self, other):
+        return self & ~other & FULL_MASK == 0
+
+    def issuperset(self, other):
+        return other & ~self & FULL_MASK == 0
+
+    def union(self, other):
+        return PitchClassSet(self | other)
+
+    def add(self, pitch_class):
+        return PitchClassSet(self | 1 << pitch_class % 12)
+
+    def __contains__(self, pitch_class):
+        return bool(self >> pitch_class % 12 & 1)
+
+    def __iter__(self):
+        return (pitch_class for pitch_class in range(12) if self >> pitch_class & 1)
+
+    def __len__(self):
+        return bin(self).count('1')
+
+    def notes(self):
+        return [const.NOTES[pitch_class] for pitch_class in self]
+
+    def name(self):
+        """What the set is called, a single lookup"""
+        return NAMES[self]
+
+    def __repr__(self):
+        return 'PitchClassSet({})'.format(' '.join(self.notes()))
+
+
+def _build_names():
+    """
+    Name every one of the 4096 sets. Chords are preferred to scales, then intervals and single notes;
+    anything else is listed by its notes. Within each kind the first reading found wins, in the order
+    of const.CHORDS and const.SCALES with roots from C upwards.
+    """
+    names = [None] * (FULL_MASK + 1)
+    names[0] = ''
+
+    def name_all(shapes, describe):
+        for shape, intervals in shapes:
+            base = PitchClassSet.from_pitch_classes(intervals)
+            for root, note in enumerate(const.NOTES):
+                mask = base.transpose(root)
+                if names[mask] is None:
+                    names[mask] = describe(note, shape)
+
+    name_all(((quality, intervals) for quality, (_, intervals) in const.CHORDS.items()),
+             lambda root, quality: '{}{} chord'.format(root, const.CHORDS[quality][0]))
+    name_all(const.SCALES.items(), '{} {} scale'.format)
+    # each pair of notes is read as whichever of its two intervals comes first here
+    name_all(((interval, (0, interval)) for interval in (7, 4, 3, 10, 11, 6)),
+             lambda root, interval: '{} + {} ({})'.format(
+                 root, const.NOTES[(PITCH_CLASSES[root] + interval) % 12], const.INTERVALS[interval]))
+    name_all((('', (0,)),), lambda root, _: root)
+
+    # each set's notes are its lowest note followed by the notes of the set without it
+    listed = [()] * (FULL_MASK + 1)
+    for mask in range(1, FULL_MASK + 1):
+        listed[mask] = (const.NOTES[(mask & -mask).bit_length() - 1],) + listed[mask & (mask - 1)]
+
+        if names[mask] is None:
+            names[mask] = ' '.join(listed[mask])
+
+    return tuple(names)
+
+
+NAMES = _build_names()
+
+
+def recognise(pitch_classes):
+    """Name the chord or scale that an iterable of pitch classes forms"""
+    return NAMES[PitchClassSet.from_pitch_classes(pitch_classes)]
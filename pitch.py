@@ -0,0 +1,434 @@
+"""
+Real-time pitch detection for playing notes on a real guitar.
+
+Audio flows from an AudioSource (the microphone, a WAV file or a synthetic tone) into a ring buffer.
+A PitchListener thread analyses the newest window every hop with a PitchDetector, and posts a
+NOTE_DETECTED event to pygame each time a new stable note starts. Every buffer on that path is
+allocated once up front.
+"""
+import inspect
+import math
+import threading
+import time
+import wave
+
+import numpy as np
+import pygame
+
+import constants as const
+
+NOTE_DETECTED = pygame.event.custom_type()
+
+# NumPy 2 can write FFTs into preallocated arrays, older versions allocate their results
+_FFT_OUT = 'out' in inspect.signature(np.fft.rfft).parameters
+
+
+class RingBuffer:
+    """Fixed size float32 sample buffer, written by an audio thread and read by the listener"""
+
+    def __init__(self, size):
+        self._data = np.zeros(size, dtype=np.float32)
+        self._size = size
+        self._written = 0
+        self._condition = threading.Condition()
+
+    @property
+    def written(self):
+        """Total samples ever written"""
+        return self._written
+
+    def write(self, samples):
+        with self._condition:
+            samples = samples[-self._size:]
+            start = self._written % self._size
+            first = min(len(samples), self._size - start)
+
+            self._data[start:start + first] = samples[:first]
+            self._data[:len(samples) - first] = samples[first:]
+
+            self._written += len(samples)
+            self._condition.notify_all()
+
+    def wait_for(self, total, timeout=None):
+        """Block until at least `total` samples have been written, returning whether they have"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._written >= total, timeout)
+
+    def latest(self, out):
+        """Copy the newest len(out) samples into `out`, oldest first"""
+        with self._condition:
+            count = len(out)
+            end = self._written % self._size
+            start = end - count
+
+            if start >= 0:
+                out[:] = self._data[start:end]
+            else:
+                out[:-start] = self._data[start:]
+                out[-start:] = self._data[:end]
+
+        return out
+
+
+class AudioSource:
+    """Fills a ring buffer with mono float32 samples in the range -1..1"""
+
+    def __init__(self, sample_rate, buffer_seconds=1.0):
+        self.sample_rate = sample_rate
+        self.buffer = RingBuffer(int(sample_rate * buffer_seconds))
+
+    def start(self):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+
+class MicrophoneSource(AudioSource):
+    """Captures from an SDL recording device, by default the first one. start() raises RuntimeError if it can't."""
+
+    def __init__(self, sample_rate, device_name=None, chunk_size=256, **kwargs):
+        super().__init__(sample_rate, **kwargs)
+        self._device_name = device_name
+        self._chunk_size = chunk_size
+        self._device = None
+
+    def _capture(self, device, data):
+        self.buffer.write(np.frombuffer(data, dtype=np.float32))
+
+    def start(self):
+        from pygame._sdl2.audio import AudioDevice, AUDIO_F32, get_audio_device_names
+
+        device_name = self._device_name
+        if device_name is None:
+            # SDL needs a device name, so use the first recording device it reports
+            names = get_audio_device_names(True)
+            if not names:
+                raise pygame.error('no audio recording device found')
+            device_name = names[0]
+
+        self._device = AudioDevice(
+            devicename=device_name,
+            iscapture=True,
+            frequency=self.sample_rate,
+            audioformat=AUDIO_F32,
+            numchannels=1,
+            chunksize=self._chunk_size,
+            allowed_changes=0,
+            callback=self._capture,
+        )
+        self._device.pause(0)
+
+    def stop(self):
+        if self._device is not None:
+            self._device.close()
+            self._device = None
+
+
+class _BlockSource(AudioSource):
+    """A source that produces fixed size blocks on its own thread, paced to real time unless told not to be"""
+
+    def __init__(self, sample_rate, block_size=256, realtime=True, **kwargs):
+        super().__init__(sample_rate, **kwargs)
+        self._block = np.zeros(block_size, dtype=np.float32)
+        self._realtime = realtime
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def fill(self, block):
+        """Fill `block` with the next samples, returning False when there are no more"""
+        raise NotImplementedError
+
+    def _run(self):
+        block_duration = len(self._block) / self.sample_rate
+        next_block = time.perf_counter()
+
+        while not self._stopped.is_set() and self.fill(self._block):
+            self.buffer.write(self._block)
+
+            if self._realtime:
+                next_block += block_duration
+                delay = next_block - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class WavFileSource(_BlockSource):
+    """Streams a PCM WAV file, mixing multiple channels down to mono"""
+
+    def __init__(self, path, block_size=256, loop=False, **kwargs):
+        self._wav = wave.open(path, 'rb')
+        self._loop = loop
+        self._channels = self._wav.getnchannels()
+        self._sample_width = self._wav.getsampwidth()
+
+        if self._sample_width not in (1, 2, 4):
+            raise ValueError('unsupported WAV sample width: {} bytes'.format(self._sample_width))
+
+        super().__init__(self._wav.getframerate(), block_size=block_size, **kwargs)
+
+    def fill(self, block):
+        frames = self._wav.readframes(len(block))
+
+        if not frames:
+            if not self._loop:
+                return False
+            self._wav.rewind()
+            frames = self._wav.readframes(len(block))
+
+        if self._sample_width == 1:
+            samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+        else:
+            dtype = np.int16 if self._sample_width == 2 else np.int32
+            samples = np.frombuffer(frames, dtype=dtype) / float(np.iinfo(dtype).max)
+
+        samples = samples.reshape(-1, self._channels).mean(axis=1)
+
+        block[:len(samples)] = samples
+        block[len(samples):] = 0
+        return True
+
+    def stop(self):
+        super().stop()
+        self._wav.close()
+
+
+class SyntheticSource(_BlockSource):
+    """
+    Generates a plucked-string-like tone with a few harmonics, as a stand-in for a guitar. Set
+    `frequency` to change note, or to None for silence.
+    """
+
+    HARMONICS = (1.0, 0.5, 0.3, 0.15)
+
+    def __init__(self, sample_rate, frequency=None, amplitude=0.5, **kwargs):
+        super().__init__(sample_rate, **kwargs)
+        self.frequency = frequency
+        self.amplitude = amplitude
+        self._phase = 0.0
+        self._steps = np.arange(len(self._block), dtype=np.float64)
+        self._phases = np.zeros(len(self._block), dtype=np.float64)
+        self._scratch = np.zeros(len(self._block), dtype=np.float64)
+
+    def fill(self, block):
+        frequency = self.frequency
+
+        if not frequency:
+            block[:] = 0
+            return True
+
+        step = 2 * math.pi * frequency / self.sample_rate
+        np.multiply(self._steps, step, out=self._phases)
+        self._phases += self._phase
+
+        block[:] = 0
+        for harmonic, level in enumerate(self.HARMONICS, 1):
+            np.multiply(self._phases, harmonic, out=self._scratch)
+            np.sin(self._scratch, out=self._scratch)
+            self._scratch *= level * self.amplitude / sum(self.HARMONICS)
+            block += self._scratch.astype(np.float32, copy=False)
+
+        self._phase = (self._phase + step * len(block)) % (2 * math.pi)
+        return True
+
+
+class PitchDetector:
+    """
+    Estimates the fundamental frequency of a window of samples using the normalised square difference
+    function (the McLeod pitch method), with the autocorrelation computed by FFT.
+    """
+
+    def __init__(self, sample_rate, window_size, min_frequency=70, max_frequency=1400,
+                 clarity=0.7, peak_ratio=0.9, silence_rms=0.01):
+        self.sample_rate = sample_rate
+        self.window_size = window_size
+        self._clarity = clarity
+        self._peak_ratio = peak_ratio
+        self._silence_rms = silence_rms
+
+        self._min_lag = max(2, int(sample_rate / max_frequency))
+        self._max_lag = min(window_size - 2, int(sample_rate / min_frequency))
+
+        # zero padding to at least twice the window makes the FFT autocorrelation linear, not circular
+        self._fft_size = 1 << (2 * window_size - 1).bit_length()
+        self._padded = np.zeros(self._fft_size, dtype=np.float64)
+        self._spectrum = np.zeros(self._fft_size // 2 + 1, dtype=np.complex128)
+        self._conjugate = np.zeros(self._fft_size // 2 + 1, dtype=np.complex128)
+        self._autocorrelation = np.zeros(self._fft_size, dtype=np.float64)
+        self._squares = np.zeros(window_size, dtype=np.float64)
+        self._cumulative = np.zeros(window_size + 1, dtype=np.float64)
+        self._energy = np.zeros(window_size, dtype=np.float64)
+        self._positive = np.zeros(window_size, dtype=bool)
+        self._nsdf = np.zeros(window_size, dtype=np.float64)
+
+        # scratch masks over the lags searched for peaks, with a neighbour on either side
+        searched = self._max_lag - self._min_lag + 1
+        self._is_peak = np.zeros(searched, dtype=bool)
+        self._mask = np.zeros(searched, dtype=bool)
+
+    def detect(self, samples):
+        """Return the frequency in Hz of a window of samples, or None for silence or no clear pitch"""
+        window_size = self.window_size
+        frame = self._padded[:window_size]
+        frame[:] = samples
+
+        if math.sqrt(np.dot(frame, frame) / window_size) < self._silence_rms:
+            return None
+
+        if _FFT_OUT:
+            spectrum = np.fft.rfft(self._padded, out=self._spectrum)
+        else:
+            spectrum = self._spectrum
+            spectrum[:] = np.fft.rfft(self._padded)
+
+        np.conjugate(spectrum, out=self._conjugate)
+        spectrum *= self._conjugate
+
+        if _FFT_OUT:
+            np.fft.irfft(spectrum, self._fft_size, out=self._autocorrelation)
+        else:
+            self._autocorrelation[:] = np.fft.irfft(spectrum, self._fft_size)
+        autocorrelation = self._autocorrelation[:window_size]
+
+        # m(k) = sum of x[j]^2 + x[j+k]^2 over the overlap, from the running sum of squares: the total
+        # less the squares falling outside the overlap, cumulative[n - k] - cumulative[k]
+        cumulative = self._cumulative
+        np.multiply(frame, frame, out=self._squares)
+        np.cumsum(self._squares, out=cumulative[1:])
+        energy = self._energy
+        np.subtract(cumulative[window_size:0:-1], cumulative[:window_size], out=energy)
+        energy += cumulative[-1]
+
+        # nsdf(k) = 2 r(k) / m(k), the 2 folded into m
+        energy *= 0.5
+        np.greater(energy, 0, out=self._positive)
+        self._nsdf.fill(0)
+        np.divide(autocorrelation, energy, out=self._nsdf, where=self._positive)
+
+        nsdf = self._nsdf[self._min_lag - 1:self._max_lag + 2]
+        middle = nsdf[1:-1]
+        is_peak, mask = self._is_peak, self._mask
+        np.greater(middle, nsdf[:-2], out=is_peak)
+        np.greater_equal(middle, nsdf[2:], out=mask)
+        is_peak &= mask
+        np.greater(middle, 0, out=mask)
+        is_peak &= mask
+
+        if not is_peak.any():
+            return None
+
+        best = np.max(middle, where=is_peak, initial=-np.inf)
+        if best < self._clarity:
+            return None
+
+        # the first peak close to the highest avoids picking an octave below the fundamental
+        np.greater_equal(middle, self._peak_ratio * best, out=mask)
+        mask &= is_peak
+        lag = int(np.argmax(mask)) + self._min_lag
+
+        # parabolic interpolation between neighbouring lags
+        left, centre, right = self._nsdf[lag - 1], self._nsdf[lag], self._nsdf[lag + 1]
+        denominator = left - 2 * centre + right
+        offset = 0.5 * (left - right) / denominator if denominator else 0
+
+        return self.sample_rate / (lag + offset)
+
+
+def frequency_to_note(frequency):
+    """Return the nearest note name in const.NOTES and how far off it is in cents"""
+    midi = 69 + 12 * math.log2(frequency / 440)
+    nearest = int(round(midi))
+    return const.NOTES[nearest % 12], (midi - nearest) * 100
+
+
+class PitchListener:
+    """
+    Runs pitch detection on a background thread. A NOTE_DETECTED event (with note, frequency, cents and
+    detected_at attributes) is posted when the same note has been heard for `stable_frames` analyses in
+    a row and differs from the previous note, or follows silence.
+    """
+
+    EVENT = NOTE_DETECTED
+
+    def __init__(self, source, window_size=1024, hop_size=256, stable_frames=2, **detector_kwargs):
+        self.source = source
+        self.detector = PitchDetector(source.sample_rate, window_size, **detector_kwargs)
+        self._hop_size = hop_size
+        self._stable_frames = stable_frames
+        self._window = np.zeros(window_size, dtype=np.float32)
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def window_duration(self):
+        """Seconds of audio each analysis covers, the main part of the detection latency"""
+        return self.detector.window_size / self.source.sample_rate
+
+    def start(self):
+        self._stopped.clear()
+        self.source.start()
+        self._thread = threading.Thread(target=self._run, name='pitch-listener', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.source.stop()
+
+    def _run(self):
+        buffer = self.source.buffer
+        next_analysis = max(buffer.written, len(self._window))
+
+        candidate = None
+        candidate_count = 0
+        last_note = None
+
+        while not self._stopped.is_set():
+            if not buffer.wait_for(next_analysis, timeout=0.1):
+                continue
+
+            # if analysis falls behind, skip to the newest audio rather than queueing up
+            next_analysis = max(next_analysis, buffer.written - self._hop_size) + self._hop_size
+
+            frequency = self.detector.detect(buffer.latest(self._window))
+
+            if frequency is None:
+                candidate, candidate_count, last_note = None, 0, None
+                continue
+
+            note, cents = frequency_to_note(frequency)
+
+            if note == candidate:
+                candidate_count += 1
+            else:
+                candidate, candidate_count = note, 1
+
+            if candidate_count == self._stable_frames and note != last_note:
+                last_note = note
+                pygame.event.post(pygame.event.Event(
+                    NOTE_DETECTED, note=note, frequency=frequency, cents=cents, detected_at=time.perf_counter()))
+
+
+def create_source(spec, sample_rate):
+    """
+    Build the source named by config.AUDIO_INPUT: 'microphone', 'synthetic', or the path of a WAV file
+    """
+    if spec == 'microphone':
+        return MicrophoneSource(sample_rate)
+    elif spec == 'synthetic':
+        return SyntheticSource(sample_rate)
+
+    return WavFileSource(spec, loop=True)
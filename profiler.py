@@ -0,0 +1,184 @@
+from collections import deque
+import json
+import time
+
+import pygame
+
+import config
+
+# upper bounds in milliseconds of the histogram buckets, the last one catches everything slower
+HISTOGRAM_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 33, 66, float('inf'))
+
+
+class RollingHistogram:
+    """Bucketed histogram over the most recent `window` samples"""
+
+    def __init__(self, window):
+        self._samples = deque(maxlen=window)
+        self.counts = [0] * len(HISTOGRAM_BUCKETS)
+
+    @staticmethod
+    def _bucket(sample_ms):
+        for i, upper in enumerate(HISTOGRAM_BUCKETS):
+            if sample_ms <= upper:
+                return i
+
+    def add(self, sample):
+        """Add a duration in seconds"""
+        if len(self._samples) == self._samples.maxlen:
+            self.counts[self._bucket(self._samples[0] * 1000)] -= 1
+
+        self._samples.append(sample)
+        self.counts[self._bucket(sample * 1000)] += 1
+
+    def percentile(self, percentile):
+        """Return the percentile of the window in milliseconds"""
+        if not self._samples:
+            return 0
+
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(percentile / 100 * len(ordered)))] * 1000
+
+    def mean(self):
+        if not self._samples:
+            return 0
+
+        return sum(self._samples) / len(self._samples) * 1000
+
+    def summary(self):
+        return {
+            'samples': len(self._samples),
+            'mean': self.mean(),
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'histogram': {
+                str(upper): count for upper, count in zip(HISTOGRAM_BUCKETS, self.counts)
+            },
+        }
+
+
+class FrameProfiler:
+    """
+    Times the phases of each pass through the game loop. Call begin_frame() at the top of the loop and
+    end_phase() as each phase completes.
+    """
+
+    # 'events' includes the scheduler's deliberate waiting, so it isn't reported as the slowest phase
+    PHASES = ('events', 'handle_event', 'update', 'draw', 'present')
+    WORK_PHASES = PHASES[1:]
+
+    def __init__(self, window=600):
+        self.phases = {phase: RollingHistogram(window) for phase in self.PHASES}
+        self.frames = RollingHistogram(window)
+        # from input arriving to the frame showing the response to it being presented
+        self.input_latency = RollingHistogram(window)
+        self.overlay_visible = False
+        self.startup = None
+
+        self._frame_start = None
+        self._mark = None
+        self._frame_phases = dict.fromkeys(self.PHASES, 0)
+
+    def begin_frame(self):
+        now = time.perf_counter()
+
+        if self._frame_start is not None:
+            self.frames.add(now - self._frame_start)
+
+            for phase, duration in self._frame_phases.items():
+                self.phases[phase].add(duration)
+                self._frame_phases[phase] = 0
+
+        self._frame_start = self._mark = now
+
+    def end_phase(self, phase):
+        """Attribute the time since the previous phase ended to `phase`"""
+        now = time.perf_counter()
+        self._frame_phases[phase] += now - self._mark
+        self._mark = now
+
+    def record_input_latency(self, latency):
+        self.input_latency.add(latency)
+
+    def fps(self):
+        mean = self.frames.mean()
+        return 1000 / mean if mean else 0
+
+    def slowest_phase(self):
+        return max(self.WORK_PHASES, key=lambda phase: self.phases[phase].mean())
+
+    def summary(self):
+        return {
+            'fps': self.fps(),
+            'startup': self.startup.summary() if self.startup else None,
+            'frame': self.frames.summary(),
+            'input_latency': self.input_latency.summary(),
+            'phases': {phase: histogram.summary() for phase, histogram in self.phases.items()},
+            'slowest_phase': self.slowest_phase(),
+        }
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def toggle_overlay(self):
+        self.overlay_visible = not self.overlay_visible
+
+    def draw_overlay(self, screen):
+        """Draw the overlay in the bottom left corner and return the rect it covers"""
+        slowest = self.slowest_phase()
+        lines = [
+            'FPS {:.1f}'.format(self.fps()),
+            'frame p50 {:.2f} p90 {:.2f} p99 {:.2f} ms'.format(
+                self.frames.percentile(50), self.frames.percentile(90), self.frames.percentile(99)),
+            'slowest: {} {:.2f} ms'.format(slowest, self.phases[slowest].mean()),
+            'input to screen p50 {:.2f} p99 {:.2f} ms'.format(
+                self.input_latency.percentile(50), self.input_latency.percentile(99)),
+        ]
+
+        # rendered directly, these change every frame and would only push the scenes' text out of ui.text_cache
+        font = config.FONTS['default']
+        images = [font.render(line, True, config.COLOUR_DEFAULT) for line in lines]
+
+        width = max(image.get_width() for image in images) + 10
+        height = sum(image.get_height() for image in images) + 10
+
+        rect = pygame.Rect(0, screen.get_height() - height, width, height)
+        screen.fill(config.COLOUR_BACKGROUND, rect)
+        pygame.draw.rect(screen, config.COLOUR_DEFAULT, rect, 1)
+
+        y = rect.y + 5
+        for image in images:
+            screen.blit(image, (rect.x + 5, y))
+            y += image.get_height()
+
+        return rect
+
+
+class StartupTimer:
+    """Records how long each step of startup takes, from a start time taken before the imports"""
+
+    def __init__(self, start):
+        self._last = start
+        self.start = start
+        self.steps = []
+        self.finished = False
+
+    def mark(self, step):
+        now = time.perf_counter()
+        self.steps.append((step, now - self._last))
+        self._last = now
+
+    def finish(self):
+        """Mark the first frame as presented"""
+        self.mark('first frame')
+        self.finished = True
+
+    def summary(self):
+        summary = {step: duration * 1000 for step, duration in self.steps}
+        summary['time to first frame'] = (self._last - self.start) * 1000
+        return summary
+
+    def report(self):
+        return 'startup: ' + ', '.join('{} {:.1f}ms'.format(step, ms) for step, ms in self.summary().items())
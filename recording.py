@@ -0,0 +1,244 @@
+"""
+Record play sessions and replay them headless.
+
+A recording holds the RNG seed, the settings that change how input lands, and every frame of the
+session: its time, the input events handled in it and, in low latency mode, when it reached the
+screen if a response time is measured from then. While recording, game timers read a clock that
+moves once a frame, so replaying the same events at the same frame times asks the same notes,
+measures the same response times and ends with the same game_stats, as fast as the scenes draw.
+
+Set config.RECORDING_PATH to record a session played through main.py, then:
+
+    python recording.py session.rec.gz
+    python recording.py session.rec.gz --repeat 5
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+import pygame
+
+import config
+import timer
+from timer import FrameClock
+
+FORMAT_VERSION = 3
+
+# the input the game loop acts on, user events being the pitch listener's detected notes
+RECORDED_EVENTS = frozenset((
+    pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP, pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN,
+    pygame.MOUSEBUTTONUP, pygame.VIDEORESIZE,
+))
+
+# settings that change where clicks land or what the games ask, restored before replaying
+RECORDED_SETTINGS = ('INSTRUMENT', 'FRETS', 'TEMPERED_FRETS', 'LOW_LATENCY')
+
+
+def _is_recorded(event):
+    return event.type in RECORDED_EVENTS or event.type >= pygame.USEREVENT
+
+
+def _encode_event(event):
+    """An event as [type, attributes], dropping attributes that aren't plain data such as the window"""
+    return [event.type, {
+        name: value for name, value in event.dict.items()
+        if isinstance(value, (bool, int, float, str, tuple, list))
+    }]
+
+
+def _decode_event(encoded):
+    event_type, attributes = encoded
+    return pygame.event.Event(event_type, {
+        name: tuple(value) if isinstance(value, list) else value for name, value in attributes.items()
+    })
+
+
+def collect_game_stats(scenes):
+    """The game_stats of every game scene a SceneManager has built, as they'd be written to JSON"""
+    return json.loads(json.dumps({
+        name: scene.game_stats for name, scene in scenes.built().items() if hasattr(scene, 'game_stats')
+    }))
+
+
+class Recorder:
+    """
+    Records a session as it's played. start() before any scene is built, record_frame() with each
+    frame's events as soon as they're fetched, record_present() if a scene's response times move to
+    when its frame was presented, and save() at the end. Times are whole microseconds of
+    time.perf_counter(), which game timers read as the same number of seconds, so that a replay
+    summing the same integers reads exactly the same times.
+    """
+
+    def __init__(self, path, seed=None):
+        self.path = path
+        self.seed = seed if seed is not None else random.SystemRandom().randrange(2 ** 32)
+        self._frames = []
+        self._size = None
+        self._start = None
+        self._frame_time = None
+
+    def start(self, size):
+        self._size = list(size)
+        random.seed(self.seed)
+
+    def record_frame(self, events, now):
+        if self._start is None:
+            self._start = self._frame_time = now
+
+        recorded = [_encode_event(event) for event in events if _is_recorded(event)]
+        delta = now - self._frame_time
+        self._frame_time = now
+
+        # frames without input are just their duration
+        self._frames.append([delta, recorded] if recorded else delta)
+
+    def record_present(self, now):
+        frame = self._frames[-1]
+        if not isinstance(frame, list):
+            frame = self._frames[-1] = [frame, []]
+
+        frame.append(now - self._frame_time)
+
+    def save(self, scenes):
+        recording = {
+            'version': FORMAT_VERSION,
+            'seed': self.seed,
+            'size': self._size,
+            'start': self._start,
+            'settings': {name: getattr(config, name) for name in RECORDED_SETTINGS},
+            'frames': self._frames,
+            'game_stats': collect_game_stats(scenes),
+        }
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # written under a temporary name and then moved, so a reader never sees half a file
+        with gzip.open(self.path + '.tmp', 'wt') as recording_file:
+            json.dump(recording, recording_file, separators=(',', ':'))
+        os.replace(self.path + '.tmp', self.path)
+
+
+def load(path):
+    with gzip.open(path, 'rt') as recording_file:
+        recording = json.load(recording_file)
+
+    if recording['version'] != FORMAT_VERSION:
+        raise ValueError('unsupported recording version: {}'.format(recording['version']))
+
+    return recording
+
+
+def replay(recording):
+    """
+    Play a loaded recording back through fresh scenes, without waiting between frames
+    :return: (game_stats of the replayed session, frames played, seconds taken)
+    """
+    from scenes import SceneManager
+    from ui import layout
+
+    # replays don't add to the practice history, make sounds or listen for a guitar
+    config.HISTORY_PATH = None
+    config.NOTE_PLAYBACK = False
+    config.AUDIO_INPUT = 'synthetic'
+
+    for name, value in recording['settings'].items():
+        setattr(config, name, value)
+
+    clock = FrameClock()
+    timer.default_clock = clock
+    random.seed(recording['seed'])
+
+    screen = pygame.display.set_mode(recording['size'])
+    layout.resize(*screen.get_size())
+
+    scenes = SceneManager()
+    current_scene = scenes.switch('menu')
+
+    started_at = time.perf_counter()
+    frame_time = recording['start']
+    played = 0
+
+    # the same steps as main.game_loop, in the same order
+    for frame in recording['frames']:
+        delta, encoded, *presented = frame if isinstance(frame, list) else (frame, ())
+        frame_time += delta
+        clock.advance_to(frame_time / 1e6)
+        played += 1
+
+        events = [_decode_event(event) for event in encoded]
+
+        if any(event.type == pygame.QUIT for event in events):
+            current_scene.cleanup()
+            break
+
+        for event in events:
+            if event.type == pygame.KEYDOWN and event.key == config.PROFILER_OVERLAY_KEY:
+                current_scene.invalidate()
+                continue
+
+            if event.type == pygame.VIDEORESIZE:
+                screen = pygame.display.set_mode(event.size)
+                layout.resize(*screen.get_size())
+                current_scene.invalidate()
+                continue
+
+            new_scene = current_scene.handle_event(event)
+
+            if new_scene:
+                current_scene = scenes.switch(new_scene)
+
+        current_scene.draw(screen)
+        current_scene.get_dirty_rects()
+        current_scene.update()
+
+        if presented:
+            current_scene.presented((frame_time + presented[0]) / 1e6)
+
+        if not current_scene.is_animating():
+            scenes.prebuild()
+
+    duration = time.perf_counter() - started_at
+    current_scene.cleanup()
+
+    return collect_game_stats(scenes), played, duration
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('recording', help='a file recorded with config.RECORDING_PATH set')
+    parser.add_argument('--repeat', type=int, default=1, help='replay this many times, for timing')
+    args = parser.parse_args(argv)
+
+    recording = load(args.recording)
+    recorded_seconds = sum(frame[0] if isinstance(frame, list) else frame for frame in recording['frames']) / 1e6
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    pygame.init()
+    mismatched = False
+
+    for _ in range(args.repeat):
+        game_stats, frames, duration = replay(recording)
+
+        print('replayed {} frames ({:.1f}s of play) in {:.3f}s, {:.0f} frames/s'.format(
+            frames, recorded_seconds, duration, frames / duration if duration else 0))
+
+        if game_stats != recording['game_stats']:
+            mismatched = True
+            print('game_stats differ from the recording')
+            print('  recorded: {}'.format(json.dumps(recording['game_stats'], sort_keys=True)))
+            print('  replayed: {}'.format(json.dumps(game_stats, sort_keys=True)))
+
+    pygame.quit()
+
+    return 1 if mismatched else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
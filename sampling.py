@@ -0,0 +1,81 @@
+import random
+
+
+class WeightedSampler:
+    """
+    Picks indexes with probability proportional to their weights. The weights are kept in a Fenwick
+    tree, so both picking and changing a weight are O(log n).
+    """
+
+    def __init__(self, weights):
+        self._weights = [float(weight) for weight in weights]
+        self._size = len(self._weights)
+        self._tree = [0.0] * (self._size + 1)
+
+        # build the tree in O(n) by pushing each node's sum up to its parent
+        for i, weight in enumerate(self._weights, 1):
+            self._tree[i] += weight
+            parent = i + (i & -i)
+            if parent <= self._size:
+                self._tree[parent] += self._tree[i]
+
+        # the highest power of two within the tree, where the search descent starts
+        self._top_bit = 1 << (self._size.bit_length() - 1) if self._size else 0
+
+    def __len__(self):
+        return self._size
+
+    def weight(self, index):
+        return self._weights[index]
+
+    def total(self):
+        total = 0.0
+        i = self._size
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def update(self, index, weight):
+        delta = weight - self._weights[index]
+        self._weights[index] = weight
+
+        i = index + 1
+        while i <= self._size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def sample(self, rng=random):
+        """Return a random index, or None if every weight is zero"""
+        total = self.total()
+        if total <= 0:
+            return None
+
+        target = rng.random() * total
+
+        # walk down the tree to the first index whose cumulative weight exceeds target
+        position = 0
+        bit = self._top_bit
+        while bit:
+            next_position = position + bit
+            if next_position <= self._size and self._tree[next_position] <= target:
+                position = next_position
+                target -= self._tree[next_position]
+            bit >>= 1
+
+        # floating point drift can land the walk past the last index, or on a zero weight. Step back to
+        # the nearest index that can be picked, or forward if there's none before it.
+        index = min(position, self._size - 1)
+        if self._weights[index] > 0:
+            return index
+
+        for i in range(index - 1, -1, -1):
+            if self._weights[i] > 0:
+                return i
+
+        for i in range(index + 1, self._size):
+            if self._weights[i] > 0:
+                return i
+
+        # every weight is zero, and the tree's total was only rounding left over from updates
+        return None
@@ -0,0 +1,103 @@
+"""
+Scale patterns on the fretboard: every position of a scale across the neck, and the five CAGED shapes
+that divide it into playable regions
+"""
+from collections import namedtuple
+from functools import lru_cache
+from itertools import chain
+
+import constants as const
+from utils import compile_tuning, PITCH_CLASSES
+
+# degree is the position's interval above the root in semitones, const.INTERVALS names it
+Position = namedtuple('Position', ['fret', 'string', 'degree'])
+Shape = namedtuple('Shape', ['name', 'min_fret', 'max_fret', 'positions'])
+ScaleMap = namedtuple('ScaleMap', ['key', 'scale', 'neck', 'shapes'])
+
+
+def degree_name(degree):
+    return const.INTERVALS[degree]
+
+
+def _lowest_shape_string(strings):
+    """
+    Index of the string CAGED shapes count their root strings up from: a guitar's sixth string, or
+    the fourth on a bass, whose strings are the guitar's lowest four. Strings added below those, like
+    a 7 string guitar's low B, extend the shapes but don't move them.
+    """
+    return 5 if strings >= 6 else min(strings, 4) - 1
+
+
+@lru_cache(maxsize=None)
+def _key_layout(tuning, frets, key):
+    """
+    The positions of the neck and of each CAGED shape in a key, grouped by degree. A scale's positions
+    are then just the groups of its degrees, whatever the scale.
+    """
+    table = compile_tuning(tuning, frets)
+    root = PITCH_CLASSES[key]
+    strings = len(tuning)
+
+    def by_degree(min_fret, max_fret):
+        groups = [[] for _ in range(12)]
+        for string in range(strings):
+            for fret in range(min_fret, max_fret + 1):
+                degree = (table.pitch_class(fret, string) - root) % 12
+                groups[degree].append(Position(fret, string, degree))
+        return [tuple(group) for group in groups]
+
+    lowest_string = _lowest_shape_string(strings)
+
+    shapes = []
+    for name, root_string, offset in const.CAGED_SHAPES:
+        string = lowest_string - root_string
+
+        # the lowest root that puts the shape on the neck; a shape starting one fret below the nut
+        # becomes an open position shape
+        root_fret = table.fret_of(root, string, lowest_fret=max(0, -offset - 1))
+        min_fret = max(0, root_fret + offset)
+        max_fret = root_fret + offset + const.CAGED_SHAPE_FRETS - 1
+
+        shapes.append((name, min_fret, max_fret, by_degree(min_fret, max_fret)))
+
+    return by_degree(0, frets - 1), shapes
+
+
+@lru_cache(maxsize=None)
+def _scale_map(tuning, key, scale, frets):
+    neck, shapes = _key_layout(tuning, frets, key)
+    intervals = const.SCALES[scale]
+
+    return ScaleMap(key, scale, tuple(chain.from_iterable(neck[i] for i in intervals)), tuple(
+        Shape(name, min_fret, max_fret, tuple(chain.from_iterable(positions[i] for i in intervals)))
+        for name, min_fret, max_fret, positions in shapes
+    ))
+
+
+def scale_map(tuning, key, scale, frets=13):
+    """
+    Return the (memoized) positions of a scale on a fretboard
+    :param tuning: list of open string note names, highest string first
+    :param key: root note name
+    :param scale: name of a scale in const.SCALES
+    :param frets: frets on the neck, counting the open strings as fret 0
+    :return: a ScaleMap whose neck holds every position of the scale below `frets`, and whose shapes
+        are the five CAGED shapes in the order they climb the neck. Positions are grouped by degree in
+        the scale's order. A shape can extend beyond `frets`.
+    """
+    return _scale_map(tuple(tuning), key, scale, frets)
+
+
+def all_shapes(tuning, frets=13, fits=True):
+    """
+    Every (scale map, shape) of every key and scale
+    :param fits: only include shapes that lie entirely below `frets`
+    """
+    return [
+        (scale_positions, shape)
+        for key in const.NOTES
+        for scale in const.SCALES
+        for scale_positions in (scale_map(tuning, key, scale, frets),)
+        for shape in scale_positions.shapes
+        if not fits or shape.max_fret < frets
+    ]
@@ -1,24 +1,33 @@
 import pygame
 from ui import Button, Text
 
-from config import COLOUR_BACKGROUND, FONTS
-import constants as const
-from games.notes import NameTheNote, FindAllNotes
-from games.scales import FindScaleDegrees
+import config
+from config import COLOUR_BACKGROUND
 from games.base import Scene
 
 
 class MenuScene(Scene):
+    ENTRIES = [
+        ('play_namenotes', 'Play Name The Note'),
+        ('play_namenotes_audio', 'Play Name The Note on guitar'),
+        ('play_findnotes', 'Play Find all Notes'),
+        ('play_scaledegrees', 'Play name the scale degrees'),
+        ('play_findchord', 'Play Find the Chord'),
+        ('view_stats', 'View practice statistics'),
+    ]
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         self._active_elements = [
-            Text('Fretboard Unlocker', Text.CENTRE, 20, font=FONTS['heading']),
-            Button('play_namenotes', 'Play Name The Note', Button.CENTRE, 150, width=300),
-            Button('play_findnotes', 'Play Find all Notes', Button.CENTRE, 220, width=300),
-            Button('play_scaledegrees', 'Play name the scale degrees', Button.CENTRE, 290, width=300)
+            Text('Fretboard Unlocker', Text.CENTRE, 20, font='heading'),
         ]
 
+        for i, (value, text) in enumerate(self.ENTRIES):
+            self._active_elements.append(
+                Button(value, text, Button.CENTRE, 110 + i * 52, padding=5, width=300)
+            )
+
     def draw(self, screen):
         screen.fill(COLOUR_BACKGROUND)
         for elem in self._active_elements:
@@ -32,32 +41,134 @@ class MenuScene(Scene):
 
     def handle_event(self, event):
 
-        if event.type == pygame.QUIT:
-            return 'quit'
+        if event.type == pygame.MOUSEMOTION:
+            self.track_pointer(event)
 
         if event.type == pygame.MOUSEBUTTONDOWN:
             x, y = event.pos
 
-            for elem in self._active_elements:
-                if elem.is_clicked(x, y):
-                    if elem.value == 'play_namenotes':
-                        game_config = {
-                             'tuning': const.GUITAR_STANDARD_TUNING
-                        }
-
-                        return NameTheNote(game_config)
-                    elif elem.value == 'play_findnotes':
-                        game_config = {
-                             'tuning': const.GUITAR_STANDARD_TUNING
-                        }
-
-                        return FindAllNotes(game_config)
-                    elif elem.value == 'play_scaledegrees':
-                        game_config = {
-                            'tuning': const.GUITAR_STANDARD_TUNING,
-                            'scale_pattern': const.C_SHAPE_MAJOR,
-                            'key': 'C',
-                        }
-
-                        return FindScaleDegrees(game_config)
-        return None
\ No newline at end of file
+            elem = self.element_at(x, y)
+
+            # each button's value is the name of the scene it opens
+            if elem is not None and elem.value in SceneManager.SCENES:
+                return elem.value
+
+        return None
+
+
+class SceneManager:
+    """
+    Builds scenes by name and keeps them for reuse, so switching scenes doesn't rebuild their widgets,
+    note lists or fretboards. Scenes ask to switch by returning a scene name from handle_event.
+    """
+
+    SCENES = ('menu', 'play_namenotes', 'play_namenotes_audio', 'play_findnotes', 'play_scaledegrees',
+              'play_findchord', 'view_stats')
+
+    # the order scenes are built in ahead of time while the current scene is idle. Builds run on the
+    # render thread, so a scene that loads something slow, like the chord voicings or the practice
+    # history, must do it on a background thread to keep prebuilding from delaying input.
+    PREBUILD_ORDER = ('play_namenotes', 'play_findnotes', 'play_scaledegrees', 'play_findchord', 'view_stats')
+
+    def __init__(self):
+        self._scenes = {}
+        self._last_played = None
+
+    def _build(self, name):
+        # game modules are imported when first needed to keep startup fast
+        if name == 'menu':
+            return MenuScene()
+
+        elif name == 'play_namenotes':
+            from games.notes import NameTheNote
+
+            game_config = {
+                 'instrument': config.INSTRUMENT,
+                 'frets': config.FRETS,
+            }
+
+            return NameTheNote(game_config)
+        elif name == 'play_namenotes_audio':
+            from games.notes import NameTheNote
+
+            game_config = {
+                'instrument': config.INSTRUMENT,
+                'frets': config.FRETS,
+                'input': 'audio',
+            }
+
+            return NameTheNote(game_config)
+        elif name == 'play_findnotes':
+            from games.notes import FindAllNotes
+
+            game_config = {
+                 'instrument': config.INSTRUMENT,
+                 'frets': config.FRETS,
+            }
+
+            return FindAllNotes(game_config)
+        elif name == 'play_scaledegrees':
+            from games.scales import FindScaleDegrees
+
+            game_config = {
+                'instrument': config.INSTRUMENT,
+                'frets': config.FRETS,
+                'key': 'C',
+                'scale': 'major',
+                'shape': 'E',
+            }
+
+            return FindScaleDegrees(game_config)
+        elif name == 'play_findchord':
+            from games.chords import FindTheChord
+
+            game_config = {
+                'instrument': config.INSTRUMENT,
+                'frets': config.FRETS,
+            }
+
+            return FindTheChord(game_config)
+        elif name == 'view_stats':
+            from games.stats import StatisticsScene
+
+            game_config = {
+                'instrument': config.INSTRUMENT,
+                'frets': config.FRETS,
+            }
+
+            return StatisticsScene(game_config)
+
+        raise KeyError(name)
+
+    def _get(self, name):
+        if name not in self._scenes:
+            self._scenes[name] = self._build(name)
+
+        return self._scenes[name]
+
+    def built(self):
+        """The scenes built so far, by name"""
+        return dict(self._scenes)
+
+    def switch(self, name):
+        """Return the named scene, ready to become the current scene"""
+        scene = self._get(name)
+        scene.activate()
+
+        if name != 'menu':
+            self._last_played = name
+
+        return scene
+
+    def prebuild(self):
+        """
+        Build the most likely next scene that hasn't been built yet, if any. Call when idle; builds
+        at most one scene per call.
+        :return: whether a scene was built
+        """
+        for name in (self._last_played,) + self.PREBUILD_ORDER:
+            if name is not None and name not in self._scenes:
+                self._get(name)
+                return True
+
+        return False
@@ -0,0 +1,86 @@
+import time
+
+import pygame
+
+
+class FrameScheduler:
+    """
+    Paces the game loop: runs at the active frame rate while the current scene is animating,
+    otherwise blocks waiting for input so an idle screen doesn't keep a core busy. A scene with
+    changes not yet drawn, such as a new round picked in update(), is drawn without waiting. Events
+    of a type in wake_events that arrive while animating are handled straight away instead of
+    waiting for the next frame; other events, such as pointer motion, still wait for it.
+    """
+
+    def __init__(self, active_fps, idle_fps, wake_events=()):
+        self._active_fps = active_fps
+        self._idle_fps = idle_fps
+        self._wake_events = frozenset(wake_events)
+        self._clock = pygame.time.Clock()
+        self._next_frame = 0
+
+    def _idle_timeout(self, scene):
+        """Milliseconds to block for, or None to wait until the next event"""
+        timeout = 1000 / self._idle_fps if self._idle_fps else None
+
+        wakeup = scene.next_wakeup()
+        if wakeup is not None:
+            timeout = min(timeout, wakeup * 1000) if timeout is not None else wakeup * 1000
+
+        return timeout
+
+    def get_events(self, scene):
+        """Wait as long as the scene allows and return the events to handle this frame"""
+        if scene.is_animating():
+            if self._wake_events:
+                return self._wait_for_frame_or_input()
+
+            self._clock.tick(self._active_fps)
+            return pygame.event.get()
+
+        if scene.needs_redraw():
+            self._clock.tick()
+            return pygame.event.get()
+
+        timeout = self._idle_timeout(scene)
+
+        if timeout is None:
+            events = [pygame.event.wait()]
+        else:
+            # a zero timeout would block forever
+            event = pygame.event.wait(max(1, int(timeout)))
+            events = [] if event.type == pygame.NOEVENT else [event]
+
+        events.extend(pygame.event.get())
+
+        # keep the clock's frame timing current after blocking
+        self._clock.tick()
+
+        return events
+
+    def _wait_for_frame_or_input(self):
+        events = []
+
+        while True:
+            wait = self._next_frame - time.perf_counter()
+            if wait <= 0:
+                break
+
+            # timed out, possibly a fraction of a millisecond short of the frame
+            event = pygame.event.wait(max(1, int(wait * 1000)))
+            if event.type == pygame.NOEVENT:
+                continue
+
+            events.append(event)
+            if event.type in self._wake_events:
+                break
+
+        # a frame drawn early for input doesn't move the next animation frame
+        now = time.perf_counter()
+        if now >= self._next_frame:
+            self._next_frame = max(self._next_frame + 1 / self._active_fps, now)
+
+        events.extend(pygame.event.get())
+        self._clock.tick()
+
+        return events
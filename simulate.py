@@ -0,0 +1,230 @@
+"""
+Simulated players for the note games, to benchmark and tune note selection at scale.
+
+Bots answer NoteData and FindTheNoteData directly, with no display or event loop, on a virtual
+clock advanced by each bot's response times. Sessions are spread across a process pool, and the
+throughput and the distribution of the sessions' final game_stats are reported:
+
+    python simulate.py --game name_the_note --bot beginner --sessions 5000
+    python simulate.py --game find_all_notes --bot expert --rounds 50 --output results.json
+    python simulate.py --weighting error_weight=6 --weighting unseen_weight=4
+"""
+import argparse
+from collections import namedtuple
+import json
+import math
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import constants as const
+from games.notes import FindTheNoteData, NoteData
+from timer import FrameClock, GameTimer
+
+PERCENTILES = (10, 50, 90)
+
+# accuracy and latency are how a bot answers a position it's never been asked before. Each time it's
+# asked a position it learns: the chance of a mistake shrinks by learning_rate, and its median
+# latency closes on fastest by the same fraction. Latencies are log-normal around the median.
+Bot = namedtuple('Bot', ['accuracy', 'latency', 'latency_spread', 'fastest', 'learning_rate'])
+
+BOTS = {
+    'beginner': Bot(accuracy=0.4, latency=4.0, latency_spread=0.6, fastest=1.0, learning_rate=0.15),
+    'intermediate': Bot(accuracy=0.75, latency=2.0, latency_spread=0.4, fastest=0.7, learning_rate=0.1),
+    'expert': Bot(accuracy=0.97, latency=0.8, latency_spread=0.25, fastest=0.4, learning_rate=0.05),
+    'guesser': Bot(accuracy=1 / 7, latency=0.5, latency_spread=0.1, fastest=0.5, learning_rate=0),
+}
+
+
+class BotPlayer:
+    """A bot's knowledge of each position, as it plays"""
+
+    def __init__(self, bot, rng):
+        self._bot = bot
+        self._rng = rng
+        self._seen = {}
+
+    def _learnt(self, position):
+        return (1 - self._bot.learning_rate) ** self._seen.get(position, 0)
+
+    def knows(self, position):
+        """Whether the bot gets a position right this time"""
+        return self._rng.random() >= (1 - self._bot.accuracy) * self._learnt(position)
+
+    def response_time(self, position):
+        bot = self._bot
+        median = bot.fastest + (bot.latency - bot.fastest) * self._learnt(position)
+        return self._rng.lognormvariate(math.log(median), bot.latency_spread)
+
+    def learn(self, position):
+        self._seen[position] = self._seen.get(position, 0) + 1
+
+
+def _play_name_the_note(model, player, clock, rounds, rng):
+    """Name `rounds` notes, answering each until it's right. Returns the answers given."""
+    decisions = 0
+    model.choose_next_note()
+
+    for _ in range(rounds):
+        note = model.get_current_note()
+        position = (note['fret'], note['string'])
+        wrong_answers = [name for name in const.WHOLE_NOTES if name != note['note']]
+
+        while True:
+            clock.advance_to(clock.now + player.response_time(position))
+            decisions += 1
+
+            answer = note['note'] if player.knows(position) else rng.choice(wrong_answers)
+            if model.handle_input(answer):
+                break
+
+        player.learn(position)
+
+    return decisions
+
+
+def _play_find_all_notes(model, player, clock, rounds, rng):
+    """Find every position of `rounds` notes, a wrong click landing on some other note. Returns the clicks."""
+    decisions = 0
+
+    for _ in range(rounds):
+        model.choose_next_note()
+        targets = list(model.current_note_list)
+        wrong_positions = [note for note in model.notes if note['note'] != model.current_note]
+        rng.shuffle(targets)
+
+        while not model.success():
+            target = targets[-1]
+            position = (target['fret'], target['string'])
+
+            clock.advance_to(clock.now + player.response_time(position))
+            decisions += 1
+
+            if player.knows(position):
+                model.handle_note_selection(*position)
+                player.learn(position)
+                targets.pop()
+            else:
+                wrong = rng.choice(wrong_positions)
+                model.handle_note_selection(wrong['fret'], wrong['string'])
+
+    return decisions
+
+
+GAMES = {
+    'name_the_note': (NoteData, _play_name_the_note),
+    'find_all_notes': (FindTheNoteData, _play_find_all_notes),
+}
+
+
+def run_session(task):
+    """Play one session, returning (its final game_stats, decisions made)"""
+    game, bot_name, game_config, rounds, seed = task
+    model_class, play = GAMES[game]
+
+    rng = random.Random(seed)
+    clock = FrameClock()
+    timer = GameTimer(clock)
+    timer.start()
+
+    model = model_class(game_config, timer=timer, rng=rng)
+    player = BotPlayer(BOTS[bot_name], rng)
+    decisions = play(model, player, clock, rounds, rng)
+
+    return model.game_stats, decisions
+
+
+def distribution(values):
+    """Summarise a list of numbers by mean and percentiles"""
+    ordered = sorted(values)
+    summary = {'mean': sum(ordered) / len(ordered)}
+
+    for percentile in PERCENTILES:
+        index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+        summary['p{}'.format(percentile)] = ordered[index]
+
+    return summary
+
+
+def simulate(game, bot_name, game_config, sessions, rounds, processes=None, seed=0):
+    tasks = [(game, bot_name, game_config, rounds, seed + i) for i in range(sessions)]
+
+    start = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.map(run_session, tasks, chunksize=max(1, sessions // (4 * (processes or os.cpu_count() or 1))))
+    duration = time.perf_counter() - start
+
+    decisions = sum(session_decisions for _, session_decisions in results)
+    stats = [game_stats for game_stats, _ in results]
+
+    return {
+        'game': game,
+        'bot': bot_name,
+        'game_config': game_config,
+        'sessions': sessions,
+        'rounds': rounds,
+        'seconds': duration,
+        'decisions': decisions,
+        'decisions_per_second': decisions / duration,
+        'game_stats': {name: distribution([session[name] for session in stats]) for name in stats[0]},
+    }
+
+
+def print_report(report):
+    print('{game}: {sessions} {bot} sessions of {rounds} rounds, {decisions} decisions in {seconds:.2f}s, '
+          '{decisions_per_second:.0f} decisions/s'.format(**report))
+
+    for name, summary in report['game_stats'].items():
+        print('  {:<22} mean {:>10.2f}  '.format(name, summary['mean']) + '  '.join(
+            'p{} {:>10.2f}'.format(percentile, summary['p{}'.format(percentile)]) for percentile in PERCENTILES))
+
+
+def _setting(text):
+    name, value = text.split('=', 1)
+    return name, float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--game', choices=sorted(GAMES), default='name_the_note')
+    parser.add_argument('--bot', choices=sorted(BOTS), default='intermediate')
+    parser.add_argument('--instrument', default='guitar', help='an entry of instruments.INSTRUMENTS')
+    parser.add_argument('--frets', type=int, help='positions on each string, counting the open string')
+    parser.add_argument('--sessions', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=100, help='notes asked in each session')
+    parser.add_argument('--processes', type=int, help='worker processes, one per CPU by default')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first session, the rest count up')
+    parser.add_argument('--weighting', type=_setting, action='append', default=[], metavar='NAME=VALUE',
+                        help="override one of NoteData's note selection weights")
+    parser.add_argument('--output', help='write the report as JSON to this file')
+    args = parser.parse_args(argv)
+
+    for name, _ in args.weighting:
+        if name not in NoteData.DEFAULT_WEIGHTING:
+            parser.error('unknown weighting {!r}, choose from {}'.format(name, ', '.join(NoteData.DEFAULT_WEIGHTING)))
+
+    if args.weighting and GAMES[args.game][0] is not NoteData:
+        parser.error('--weighting only applies to name_the_note')
+
+    game_config = {
+        'instrument': args.instrument,
+        'frets': args.frets,
+        'weighting': dict(args.weighting),
+    }
+
+    report = simulate(args.game, args.bot, game_config, args.sessions, args.rounds, args.processes, args.seed)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
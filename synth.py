@@ -0,0 +1,155 @@
+"""
+Synthesised note playback.
+
+Notes are plucked-string tones made with the Karplus-Strong algorithm. They're synthesised ahead of
+time on a background thread and kept as pygame.mixer.Sound objects in a bounded cache, so playing a
+note is only a cache lookup.
+"""
+from collections import OrderedDict
+import threading
+
+import numpy as np
+import pygame
+
+import config
+
+
+def midi_to_frequency(midi_note):
+    return 440 * 2 ** ((midi_note - 69) / 12)
+
+
+def karplus_strong(frequency, sample_rate, duration, decay=0.996, seed=0):
+    """
+    Synthesise a plucked string as float samples in -1..1. The recurrence only looks one period back,
+    so it's computed a whole period at a time.
+    """
+    period = max(2, int(round(sample_rate / frequency - 0.5)))
+    length = int(sample_rate * duration)
+    periods = -(-length // period) + 1
+
+    samples = np.empty(periods * period, dtype=np.float64)
+    samples[:period] = np.random.RandomState(seed).uniform(-1, 1, period)
+
+    for start in range(period, len(samples), period):
+        previous = samples[start - period:start]
+        current = samples[start:start + period]
+        # y[n] = decay * (y[n - N] + y[n - N - 1]) / 2
+        current[1:] = previous[1:] + previous[:-1]
+        current[0] = previous[0] + samples[start - 1]
+        current *= decay / 2
+
+    samples = samples[period:period + length]
+
+    # short fade out so the end of the note doesn't click
+    fade = min(len(samples), int(sample_rate * 0.02))
+    samples[len(samples) - fade:] *= np.linspace(1, 0, fade)
+
+    return samples / max(1e-9, np.abs(samples).max())
+
+
+class SampleCache:
+    """Bounded LRU cache of synthesised notes, keyed by MIDI note number"""
+
+    def __init__(self, max_size, duration=1.5, volume=0.5):
+        self._max_size = max_size
+        self._duration = duration
+        self._volume = volume
+        self._sounds = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = []
+        self._worker = None
+
+        self.sample_rate, _, self.channels = pygame.mixer.get_init()
+
+    def _make_sound(self, midi_note):
+        samples = karplus_strong(midi_to_frequency(midi_note), self.sample_rate, self._duration)
+        samples = (samples * self._volume * 32767).astype(np.int16)
+
+        if self.channels > 1:
+            samples = np.repeat(samples[:, np.newaxis], self.channels, axis=1)
+
+        return pygame.sndarray.make_sound(np.ascontiguousarray(samples))
+
+    def _store(self, midi_note, sound):
+        with self._lock:
+            self._sounds[midi_note] = sound
+            self._sounds.move_to_end(midi_note)
+
+            while len(self._sounds) > self._max_size:
+                self._sounds.popitem(last=False)
+
+    def _generate(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._worker = None
+                    return
+                midi_note = self._pending.pop(0)
+
+                if midi_note in self._sounds:
+                    continue
+
+            self._store(midi_note, self._make_sound(midi_note))
+
+    def prepare(self, midi_notes):
+        """Synthesise any of the notes not already cached, on a background thread"""
+        with self._lock:
+            pending = set(self._pending)
+            self._pending.extend(note for note in dict.fromkeys(midi_notes)
+                                 if note not in self._sounds and note not in pending)
+
+            if self._pending and self._worker is None:
+                self._worker = threading.Thread(target=self._generate, name='sample-cache', daemon=True)
+                self._worker.start()
+
+    def close(self):
+        """Drop any notes still waiting to be synthesised and wait for the background thread to stop"""
+        with self._lock:
+            self._pending = []
+            worker = self._worker
+
+        if worker is not None:
+            worker.join()
+
+    def get(self, midi_note):
+        with self._lock:
+            sound = self._sounds.get(midi_note)
+            if sound is not None:
+                self._sounds.move_to_end(midi_note)
+
+        return sound
+
+    def play(self, midi_note):
+        """Play a cached note. Notes that haven't been synthesised yet are skipped rather than made now."""
+        sound = self.get(midi_note)
+
+        if sound is not None:
+            sound.play()
+
+        return sound is not None
+
+    def __contains__(self, midi_note):
+        with self._lock:
+            return midi_note in self._sounds
+
+
+_cache = None
+
+
+def get_sample_cache():
+    """Return the shared sample cache, or None if playback is off or there's no audio output"""
+    global _cache
+
+    if _cache is None and config.NOTE_PLAYBACK and pygame.mixer.get_init():
+        _cache = SampleCache(config.SAMPLE_CACHE_SIZE)
+
+    return _cache
+
+
+def close_sample_cache():
+    """Stop synthesising the shared cache's outstanding notes, so nothing is left running on exit"""
+    global _cache
+
+    if _cache is not None:
+        _cache.close()
+        _cache = None
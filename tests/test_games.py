@@ -0,0 +1,79 @@
+import pygame
+import pytest
+
+import config
+import constants as const
+from games.base import key_char
+from games.notes import FindAllNotes, NameTheNote
+
+GUITAR = {'tuning': const.GUITAR_STANDARD_TUNING}
+
+
+@pytest.fixture
+def screen(monkeypatch):
+    monkeypatch.setattr(config, 'HISTORY_PATH', None)
+    monkeypatch.setattr(config, 'NOTE_PLAYBACK', False)
+
+    pygame.init()
+    yield pygame.display.set_mode((config.SCREEN_WIDTH, config.SCREEN_HEIGHT))
+    pygame.quit()
+    config.FONTS.clear()
+
+
+def keydown(key):
+    return pygame.event.Event(pygame.KEYDOWN, key=key, mod=0, unicode='', scancode=0)
+
+
+def test_key_char():
+    assert key_char(ord('c')) == 'C'
+    assert key_char(pygame.K_LSHIFT) == ''
+    assert key_char(pygame.K_UP) == ''
+    assert key_char(pygame.K_F1) == ''
+
+
+@pytest.mark.parametrize('game', [NameTheNote, FindAllNotes])
+def test_non_character_keys_are_ignored(screen, game):
+    scene = game(GUITAR)
+    scene.start()
+
+    for key in (pygame.K_LSHIFT, pygame.K_UP, pygame.K_F1, pygame.K_RCTRL):
+        scene.handle_event(keydown(key))
+        scene.draw(screen)
+
+    assert scene.state == scene.PLAYING
+
+    scene.handle_event(keydown(ord('p')))
+    assert scene.state != scene.PLAYING
+
+    scene.cleanup()
+
+
+def test_name_the_note_falls_back_to_the_keyboard(screen, monkeypatch, tmp_path):
+    monkeypatch.setattr(config, 'AUDIO_INPUT', str(tmp_path / 'missing.wav'))
+
+    scene = NameTheNote(dict(GUITAR, input='audio'))
+    scene.start()
+    scene.draw(screen)
+
+    assert scene.state == scene.PLAYING
+    assert 'type them instead' in scene._audio_error
+
+    note = scene._model.get_current_note()['note']
+    scene.handle_event(keydown(ord(note.lower())))
+    assert scene._model.game_stats['correct'] == 1
+
+    scene.cleanup()
+
+
+def test_name_the_note_without_a_microphone(screen, monkeypatch, caplog):
+    monkeypatch.setattr(config, 'AUDIO_INPUT', 'microphone')
+    # as when SDL has no recording devices
+    monkeypatch.setattr('pygame._sdl2.audio.get_audio_device_names', lambda iscapture=False: [])
+
+    scene = NameTheNote(dict(GUITAR, input='audio'))
+    scene.start()
+    scene.draw(screen)
+
+    assert scene._audio_error is not None
+    assert 'no audio recording device' in caplog.text
+    scene.cleanup()
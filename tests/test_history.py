@@ -0,0 +1,174 @@
+import sqlite3
+
+import pytest
+
+import config
+import history
+from history import HistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / 'history' / 'attempts.sqlite3'), batch_size=4, flush_interval=0.01)
+    yield store
+    store.close()
+
+
+def record(store, n, game='play_namenotes', start=1000, instrument='Guitar'):
+    for i in range(n):
+        store.record(game, instrument, i % 13, i % 6, 'CDEFGAB'[i % 7], 'C', i % 2 == 0, 0.5 + i,
+                     timestamp=start + i)
+
+
+def test_full_batches_are_written_without_waiting(tmp_path):
+    # the flush interval is far longer than the test, so only full batches can have been written
+    store = HistoryStore(str(tmp_path / 'attempts.sqlite3'), batch_size=4, flush_interval=60)
+    record(store, 8)
+    store.flush()
+
+    assert [attempt.fret for attempt in store.attempts()] == list(range(8))
+
+    # and closing doesn't wait out the interval either
+    record(store, 1)
+    store.close()
+    assert len(store.attempts()) == 9
+
+
+def test_flush_writes_a_partial_batch(tmp_path):
+    store = HistoryStore(str(tmp_path / 'attempts.sqlite3'), batch_size=64, flush_interval=0.01)
+    record(store, 3)
+    store.flush()
+
+    assert len(store.attempts()) == 3
+    store.close()
+
+
+def test_close_writes_everything_queued(tmp_path):
+    path = str(tmp_path / 'attempts.sqlite3')
+    store = HistoryStore(path, batch_size=64, flush_interval=60)
+    record(store, 5)
+    store.close()
+
+    # closed stores drop further attempts
+    record(store, 5)
+
+    assert len(HistoryStore(path).attempts()) == 5
+
+
+def test_attempt_fields(store):
+    store.record('play_findnotes', 'Bass', 3, 2, 'A#', 'B', False, 1.25, timestamp=42.0)
+    store.flush()
+
+    [attempt] = store.attempts()
+    assert attempt[1:] == ('play_findnotes', 3, 2, 'A#', 'B', 0, 1.25, 42.0, 'Bass')
+
+
+def test_query_filters(store):
+    record(store, 14, game='play_namenotes')
+    record(store, 2, game='play_findnotes', start=2000)
+    store.flush()
+
+    assert {attempt.expected for attempt in store.attempts(note='E')} == {'E'}
+    assert len(store.attempts(note='E')) == 2
+    assert {attempt.string for attempt in store.attempts(string=1)} == {1}
+    assert [attempt.timestamp for attempt in store.attempts(start=1003, end=1006)] == [1003, 1004, 1005]
+    assert len(store.attempts(game='play_findnotes')) == 2
+    assert len(store.attempts(game='play_findnotes', start=2001)) == 1
+    assert len(store.attempts(instrument='Guitar')) == 16
+    assert store.attempts(instrument='Bass') == []
+
+
+def test_position_rows_after_id(store):
+    record(store, 6)
+    store.flush()
+
+    rows = store.position_rows()
+    assert [row[0] for row in rows] == sorted(row[0] for row in rows)
+    assert rows[0][1:] == (0, 0, 1, 0.5)
+    assert len(store.position_rows(after_id=rows[3][0])) == 2
+
+
+def test_position_rows_by_instrument(store):
+    record(store, 4, instrument='Guitar')
+    record(store, 4, instrument='Bass')
+    store.flush()
+
+    guitar = store.position_rows(instrument='Guitar')
+    bass = store.position_rows(instrument='Bass')
+
+    assert len(guitar) == len(bass) == 4
+    assert max(row[0] for row in guitar) < min(row[0] for row in bass)
+    assert store.position_rows(after_id=guitar[1][0], instrument='Guitar') == guitar[2:]
+    assert len(store.position_rows()) == 8
+
+
+def test_databases_without_instruments_are_migrated(tmp_path):
+    path = str(tmp_path / 'attempts.sqlite3')
+
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute('''
+            CREATE TABLE attempts (
+                id INTEGER PRIMARY KEY, game TEXT NOT NULL, fret INTEGER NOT NULL, string INTEGER NOT NULL,
+                expected TEXT NOT NULL, answered TEXT, correct INTEGER NOT NULL, latency REAL,
+                timestamp REAL NOT NULL
+            )''')
+        connection.execute("INSERT INTO attempts VALUES (1, 'play_namenotes', 3, 1, 'D', 'D', 1, 0.7, 5.0)")
+    connection.close()
+
+    store = HistoryStore(path, flush_interval=0.01)
+    record(store, 2)
+    store.flush()
+
+    # the old attempt's instrument isn't known
+    assert [attempt.instrument for attempt in store.attempts()] == [None, 'Guitar', 'Guitar']
+    assert [row[0] for row in store.position_rows(instrument='Guitar')] == [2, 3]
+    store.close()
+
+
+def test_failed_batch_is_dropped_and_writing_continues(store, caplog):
+    # sqlite can't bind an object, so the whole batch holding it fails
+    store.record(object(), 'Guitar', 0, 0, 'C', 'C', True, 0.5)
+    record(store, 3)
+    store.flush()
+
+    assert store.attempts() == []
+    assert 'could not write 4 attempts' in caplog.text
+
+    record(store, 4)
+    store.flush()
+
+    assert len(store.attempts()) == 4
+
+
+def test_unwritable_path(tmp_path, caplog):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+
+    store = HistoryStore(str(blocker / 'attempts.sqlite3'))
+    record(store, 3)
+    store.flush()
+
+    assert store.failed
+    assert store.attempts() == []
+    assert store.position_rows() == []
+    assert 'could not open the practice history' in caplog.text
+    store.close()
+
+
+def test_get_store_is_none_when_history_is_unavailable(tmp_path, monkeypatch):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    monkeypatch.setattr(config, 'HISTORY_PATH', str(blocker / 'attempts.sqlite3'))
+    monkeypatch.setattr(history, '_store', None)
+
+    # the database is opened on the writer thread, which may not have tried yet
+    store = history.get_store()
+    if store is not None:
+        store.flush()
+
+    assert history.get_store() is None
+    history.close_store()
+
+    monkeypatch.setattr(config, 'HISTORY_PATH', None)
+    assert history.get_store() is None
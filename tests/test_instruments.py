@@ -0,0 +1,67 @@
+import pytest
+
+import constants as const
+from instruments import fret_positions, get_instrument, inlays, INSTRUMENTS
+
+
+def test_tempered_frets_halve_the_string_at_the_twelfth():
+    # the 12th fret is half way to the bridge and the 24th three quarters, with the last fret at 1
+    assert fret_positions(25)[12] == pytest.approx(0.5 / 0.75)
+
+
+def test_tempered_frets_follow_the_twelfth_root_of_two():
+    positions = fret_positions(13)
+    # the scale length, with the 12th fret half way along it at 1
+    length = 2
+
+    assert positions[0] == 0
+    assert positions[-1] == pytest.approx(1)
+
+    for fret in range(1, 13):
+        to_bridge = length - positions[fret]
+        assert to_bridge / (length - positions[fret - 1]) == pytest.approx(2 ** (-1 / 12))
+
+
+def test_tempered_frets_get_narrower():
+    positions = fret_positions(25)
+    widths = [b - a for a, b in zip(positions, positions[1:])]
+
+    assert widths == sorted(widths, reverse=True)
+
+
+def test_even_frets():
+    assert list(fret_positions(5, tempered=False)) == [0, 0.25, 0.5, 0.75, 1]
+
+
+def test_inlays():
+    dots = inlays(13, 6)
+
+    assert (3, 2.5) in dots
+    assert (12, 1.5) in dots and (12, 3.5) in dots
+    assert all(1 <= fret < 13 for fret, _ in dots)
+
+
+def test_get_instrument_by_name_or_tuning():
+    assert get_instrument({'instrument': 'bass'}) is INSTRUMENTS['bass']
+    assert get_instrument({'tuning': const.GUITAR_STANDARD_TUNING}) is INSTRUMENTS['guitar']
+
+    custom = get_instrument({'tuning': ['D', 'A', 'F', 'C', 'G', 'C']})
+    assert custom.name == 'Custom D A F C G C'
+    assert custom.strings == 6
+
+
+def test_frets_can_be_overridden():
+    instrument = get_instrument({'instrument': 'guitar_8', 'frets': 25})
+
+    assert instrument.frets == 25
+    assert instrument.strings == 8
+    assert instrument.bounds == (0, 7, 0, 25)
+    assert instrument.table.midi_note(24, 7) == instrument.table.open_midi_notes[7] + 24
+
+
+@pytest.mark.parametrize('name', sorted(INSTRUMENTS))
+def test_registered_instruments(name):
+    instrument = INSTRUMENTS[name]
+
+    assert instrument.strings == len(instrument.tuning)
+    assert instrument.table.strings == instrument.strings
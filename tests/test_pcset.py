@@ -0,0 +1,67 @@
+import pytest
+
+import constants as const
+from pcset import NAMES, PitchClassSet, recognise
+
+
+def test_from_notes_sets_a_bit_per_pitch_class():
+    c_major = PitchClassSet.from_notes(['C', 'E', 'G'])
+
+    assert c_major == 0b10010001
+    assert PitchClassSet.from_notes(['Bb', 'A#']) == PitchClassSet.from_pitch_classes([10])
+    assert list(c_major) == [0, 4, 7]
+    assert len(c_major) == 3
+    assert c_major.notes() == ['C', 'E', 'G']
+
+
+@pytest.mark.parametrize('semitones', range(-13, 25))
+def test_transpose_rotates_every_pitch_class(semitones):
+    chord = PitchClassSet.from_pitch_classes([0, 4, 7, 11])
+
+    assert chord.transpose(semitones) == PitchClassSet.from_pitch_classes(p + semitones for p in (0, 4, 7, 11))
+
+
+def test_subset_and_superset():
+    c_major = PitchClassSet.from_notes(['C', 'E', 'G'])
+    c_scale = PitchClassSet.from_pitch_classes(const.SCALES['major'])
+
+    assert c_major.issubset(c_scale)
+    assert c_scale.issuperset(c_major)
+    assert not c_scale.issubset(c_major)
+    assert c_major.issubset(c_major)
+
+
+def test_add_union_and_contains():
+    chord = PitchClassSet.from_notes(['C', 'E']).add(7).union(PitchClassSet.from_notes(['B']))
+
+    assert 7 in chord
+    assert 19 in chord
+    assert 2 not in chord
+    assert chord.notes() == ['C', 'E', 'G', 'B']
+
+
+def test_masks_stay_within_12_bits():
+    assert PitchClassSet(0xFFFF) == 0xFFF
+
+
+def test_every_set_has_a_name():
+    assert len(NAMES) == 4096
+    assert NAMES[0] == ''
+    assert all(NAMES[1:])
+
+
+@pytest.mark.parametrize('notes, name', [
+    (['C', 'E', 'G'], 'C chord'),
+    (['A', 'C', 'E'], 'Am chord'),
+    (['G', 'B', 'D', 'F'], 'G7 chord'),
+    (['C', 'D', 'E', 'F', 'G', 'A', 'B'], 'C major scale'),
+    (['E'], 'E'),
+    (['C', 'C#', 'D'], 'C C# D'),
+])
+def test_names(notes, name):
+    assert PitchClassSet.from_notes(notes).name() == name
+
+
+def test_ambiguous_sets_take_the_first_chord_reading():
+    # C E G A is C6 or Am7, and minor 7th comes first in const.CHORDS
+    assert recognise([0, 4, 7, 9]) == 'Am7 chord'
@@ -0,0 +1,97 @@
+import math
+
+import numpy as np
+import pygame
+import pytest
+
+from pitch import create_source, frequency_to_note, MicrophoneSource, PitchDetector
+
+SAMPLE_RATE = 44100
+WINDOW_SIZE = 1024
+
+
+def midi_to_frequency(midi_note):
+    return 440 * 2 ** ((midi_note - 69) / 12)
+
+
+def tone(frequency, harmonics=(1.0, 0.5, 0.3, 0.15), amplitude=0.3):
+    """A window of a steady tone with a few harmonics, like a plucked string"""
+    t = np.arange(WINDOW_SIZE) / SAMPLE_RATE
+    samples = sum(level * np.sin(2 * math.pi * frequency * harmonic * t + harmonic)
+                  for harmonic, level in enumerate(harmonics, 1))
+    return (amplitude * samples).astype(np.float32)
+
+
+def cents(frequency, expected):
+    return 1200 * abs(math.log2(frequency / expected))
+
+
+@pytest.fixture
+def detector():
+    return PitchDetector(SAMPLE_RATE, WINDOW_SIZE)
+
+
+@pytest.mark.parametrize('midi_note', range(40, 89))
+def test_detects_each_guitar_note(detector, midi_note):
+    expected = midi_to_frequency(midi_note)
+
+    assert cents(detector.detect(tone(expected)), expected) < 5
+
+
+def test_detects_notes_with_noise(detector):
+    rng = np.random.default_rng(0)
+
+    for midi_note in (40, 52, 64, 76, 88):
+        expected = midi_to_frequency(midi_note)
+        samples = tone(expected) + rng.normal(0, 0.01, WINDOW_SIZE).astype(np.float32)
+
+        assert cents(detector.detect(samples), expected) < 5
+
+
+def test_silence_has_no_pitch(detector):
+    assert detector.detect(np.zeros(WINDOW_SIZE, dtype=np.float32)) is None
+
+
+def test_noise_has_no_pitch(detector):
+    rng = np.random.default_rng(1)
+
+    assert detector.detect(rng.normal(0, 0.3, WINDOW_SIZE).astype(np.float32)) is None
+
+
+def test_reused_buffers_dont_carry_over_between_calls(detector):
+    """A detector that analysed other windows first gives the same answer as a fresh one"""
+    samples = tone(midi_to_frequency(57))
+    detector.detect(tone(midi_to_frequency(81)))
+    detector.detect(np.zeros(WINDOW_SIZE, dtype=np.float32))
+
+    assert detector.detect(samples) == PitchDetector(SAMPLE_RATE, WINDOW_SIZE).detect(samples)
+
+
+def test_frequency_to_note():
+    assert frequency_to_note(440) == ('A', pytest.approx(0))
+
+    note, offset = frequency_to_note(midi_to_frequency(60) * 2 ** (10 / 1200))
+    assert note == 'C'
+    assert offset == pytest.approx(10)
+
+
+@pytest.fixture
+def audio():
+    # the dummy driver has a recording device of its own
+    pygame.init()
+    yield
+    pygame.quit()
+
+
+def test_microphone_opens_the_first_recording_device(audio):
+    source = create_source('microphone', SAMPLE_RATE)
+    assert isinstance(source, MicrophoneSource)
+
+    source.start()
+    source.stop()
+
+
+def test_microphone_that_cant_open_raises(audio):
+    # SDL's audio errors and pygame.error are both RuntimeErrors
+    with pytest.raises(RuntimeError):
+        MicrophoneSource(SAMPLE_RATE, device_name='no such device').start()
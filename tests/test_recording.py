@@ -0,0 +1,166 @@
+import gzip
+import json
+
+import pygame
+import pytest
+
+import config
+import recording
+from recording import FORMAT_VERSION, load, Recorder, replay
+from scenes import SceneManager
+import timer
+from timer import FrameClock
+
+MENU_NAME_THE_NOTE = [320, 125]
+MENU_FIND_ALL_NOTES = [320, 229]
+START_BUTTON = [320, 410]
+
+
+@pytest.fixture
+def display(monkeypatch):
+    # replay changes these for the session it plays, put them back afterwards
+    for name in ('HISTORY_PATH', 'NOTE_PLAYBACK', 'AUDIO_INPUT') + recording.RECORDED_SETTINGS:
+        monkeypatch.setattr(config, name, getattr(config, name))
+    monkeypatch.setattr(timer, 'default_clock', timer.default_clock)
+    # scenes prebuilt during a replay include the chord game, keep its voicings out of the home directory
+    monkeypatch.setattr(config, 'VOICING_CACHE_DIR', None)
+
+    pygame.init()
+    yield
+    pygame.quit()
+    config.FONTS.clear()
+
+
+def click(pos):
+    return [pygame.MOUSEBUTTONDOWN, {'pos': pos, 'button': 1}]
+
+
+def key(letter):
+    return [pygame.KEYDOWN, {'key': ord(letter), 'mod': 0, 'unicode': letter, 'scancode': 0}]
+
+
+def name_the_note_session():
+    """A recording of naming notes by guessing, frame times in microseconds"""
+    frames = [0, [16000, [click(MENU_NAME_THE_NOTE)]], 16000, [16000, [click(START_BUTTON)]]]
+
+    for i in range(60):
+        frames.append([300000 + 7919 * (i % 11), [key('cdefgab'[i * 3 % 7])]])
+        frames.extend([16000] * 3)
+
+    frames.append([16000, [[pygame.QUIT, {}]]])
+
+    return {
+        'version': FORMAT_VERSION,
+        'seed': 12345,
+        'size': [config.SCREEN_WIDTH, config.SCREEN_HEIGHT],
+        'start': 5000000,
+        'settings': {name: getattr(config, name) for name in recording.RECORDED_SETTINGS},
+        'frames': frames,
+        'game_stats': {},
+    }
+
+
+def find_all_notes_session(tempered):
+    """A recording of clicking along every string in Find all Notes"""
+    frames = [0, [16000, [click(MENU_FIND_ALL_NOTES)]], 16000, [16000, [click(START_BUTTON)]]]
+
+    for y in range(175, 300, 12):
+        for x in range(40, 620, 9):
+            frames.append([16000, [click([x, y])]])
+
+    frames.append([16000, [[pygame.QUIT, {}]]])
+
+    settings = {name: getattr(config, name) for name in recording.RECORDED_SETTINGS}
+    settings['TEMPERED_FRETS'] = tempered
+
+    return {
+        'version': FORMAT_VERSION,
+        'seed': 12345,
+        'size': [config.SCREEN_WIDTH, config.SCREEN_HEIGHT],
+        'start': 5000000,
+        'settings': settings,
+        'frames': frames,
+        'game_stats': {},
+    }
+
+
+def test_frame_clock_only_moves_when_advanced():
+    clock = FrameClock(1.5)
+
+    assert clock() == clock() == 1.5
+
+    clock.advance_to(2.25)
+    assert clock() == 2.25
+
+
+def test_recorder_round_trip(tmp_path, display):
+    path = str(tmp_path / 'session.rec.gz')
+    recorder = Recorder(path, seed=7)
+    recorder.start((800, 600))
+
+    keydown = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_a, mod=0, unicode='a', scancode=0)
+    focus = pygame.event.Event(pygame.WINDOWFOCUSGAINED)
+
+    recorder.record_frame([keydown, focus], 1000000)
+    recorder.record_frame([], 1016000)
+    recorder.record_frame([], 1032000)
+    recorder.record_present(1035000)
+    recorder.save(SceneManager())
+
+    with gzip.open(path, 'rt') as recording_file:
+        assert json.load(recording_file) == load(path)
+
+    saved = load(path)
+    assert saved['seed'] == 7
+    assert saved['size'] == [800, 600]
+    assert saved['start'] == 1000000
+    # events that aren't input are left out, and frames without input are just their duration
+    assert saved['frames'] == [
+        [0, [[pygame.KEYDOWN, {'key': pygame.K_a, 'mod': 0, 'unicode': 'a', 'scancode': 0}]]],
+        16000,
+        [16000, [], 3000],
+    ]
+
+
+def test_load_rejects_other_versions(tmp_path):
+    path = str(tmp_path / 'old.rec.gz')
+    with gzip.open(path, 'wt') as recording_file:
+        json.dump({'version': FORMAT_VERSION - 1}, recording_file)
+
+    with pytest.raises(ValueError):
+        load(path)
+
+
+def test_replays_are_identical(display):
+    session = name_the_note_session()
+
+    game_stats, frames, _ = replay(session)
+    stats = game_stats['play_namenotes']
+
+    assert frames == len(session['frames'])
+    assert stats['correct'] > 0 and stats['incorrect'] > 0
+    assert stats['total_response_time'] > 0
+
+    assert replay(session)[0] == game_stats
+
+
+def test_replays_follow_the_frame_times(display):
+    session = name_the_note_session()
+    game_stats = replay(session)[0]
+
+    # a single frame arriving later changes a response time
+    session['frames'][8][0] += 1000
+    assert replay(session)[0] != game_stats
+
+
+def test_replays_use_the_recorded_fret_spacing(display, monkeypatch):
+    # the same clicks land on other frets when the frets are spaced differently
+    monkeypatch.setattr(config, 'TEMPERED_FRETS', True)
+    even = replay(find_all_notes_session(tempered=False))[0]['play_findnotes']
+    tempered = replay(find_all_notes_session(tempered=True))[0]['play_findnotes']
+
+    assert even['found'] + even['incorrect'] > 0
+    assert even != tempered
+
+    monkeypatch.setattr(config, 'TEMPERED_FRETS', False)
+    assert replay(find_all_notes_session(tempered=False))[0]['play_findnotes'] == even
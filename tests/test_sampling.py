@@ -0,0 +1,70 @@
+from collections import Counter
+import random
+
+import pytest
+
+from sampling import WeightedSampler
+
+
+def test_total_is_the_sum_of_the_weights():
+    sampler = WeightedSampler([1, 2, 3, 4, 5])
+
+    assert sampler.total() == pytest.approx(15)
+
+    sampler.update(2, 0)
+    assert sampler.total() == pytest.approx(12)
+    assert sampler.weight(2) == 0
+
+
+def test_samples_follow_the_weights():
+    weights = [1, 0, 3, 6, 0, 10]
+    sampler = WeightedSampler(weights)
+    rng = random.Random(1)
+    draws = 100000
+
+    counts = Counter(sampler.sample(rng) for _ in range(draws))
+
+    for index, weight in enumerate(weights):
+        assert counts[index] / draws == pytest.approx(weight / sum(weights), abs=0.01)
+
+
+def test_samples_follow_updated_weights():
+    sampler = WeightedSampler([1] * 7)
+    sampler.update(0, 5)
+    sampler.update(6, 0)
+    rng = random.Random(2)
+    draws = 50000
+
+    counts = Counter(sampler.sample(rng) for _ in range(draws))
+
+    assert counts[6] == 0
+    assert counts[0] / draws == pytest.approx(5 / 10, abs=0.01)
+
+
+def test_no_sample_when_every_weight_is_zero():
+    assert WeightedSampler([0, 0, 0]).sample() is None
+    assert WeightedSampler([]).sample() is None
+
+
+def test_rounding_left_in_the_tree_never_picks_a_zero_weight():
+    sampler = WeightedSampler([0.1, 0.2, 0.3])
+    for index in range(3):
+        sampler.update(index, 0)
+
+    # the tree keeps a little rounding from the updates
+    assert sampler.sample() is None
+
+
+class FixedRandom:
+    def __init__(self, value):
+        self.value = value
+
+    def random(self):
+        return self.value
+
+
+@pytest.mark.parametrize('value', [0.0, 0.5, 1 - 2 ** -53])
+def test_extreme_draws_land_on_a_positive_weight(value):
+    sampler = WeightedSampler([0, 2, 0, 0, 1, 0])
+
+    assert sampler.weight(sampler.sample(FixedRandom(value))) > 0
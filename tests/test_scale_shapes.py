@@ -0,0 +1,84 @@
+import pytest
+
+import constants as const
+from scale_shapes import all_shapes, degree_name, scale_map
+from utils import compile_tuning, PITCH_CLASSES
+
+TUNING = const.GUITAR_STANDARD_TUNING
+
+
+def test_caged_shapes_of_c_major():
+    shapes = scale_map(TUNING, 'C', 'major').shapes
+
+    assert [(shape.name, shape.min_fret, shape.max_fret) for shape in shapes] == [
+        ('C', 0, 3), ('A', 2, 5), ('G', 5, 8), ('E', 7, 10), ('D', 10, 13),
+    ]
+
+
+def shape_frets(tuning, key='C', scale='major'):
+    return [(shape.name, shape.min_fret, shape.max_fret) for shape in scale_map(tuning, key, scale).shapes]
+
+
+@pytest.mark.parametrize('tuning', [const.GUITAR_7_STRING_TUNING, const.GUITAR_8_STRING_TUNING])
+@pytest.mark.parametrize('key', ['C', 'F#', 'A'])
+def test_extended_guitars_share_the_six_string_shapes(tuning, key):
+    assert shape_frets(tuning, key) == shape_frets(TUNING, key)
+
+
+def test_five_string_bass_shares_the_four_string_shapes():
+    assert shape_frets(const.BASS_5_STRING_TUNING) == shape_frets(const.BASS_STANDARD_TUNING)
+    # a bass's strings are the guitar's lowest four
+    assert shape_frets(const.BASS_STANDARD_TUNING) == shape_frets(TUNING)
+
+
+def test_extended_strings_are_part_of_the_shapes():
+    shape = scale_map(const.GUITAR_7_STRING_TUNING, 'C', 'major').shapes[0]
+
+    assert {position.string for position in shape.positions} == set(range(7))
+
+
+@pytest.mark.parametrize('key', const.NOTES)
+@pytest.mark.parametrize('scale', ['major', 'minor pentatonic', 'harmonic minor'])
+def test_positions_play_the_scale(key, scale):
+    table = compile_tuning(TUNING)
+    layout = scale_map(TUNING, key, scale)
+    intervals = set(const.SCALES[scale])
+
+    for position in layout.neck + tuple(p for shape in layout.shapes for p in shape.positions):
+        assert (table.pitch_class(position.fret, position.string) - PITCH_CLASSES[key]) % 12 == position.degree
+        assert position.degree in intervals
+
+
+def test_neck_holds_every_position_of_the_scale():
+    table = compile_tuning(TUNING)
+    neck = scale_map(TUNING, 'G', 'major', frets=13).neck
+    intervals = set(const.SCALES['major'])
+
+    expected = {
+        (fret, string) for string in range(len(TUNING)) for fret in range(13)
+        if (table.pitch_class(fret, string) - PITCH_CLASSES['G']) % 12 in intervals
+    }
+    assert {(position.fret, position.string) for position in neck} == expected
+
+
+def test_shapes_span_four_frets_and_stay_in_them():
+    for shape in scale_map(TUNING, 'A', 'minor').shapes:
+        assert shape.max_fret - shape.min_fret == const.CAGED_SHAPE_FRETS - 1 or shape.min_fret == 0
+        assert all(shape.min_fret <= position.fret <= shape.max_fret for position in shape.positions)
+
+
+def test_scale_maps_are_memoized():
+    assert scale_map(TUNING, 'C', 'major') is scale_map(list(TUNING), 'C', 'major')
+
+
+def test_all_shapes_only_includes_shapes_that_fit():
+    shapes = all_shapes(TUNING, frets=13)
+
+    assert shapes
+    assert all(shape.max_fret < 13 for _, shape in shapes)
+    assert len(all_shapes(TUNING, frets=13, fits=False)) == 12 * len(const.SCALES) * len(const.CAGED_SHAPES)
+
+
+def test_degree_name():
+    assert degree_name(0) == 'R'
+    assert degree_name(7) == const.INTERVALS[7]
@@ -0,0 +1,40 @@
+import time
+
+import pygame
+import pytest
+
+from games.base import Scene
+from scheduler import FrameScheduler
+
+
+@pytest.fixture
+def events():
+    pygame.display.init()
+    yield
+    pygame.display.quit()
+
+
+def test_idle_scene_blocks(events):
+    scene = Scene()
+    scene.get_dirty_rects()
+
+    start = time.perf_counter()
+    FrameScheduler(60, 10).get_events(scene)
+
+    assert time.perf_counter() - start >= 0.09
+
+
+@pytest.mark.parametrize('rect', [None, (0, 0, 10, 10)])
+def test_invalidated_scene_is_drawn_without_waiting(events, rect):
+    scene = Scene()
+    scene.get_dirty_rects()
+    scene.invalidate(rect)
+    assert scene.needs_redraw()
+
+    start = time.perf_counter()
+    FrameScheduler(60, 1).get_events(scene)
+
+    assert time.perf_counter() - start < 0.5
+
+    scene.get_dirty_rects()
+    assert not scene.needs_redraw()
@@ -0,0 +1,119 @@
+import time
+
+import numpy as np
+import pytest
+
+from games.stats import HeatmapData, LATENCY_BIN_WIDTH, LATENCY_BINS
+from history import HistoryStore
+
+NAN = float('nan')
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / 'attempts.sqlite3'), flush_interval=0.01)
+    yield store
+    store.close()
+
+
+def rows(*attempts):
+    return np.array([(i + 1,) + attempt for i, attempt in enumerate(attempts)], dtype=np.float64)
+
+
+def wait_for_refresh(data):
+    deadline = time.monotonic() + 5
+    while data.refreshing and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_add_rows_counts_positions():
+    data = HeatmapData(None, strings=6, frets=13)
+    data.add_rows(rows((3, 1, 1, 0.5), (3, 1, 0, 0.7), (0, 5, 1, NAN)))
+
+    assert data.attempts[1, 3] == 2 and data.correct[1, 3] == 1
+    assert data.attempts[5, 0] == 1 and data.correct[5, 0] == 1
+    assert data.attempts.sum() == 3
+
+    accuracy = data.accuracy()
+    assert accuracy[1, 3] == 0.5 and accuracy[5, 0] == 1
+    assert np.isnan(accuracy[0, 0])
+
+    # untimed attempts count, but have no latency
+    assert data.latency_histogram[5, 0].sum() == 0
+    assert data.latency_histogram[1, 3].sum() == 2
+
+
+def test_add_rows_ignores_positions_off_the_board():
+    data = HeatmapData(None, strings=4, frets=13)
+    data.add_rows(rows((3, 5, 1, 0.5), (13, 0, 1, 0.5), (-1, 0, 1, 0.5), (12, 3, 1, 0.5)))
+
+    assert data.attempts.sum() == 1
+    assert data.attempts[3, 12] == 1
+
+
+def test_median_latency():
+    data = HeatmapData(None, strings=6, frets=13)
+    data.add_rows(rows((2, 0, 1, 0.31), (2, 0, 1, 1.25), (2, 0, 0, 4.0), (7, 4, 1, 0.05), (7, 4, 1, 60.0)))
+
+    median = data.median_latency()
+
+    # to the middle of the median's bin
+    assert median[0, 2] == pytest.approx(1.25)
+    assert median[4, 7] == pytest.approx(LATENCY_BIN_WIDTH / 2)
+    assert np.isnan(median[1, 1])
+
+
+def test_slow_responses_share_the_last_bin():
+    data = HeatmapData(None, strings=6, frets=13)
+    data.add_rows(rows((0, 0, 1, 60.0), (0, 0, 1, 600.0)))
+
+    assert data.latency_histogram[0, 0, LATENCY_BINS - 1] == 2
+    assert data.median_latency()[0, 0] == pytest.approx((LATENCY_BINS - 0.5) * LATENCY_BIN_WIDTH)
+
+
+def test_collect_folds_in_new_attempts(store):
+    data = HeatmapData(store, strings=6, frets=13)
+    assert not data.collect()
+
+    data.refresh()
+    wait_for_refresh(data)
+
+    # an empty history still counts as loaded
+    assert data.collect()
+    assert data.loaded and data.attempts.sum() == 0
+    assert not data.collect()
+
+    store.record('play_namenotes', 'Guitar', 3, 1, 'D', 'D', True, 0.5)
+    store.record('play_namenotes', 'Guitar', 3, 1, 'D', 'E', False, 0.9)
+    store.flush()
+
+    data.refresh()
+    wait_for_refresh(data)
+
+    assert data.collect()
+    assert data.attempts[1, 3] == 2 and data.correct[1, 3] == 1
+
+    # only attempts since the last refresh are fetched
+    store.record('play_namenotes', 'Guitar', 0, 0, 'E', 'E', True, 0.5)
+    store.flush()
+
+    data.refresh()
+    wait_for_refresh(data)
+
+    assert data.collect()
+    assert data.attempts.sum() == 3
+
+
+def test_collect_only_counts_the_instrument(store):
+    store.record('play_namenotes', 'Guitar', 3, 1, 'D', 'D', True, 0.5)
+    store.record('play_namenotes', 'Bass', 3, 1, 'C', 'C', True, 0.5)
+    store.record('play_namenotes', 'Bass', 5, 0, 'C', 'C', True, 0.5)
+    store.flush()
+
+    data = HeatmapData(store, strings=4, frets=13, instrument='Bass')
+    data.refresh()
+    wait_for_refresh(data)
+    data.collect()
+
+    assert data.attempts.sum() == 2
+    assert data.attempts[1, 3] == 1 and data.attempts[0, 5] == 1
@@ -0,0 +1,101 @@
+import pytest
+
+from timer import GameTimer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_duration_is_zero_before_start(clock):
+    assert GameTimer(clock).duration == 0
+
+
+def test_duration_excludes_time_paused(clock):
+    timer = GameTimer(clock)
+    timer.start()
+    clock.now += 2
+    timer.pause()
+    clock.now += 10
+    timer.resume()
+    clock.now += 3
+
+    assert timer.duration == pytest.approx(5)
+
+
+def test_duration_stops_with_the_timer(clock):
+    timer = GameTimer(clock)
+    timer.start()
+    clock.now += 4
+    timer.stop()
+    clock.now += 10
+
+    assert timer.duration == pytest.approx(4)
+    assert not timer.running
+
+
+def test_laps_are_measured_from_the_previous_lap(clock):
+    timer = GameTimer(clock)
+    timer.start()
+    clock.now += 1.5
+
+    assert timer.lap() == pytest.approx(1.5)
+
+    clock.now += 0.5
+    assert timer.current_lap() == pytest.approx(0.5)
+
+    clock.now += 0.25
+    assert timer.lap() == pytest.approx(0.75)
+    assert timer.split() == pytest.approx(2.25)
+
+
+def test_laps_exclude_time_paused(clock):
+    timer = GameTimer(clock)
+    timer.start()
+    clock.now += 1
+    timer.pause()
+    clock.now += 30
+    timer.resume()
+    clock.now += 1
+
+    assert timer.lap() == pytest.approx(2)
+
+
+def test_str_shows_whole_seconds(clock):
+    timer = GameTimer(clock)
+    timer.start()
+    clock.now += 75.9
+
+    assert str(timer) == '0:01:15'
+
+
+def test_presented_moves_the_lap_start_to_the_present_time(clock):
+    timer = GameTimer(clock)
+    timer.start()
+    clock.now += 1
+    timer.lap()
+    timer.drawn()
+
+    # the frame showing the new question reached the screen 20ms after it was begun
+    assert timer.presented(clock.now + 0.02)
+    assert not timer.presented(clock.now + 0.05)
+
+    clock.now += 0.5
+    assert timer.lap() == pytest.approx(0.48)
+
+
+def test_presented_needs_a_drawn_lap(clock):
+    timer = GameTimer(clock)
+    timer.start()
+    timer.lap()
+
+    assert not timer.presented(clock.now + 0.02)
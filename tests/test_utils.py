@@ -0,0 +1,46 @@
+import constants as const
+from utils import compile_tuning, fretboard_indices_to_note, open_string_midi_notes, PITCH_CLASSES
+
+
+def test_open_strings_of_standard_tuning():
+    # E4 B3 G3 D3 A2 E2, highest string first
+    assert open_string_midi_notes(const.GUITAR_STANDARD_TUNING) == [64, 59, 55, 50, 45, 40]
+
+
+def test_open_strings_climb_from_the_lowest_octave():
+    assert open_string_midi_notes(const.BASS_STANDARD_TUNING, lowest_octave=1) == [43, 38, 33, 28]
+
+
+def test_table_matches_counting_semitones():
+    tuning = const.GUITAR_STANDARD_TUNING
+    table = compile_tuning(tuning, 13)
+
+    for string, open_note in enumerate(tuning):
+        for fret in range(13):
+            expected = const.NOTES[(PITCH_CLASSES[open_note] + fret) % 12]
+            assert table.note(fret, string) == expected
+            assert table.midi_note(fret, string) == table.open_midi_notes[string] + fret
+
+
+def test_known_positions():
+    table = compile_tuning(const.GUITAR_STANDARD_TUNING)
+
+    assert table.note(1, 1) == 'C'
+    assert table.note(3, 5) == 'G'
+    assert table.note(12, 0) == 'E'
+    assert fretboard_indices_to_note(5, 4, const.GUITAR_STANDARD_TUNING) == 'D'
+
+
+def test_fret_of_finds_the_next_fret_playing_a_note():
+    table = compile_tuning(const.GUITAR_STANDARD_TUNING)
+
+    assert table.fret_of(PITCH_CLASSES['C'], 4) == 3
+    assert table.fret_of(PITCH_CLASSES['C'], 4, lowest_fret=4) == 15
+    assert table.fret_of(PITCH_CLASSES['E'], 0) == 0
+
+
+def test_tables_are_memoized_and_cover_a_full_neck():
+    table = compile_tuning(const.GUITAR_STANDARD_TUNING, 13)
+
+    assert table is compile_tuning(list(const.GUITAR_STANDARD_TUNING), 13)
+    assert table.frets >= 25
@@ -0,0 +1,101 @@
+import os
+
+import pytest
+
+import config
+import constants as const
+from pcset import PitchClassSet
+import voicings
+from voicings import all_voicings, chord_name, chord_voicings
+from utils import compile_tuning, PITCH_CLASSES
+
+TUNING = const.GUITAR_STANDARD_TUNING
+
+
+def sounding(voicing):
+    """(fret, string) of every string the voicing plays, lowest string first"""
+    return [(fret, string) for string, fret in reversed(list(enumerate(voicing.frets))) if fret is not None]
+
+
+def test_open_chords_rank_first():
+    assert chord_voicings(TUNING, 'E', 'minor')[0].frets == (0, 0, 0, 2, 2, 0)
+    assert chord_voicings(TUNING, 'C', 'major')[0].frets == (0, 1, 0, 2, 3, None)
+    assert chord_voicings(TUNING, 'G', 'major')[0].frets == (3, 0, 0, 0, 2, 3)
+
+
+@pytest.mark.parametrize('root, quality', [('C', 'major'), ('F#', 'minor 7th'), ('Bb', 'dominant 7th'), ('D', 'sus4')])
+def test_voicings_are_playable_and_play_the_chord(root, quality):
+    table = compile_tuning(TUNING)
+    tones = PitchClassSet.from_pitch_classes(interval + PITCH_CLASSES[root] for interval in const.CHORDS[quality][1])
+    found = chord_voicings(TUNING, root, quality)
+
+    assert found
+    assert [voicing.score for voicing in found] == sorted(voicing.score for voicing in found)
+
+    for voicing in found:
+        played = sounding(voicing)
+        pitch_classes = PitchClassSet.from_pitch_classes(table.pitch_class(fret, string) for fret, string in played)
+        fretted = [fret for fret, _ in played if fret]
+
+        assert len(played) >= 3
+        assert pitch_classes.issubset(tones)
+        assert table.pitch_class(*played[0]) == PITCH_CLASSES[root]
+        assert not fretted or max(fretted) - min(fretted) < 4
+        assert len(set(fretted)) <= 4
+
+
+def test_search_limits():
+    for voicing in chord_voicings(TUNING, 'A', 'major', span=3, fingers=3):
+        fretted = [fret for fret in voicing.frets if fret]
+        assert not fretted or max(fretted) - min(fretted) < 3
+        assert voicings._fingers(voicing.frets) <= 3
+
+
+def test_barre_counts_as_one_finger():
+    # an F major barre chord
+    assert voicings._fingers((1, 1, 2, 3, 3, 1)) == 4
+    # two notes on the same fret can be barred, unless an open string rings between them
+    assert voicings._fingers((0, 0, 0, 2, 2, 0)) == 1
+    assert voicings._fingers((None, 2, 0, 2, None, None)) == 2
+    assert voicings._fingers((None, None, None, None, None, None)) == 0
+
+
+def test_disk_cache_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'VOICING_CACHE_DIR', str(tmp_path))
+    tuning = const.BASS_STANDARD_TUNING
+
+    searched = all_voicings(tuning, frets=8)
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # a fresh process has nothing memoized, so the cache file is read instead
+    monkeypatch.setattr(voicings, '_voicings', {})
+    assert all_voicings(tuning, frets=8) == searched
+    assert set(searched) == {(root, quality) for root in const.NOTES for quality in const.CHORDS}
+
+
+def test_unwritable_disk_cache(tmp_path, monkeypatch, caplog):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    monkeypatch.setattr(config, 'VOICING_CACHE_DIR', str(blocker / 'voicings'))
+    tuning = const.BASS_STANDARD_TUNING
+
+    # the search result is returned all the same
+    assert all_voicings(tuning, frets=8)[('C', 'major')] == chord_voicings(tuning, 'C', 'major', frets=8)
+    assert 'could not write the chord voicing cache' in caplog.text
+
+
+def test_failed_cache_write_leaves_no_temporary_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'VOICING_CACHE_DIR', str(tmp_path))
+    tuning = const.BASS_STANDARD_TUNING
+    params = (tuple(tuning), 4, 4, 8, 3, 1)
+
+    # a directory where the cache file should go can't be replaced
+    os.mkdir(voicings._cache_path(params))
+
+    assert all_voicings(tuning, frets=8)
+    assert [path.name for path in tmp_path.iterdir()] == [os.path.basename(voicings._cache_path(params))]
+
+
+def test_chord_name():
+    assert chord_name('C', 'major') == 'C'
+    assert chord_name('F#', 'minor 7th') == 'F#m7'
@@ -1,34 +1,120 @@
 from datetime import timedelta
-import threading
 import time
 
+# what game timers read when they aren't given a clock; a FrameClock while recording or replaying
+default_clock = time.perf_counter
 
-class GameTimer(threading.Thread):
 
-    def __init__(self):
-        threading.Thread.__init__(self)
-        self._paused = False
-        self._duration = 0
-        self._stopped = False
+class FrameClock:
+    """
+    A clock that only moves when it's advanced. Advanced once a frame, everything timed within the
+    frame reads the same time, so a replay that advances it through the recorded frame times sees
+    exactly the times the recorded session did.
+    """
 
-    def pause(self):
-        self._paused = True
+    def __init__(self, now=0.0):
+        self.now = now
 
-    def stop(self):
-        self._stopped = True
+    def advance_to(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class GameTimer:
+    """
+    Pausable game clock read from a monotonic high resolution counter. Time spent paused is excluded
+    from the duration, laps and splits.
+    """
+
+    def __init__(self, clock=None):
+        self._clock = clock if clock is not None else default_clock
+        self._started_at = None
+        self._paused_at = None
+        self._stopped_at = None
+        self._paused_total = 0
+        self._last_lap = 0
+        self._unshown_lap = None
+        self._drawn_lap = None
+
+    def start(self):
+        self._started_at = self._clock()
+        self._paused_at = None
+        self._stopped_at = None
+        self._paused_total = 0
+        self._last_lap = 0
+        self._unshown_lap = None
+        self._drawn_lap = None
+
+    def pause(self):
+        if self.running:
+            self._paused_at = self._clock()
 
     def resume(self):
-        self._paused = False
+        if self._paused_at is not None and self._stopped_at is None:
+            self._paused_total += self._clock() - self._paused_at
+            self._paused_at = None
 
-    def run(self):
-        while not self._stopped:
-            if not self._paused:
-                self._duration += 1
-            time.sleep(1)
+    def stop(self):
+        if self._started_at is not None and self._stopped_at is None:
+            self._stopped_at = self._paused_at if self._paused_at is not None else self._clock()
+
+    @property
+    def running(self):
+        return self._started_at is not None and self._paused_at is None and self._stopped_at is None
 
     @property
     def duration(self):
-        return self._duration
+        """Seconds the timer has been running for"""
+        if self._started_at is None:
+            return 0
+
+        if self._stopped_at is not None:
+            now = self._stopped_at
+        elif self._paused_at is not None:
+            now = self._paused_at
+        else:
+            now = self._clock()
+
+        return now - self._started_at - self._paused_total
+
+    def lap(self):
+        """Return the seconds since the previous lap (or the start) and begin a new lap"""
+        now = self.duration
+        lap_time = now - self._last_lap
+        self._last_lap = now
+        self._unshown_lap = self._clock()
+        return lap_time
+
+    def current_lap(self):
+        """Return the seconds since the previous lap (or the start) without ending the lap"""
+        return self.duration - self._last_lap
+
+    def drawn(self):
+        """Note that a frame showing whatever the current lap times has been drawn"""
+        if self._unshown_lap is not None:
+            self._drawn_lap = self._unshown_lap
+            self._unshown_lap = None
+
+    def presented(self, at):
+        """
+        Start the current lap at `at`, the clock time the drawn frame reached the screen, rather than
+        when it was begun, so it doesn't include drawing and presenting
+        :return: whether the lap was moved
+        """
+        if self._drawn_lap is None:
+            return False
+
+        if self.running:
+            self._last_lap += max(0, at - self._drawn_lap)
+
+        self._drawn_lap = None
+        return True
+
+    def split(self):
+        """Return the seconds since the start without ending the current lap"""
+        return self.duration
 
     def __str__(self):
-        return str(timedelta(seconds=self._duration))
+        return str(timedelta(seconds=int(self.duration)))
@@ -1,13 +1,129 @@
-from collections import namedtuple
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+import math
 
 import pygame
 
-import constants as const
 import config
+from instruments import fret_positions, inlays
+from utils import compile_tuning, PITCH_CLASSES
+
+
+class TextCache:
+    """Bounded LRU cache of rendered text surfaces"""
+
+    def __init__(self, max_size):
+        self._max_size = max_size
+        self._surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, antialias, colour):
+        key = (font, text, antialias, colour)
+
+        try:
+            surface = self._surfaces[key]
+        except KeyError:
+            self.misses += 1
+            surface = self._surfaces[key] = font.render(text, antialias, colour)
+
+            if len(self._surfaces) > self._max_size:
+                self._surfaces.popitem(last=False)
+        else:
+            self.hits += 1
+            self._surfaces.move_to_end(key)
+
+        return surface
+
+    def clear(self):
+        self._surfaces.clear()
+
+    def __len__(self):
+        return len(self._surfaces)
+
+
+text_cache = TextCache(config.TEXT_CACHE_SIZE)
+
+
+class Layout:
+    """
+    Scenes are laid out in design coordinates, config.SCREEN_WIDTH x config.SCREEN_HEIGHT, which are
+    mapped onto the window. Positions stretch with the window, while fonts and shapes scale evenly by
+    the smaller of the two stretches. `version` changes on each resize so that anything drawn for a
+    size knows to rebuild, and those builds are kept per scale so returning to a size is free.
+    """
+
+    # scales are rounded to this step so that dragging a window edge doesn't build a new set of
+    # fonts and surfaces for every pixel
+    SCALE_STEP = 1 / 16
+
+    def __init__(self):
+        self.width = None
+        self.height = None
+        self.version = 0
+        self.resize(config.SCREEN_WIDTH, config.SCREEN_HEIGHT)
+
+    def resize(self, width, height):
+        """Lay out for a new window size. Returns whether anything changed."""
+        if (width, height) == (self.width, self.height):
+            return False
+
+        self.width = width
+        self.height = height
+        self.scale_x = width / config.SCREEN_WIDTH
+        self.scale_y = height / config.SCREEN_HEIGHT
+        self.scale = max(self.SCALE_STEP, round(min(self.scale_x, self.scale_y) / self.SCALE_STEP) * self.SCALE_STEP)
+        self.version += 1
+
+        config.FONTS.set_scale(self.scale)
+        return True
+
+    def x(self, x):
+        return x * self.scale_x
+
+    def y(self, y):
+        return y * self.scale_y
+
+    def scaled(self, length):
+        """A size in design pixels, such as a line width or radius, at the current scale"""
+        return max(1, int(round(length * self.scale)))
+
+
+layout = Layout()
+
+
+def render_text(font, text, colour=config.COLOUR_DEFAULT, antialias=True):
+    """
+    Render text through the shared cache. The returned surface is shared, so blit it but don't draw on it.
+    """
+    return text_cache.render(font, text, antialias, colour)
 
 
 class Element:
     value = None
+    rect = None
+    _dirty = True
+
+    # bumped whenever any element moves, so hit-testing indexes know to rebuild
+    layout_version = 0
+
+    def _set_rect(self, rect):
+        if rect != self.rect:
+            self.rect = rect
+            self._dirty = True
+            Element.layout_version += 1
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def pop_dirty_rect(self):
+        """Return the region this element changed since the last call, if any"""
+        if self._dirty and self.rect is not None:
+            self._dirty = False
+            return self.rect
+
+        return None
 
     def is_clicked(self, x, y):
         raise NotImplementedError
@@ -16,196 +132,362 @@ class Element:
         raise NotImplementedError
 
 
-class FretboardDisplay(Element):
-    """The fretboard display component"""
+class ElementIndex:
+    """
+    A uniform grid over the rects of a list of elements, so a point query only tests the elements
+    overlapping one cell rather than every element
+    """
+
+    CELL_SIZE = 64
+
+    def __init__(self):
+        self._cells = {}
+        self._elements = None
+        self._element_count = None
+        self._layout_version = None
 
-    Fret = namedtuple('Fret', ['x', 'mid_x', 'region_x', 'region_width'])
-    String = namedtuple('String', ['y', 'mid_y', 'region_y', 'region_height'])
+    def sync(self, elements):
+        """Rebuild the grid if the element list or any element's position has changed"""
+        if elements is self._elements and len(elements) == self._element_count and \
+                self._layout_version == Element.layout_version:
+            return
 
-    def __init__(self, frets=13, strings=6):
-        self._frets = []
-        self._strings = []
-        self._start_x = config.FRETBOARD_X_MARGIN
-        self._end_x = config.SCREEN_WIDTH - config.FRETBOARD_X_MARGIN
-        self._start_y = config.SCREEN_HEIGHT / 2 - ((strings / 2) * config.STRING_SPACING)
-        self._end_y = self._start_y + (strings - 1) * config.STRING_SPACING
+        self._cells = {}
 
-        self.generate_board(frets, strings)
+        for elem in elements:
+            rect = elem.rect
+            if rect is None or not rect.width or not rect.height:
+                continue
+
+            for cell_x in range(rect.left // self.CELL_SIZE, (rect.right - 1) // self.CELL_SIZE + 1):
+                for cell_y in range(rect.top // self.CELL_SIZE, (rect.bottom - 1) // self.CELL_SIZE + 1):
+                    self._cells.setdefault((cell_x, cell_y), []).append(elem)
+
+        self._elements = elements
+        self._element_count = len(elements)
+        self._layout_version = Element.layout_version
+
+    def element_at(self, x, y):
+        """Return the first element (in list order) that accepts a click at x, y"""
+        for elem in self._cells.get((int(x) // self.CELL_SIZE, int(y) // self.CELL_SIZE), ()):
+            if elem.is_clicked(x, y):
+                return elem
+
+        return None
+
+
+class FretboardDisplay(Element):
+    """
+    The fretboard display component. Its geometry is precomputed into flat arrays indexed by fret or
+    string, so drawing a position or hit-testing a point costs the same on any size of board.
+    """
+
+    # pre-rendered static boards shared between instances, keyed by geometry, most recently used last
+    _board_layers = OrderedDict()
+    BOARD_LAYER_CACHE_SIZE = 8
+
+    def __init__(self, frets=13, strings=6, tempered=None):
+        self._board_layer = None
+        self._fret_count = frets
+        self._string_count = strings
+        # read when the board is made rather than imported, so a replay's recorded setting applies
+        self._tempered = config.TEMPERED_FRETS if tempered is None else tempered
+        self._layout_version = None
+
+        self._update_layout()
+
+    @property
+    def fret_count(self):
+        return self._fret_count
+
+    @property
+    def string_count(self):
+        return self._string_count
+
+    def _update_layout(self):
+        """Recompute the board's geometry from the window size, if it's changed since last time"""
+        if self._layout_version == layout.version:
+            return
+
+        self._layout_version = layout.version
+        self._string_spacing = layout.y(config.STRING_SPACING)
+        self._start_x = layout.x(config.FRETBOARD_X_MARGIN)
+        self._end_x = layout.x(config.SCREEN_WIDTH - config.FRETBOARD_X_MARGIN)
+        self._start_y = layout.y(config.SCREEN_HEIGHT / 2) - ((self._string_count / 2) * self._string_spacing)
+        self._end_y = self._start_y + (self._string_count - 1) * self._string_spacing
+
+        self.generate_board(self._fret_count, self._string_count)
 
     def show_root_notes(self, screen, tuning, key):
-        for string_index, string_tuning in enumerate(tuning):
-            index = const.NOTES.index(key) - const.NOTES.index(string_tuning) - 1
-            self.render_dot(screen, index, string_index, colour=(255, 0, 0), shape=3)
+        table = compile_tuning(tuning)
+        root = PITCH_CLASSES[key]
+
+        for string_index in range(len(tuning)):
+            fret = table.fret_of(root, string_index, lowest_fret=1)
+            if fret < self._fret_count:
+                self.render_dot(screen, fret, string_index, colour=(255, 0, 0), shape=3)
 
     def generate_board(self, frets, strings):
-        for i in range(frets):
-            fret_x = self._start_x + i * config.FRET_SPACING
-            self._frets.append(
-                self.Fret(
-                    fret_x,
-                    fret_x - config.FRET_SPACING / 2 if i != 0 else fret_x,
-                    fret_x - config.FRET_SPACING if i != 0 else fret_x - 10,
-                    config.FRET_SPACING if i != 0 else 10,
-                )
-            )
-        for i in range(strings):
-            string_y = self._start_y + i * config.STRING_SPACING
-            self._strings.append(
-                self.String(
-                    string_y,
-                    string_y,
-                    string_y - config.STRING_SPACING / 2,
-                    config.STRING_SPACING
-                )
-            )
+        self._board_layer = None
+        nut_region = layout.scaled(10)
+        width = self._end_x - self._start_x
+
+        # each fret's region runs from the fret below it up to the fret itself, the open strings'
+        # region is a strip behind the nut
+        self._fret_x = array('d', (self._start_x + width * position
+                                   for position in fret_positions(frets, self._tempered)))
+        self._fret_region_x = array('d', [self._start_x - nut_region]) + self._fret_x[:-1]
+        self._fret_mid_x = array('d', [self._start_x]) + array('d', (
+            (below + fret_x) / 2 for below, fret_x in zip(self._fret_x, self._fret_x[1:])))
+
+        # the widest dot that fits each fret, open strings getting the room of the first fret
+        room = [int(fret_x - region_x) for fret_x, region_x in zip(self._fret_x, self._fret_region_x)]
+        self._dot_room = array('i', room[1:2] + room[1:] if frets > 1 else room)
+
+        self._string_y = array('d', (self._start_y + i * self._string_spacing for i in range(strings)))
+        self._string_region_y = array('d', (string_y - self._string_spacing / 2 for string_y in self._string_y))
+        self._string_edges = array('d', (string_y + self._string_spacing / 2 for string_y in self._string_y))
 
     def get_index(self, mouse_x, mouse_y):
         """Take mouse coords and determine the fret and string that has been clicked"""
+        self._update_layout()
 
-        string_index = None
-        fret_index = None
+        if not self._fret_region_x[0] <= mouse_x <= self._fret_x[-1] or \
+                not self._string_region_y[0] <= mouse_y <= self._string_edges[-1]:
+            return None
 
-        # if self._frets[0].region_x <= mouse_x <= self._frets[-1].region_x + self._frets[-1].region_width and \
-        #     self._strings[0].region_y <= mouse_y <= self._strings[-1].region_y + self._strings[-1].region_height:
+        # regions are contiguous, each ending at its fret or string edge, and a point on the boundary
+        # belongs to the lower index
+        return bisect_left(self._fret_x, mouse_x), bisect_left(self._string_edges, mouse_y)
 
-        for i, fret in enumerate(self._frets):
-            if fret.region_x <= mouse_x <= fret.region_x + fret.region_width:
-                fret_index = i
-                break
+    def _board_key(self):
+        return (
+            self._start_x, self._end_x, self._start_y, self._end_y, layout.scale,
+            self._fret_count, self._string_count, self._tempered,
+        )
 
-        for i, string in enumerate(self._strings):
-            if string.region_y <= mouse_y <= string.region_y + string.region_height:
-                string_index = i
-                break
+    def _get_board_layer(self):
+        """Return the (surface, position) of the pre-rendered static board, building it on first use"""
+        if self._board_layer is None:
+            key = self._board_key()
+            layers = self._board_layers
 
-        if fret_index is not None and string_index is not None:
-            return fret_index, string_index
+            if key in layers:
+                layers.move_to_end(key)
+            else:
+                layers[key] = self._build_board_layer()
 
-        return None
+                if len(layers) > self.BOARD_LAYER_CACHE_SIZE:
+                    layers.popitem(last=False)
 
-    def render(self, screen):
+            self._board_layer = layers[key]
+
+        return self._board_layer
+
+    def _build_board_layer(self):
+        """Draw the nut, frets, strings and inlays once onto a transparent surface"""
+        nut_width = layout.scaled(3)
+        line_width = layout.scaled(1)
+
+        origin_x = int(self._start_x) - nut_width
+        origin_y = int(self._start_y) - nut_width
+
+        layer = pygame.Surface(
+            (int(self._end_x - self._start_x) + 2 * nut_width + 1, int(self._end_y - self._start_y) + 2 * nut_width + 1),
+            pygame.SRCALPHA
+        )
+
+        def offset(x, y):
+            return x - origin_x, y - origin_y
 
         # draw nut
-        pygame.draw.line(screen, (0, 0, 0), (50, self._start_y), (50, self._end_y), 3)
+        pygame.draw.line(layer, (0, 0, 0), offset(self._start_x, self._start_y), offset(self._start_x, self._end_y),
+                         nut_width)
 
         # draw frets
-        for fret in self._frets:
-            pygame.draw.line(screen, (0, 0, 0), (fret.x, self._start_y), (fret.x, self._end_y), 1)
+        for fret_x in self._fret_x:
+            pygame.draw.line(layer, (0, 0, 0), offset(fret_x, self._start_y), offset(fret_x, self._end_y), line_width)
 
         # draw strings
-        for string in self._strings:
-            pygame.draw.line(screen, (0, 0, 0), (self._start_x, string.y), (self._end_x, string.y), 1)
+        for string_y in self._string_y:
+            pygame.draw.line(layer, (0, 0, 0), offset(self._start_x, string_y), offset(self._end_x, string_y),
+                             line_width)
+
+        for fret, string_position in inlays(self._fret_count, self._string_count):
+            pygame.draw.circle(layer, (0, 0, 0),
+                               offset(int(self._fret_mid_x[fret]),
+                                      int(self._start_y + string_position * self._string_spacing)),
+                               min(layout.scaled(5), self._dot_room[fret] // 2), 0)
 
-        for fret_index, string_index in const.GUITAR_DOTS:
-            pygame.draw.circle(screen, (0, 0, 0),
-                               (int(self._frets[fret_index].mid_x + config.FRET_SPACING),
-                                int(self._strings[string_index].mid_y + config.STRING_SPACING / 2)), 5, 0)
+        return layer, (origin_x, origin_y)
+
+    def render(self, screen):
+        self._update_layout()
+
+        layer, position = self._get_board_layer()
+        screen.blit(layer, position)
+
+    def cell_rect(self, fret, string):
+        """The region of the board that a (fret, string) position covers"""
+        self._update_layout()
+
+        # rounded outwards to whole pixels, so the rect covers everything drawn in the region
+        left = math.floor(self._fret_region_x[fret])
+        top = math.floor(self._string_region_y[string])
+        return pygame.Rect(left, top, math.ceil(self._fret_x[fret]) - left, math.ceil(self._string_edges[string]) - top)
 
     def render_dot(self, screen, fret, string, colour=(64, 224, 208), shape=1):
         """Draw a dot in teh middle of the string"""
-        x = int(self._frets[fret].mid_x)
-        y = int(self._strings[string].mid_y)
+        self._update_layout()
+
+        x = int(self._fret_mid_x[fret])
+        y = int(self._string_y[string])
+        room = self._dot_room[fret]
 
         if shape == 1:
-            pygame.draw.circle(screen, colour, (x, y), 10, 0)
+            pygame.draw.circle(screen, colour, (x, y), min(layout.scaled(10), room // 2), 0)
         elif shape == 2:
-            pygame.draw.rect(screen, colour, (x - 10, y - 10, 20, 20))
+            size = min(layout.scaled(20), room)
+            pygame.draw.rect(screen, colour, (x - size // 2, y - size // 2, size, size))
         else:
-            pygame.draw.rect(screen, colour, (x - 5, y - 5, 10, 10))
+            size = min(layout.scaled(10), room)
+            pygame.draw.rect(screen, colour, (x - size // 2, y - size // 2, size, size))
 
-    def render_scale(self, screen, scale, offset):
-        for string_index, string in enumerate(scale):
-            for fret in string:
-                self.render_dot(screen, fret + offset, string_index, (204, 153, 255))
+    def render_scale(self, screen, positions, colour=(204, 153, 255)):
+        """Draw a dot on each of a list of positions, anything with fret and string attributes"""
+        for position in positions:
+            if position.fret < self._fret_count:
+                self.render_dot(screen, position.fret, position.string, colour)
 
     def draw_bounding_box(self, screen, min_fret, max_fret, min_string, max_string, colour=(255, 0, 0)):
+        self._update_layout()
+
+        pad_x = layout.scaled(10)
+        pad_y = layout.scaled(5)
+
         rect = pygame.Rect(
-            self._frets[min_fret].region_x - (10 if min_fret != 0 else 0),
-            self._strings[min_string].region_y - 5,
-            self._frets[max_fret].region_x + self._frets[max_fret].region_width - self._frets[min_fret].region_x + 20,
-            self._strings[max_string].region_y + self._strings[max_string].region_height - self._strings[min_string].region_y + 10
+            self._fret_region_x[min_fret] - (pad_x if min_fret != 0 else 0),
+            self._string_region_y[min_string] - pad_y,
+            self._fret_x[max_fret] - self._fret_region_x[min_fret] + 2 * pad_x,
+            self._string_edges[max_string] - self._string_region_y[min_string] + 2 * pad_y
         )
 
-        pygame.draw.rect(screen, colour, rect, 2)
+        pygame.draw.rect(screen, colour, rect, layout.scaled(2))
 
 
 class Button(Element):
     CENTRE = -1
 
-    def __init__(self, value, text, x, y, padding=10, width=None, height=None, font=None):
+    def __init__(self, value, text, x, y, padding=10, width=None, height=None, font='button'):
+        """
+        Positions and sizes are in design coordinates
+        :param font: name of the font in config.FONTS
+        """
         self._x = x
         self._y = y
         self._text = text
-        font = font or config.FONTS['button']
+        self._padding = padding
+        self._width = width
+        self._height = height
+        self._font = font
         self.value = value
 
-        text_image = font.render(text, True, config.COLOUR_DEFAULT)
+        # the button drawn at each scale it's been shown at
+        self._surfaces = {}
 
-        if not width:
-            width = 2 * padding + text_image.get_width()
+    def _get_surface(self):
+        try:
+            return self._surfaces[layout.scale]
+        except KeyError:
+            pass
 
-        if not height:
-            height = 2 * padding + text_image.get_height()
+        text_image = render_text(config.FONTS[self._font], self._text)
+        padding = layout.scaled(self._padding)
 
-        self._button = pygame.Surface((width, height))
+        width = layout.scaled(self._width) if self._width else 2 * padding + text_image.get_width()
+        height = layout.scaled(self._height) if self._height else 2 * padding + text_image.get_height()
 
-        self._button.fill(config.COLOUR_BACKGROUND)
+        button = self._surfaces[layout.scale] = pygame.Surface((width, height))
+
+        button.fill(config.COLOUR_BACKGROUND)
 
         # put a box around the button
         pygame.draw.rect(
-            self._button,
+            button,
             config.COLOUR_DEFAULT,
-            pygame.Rect(0, 0, self._button.get_width()-1, self._button.get_height()-1),
-            1
+            pygame.Rect(0, 0, button.get_width()-1, button.get_height()-1),
+            layout.scaled(1)
         )
 
         # draw text onto the button
-        text_rect = text_image.get_rect(center=(self._button.get_width()/2, self._button.get_height()/2))
+        text_rect = text_image.get_rect(center=(button.get_width()/2, button.get_height()/2))
 
-        self._button.blit(text_image, text_rect)
+        button.blit(text_image, text_rect)
 
-        self._button_rect = None
+        return button
 
     def render(self, screen):
-        x_pos = self._x
-        y_pos = self._y
+        button = self._get_surface()
+
+        x_pos = layout.x(self._x)
+        y_pos = layout.y(self._y)
 
         if self._x == self.CENTRE:
-            x_pos = screen.get_width() / 2 - self._button.get_width() / 2
+            x_pos = screen.get_width() / 2 - button.get_width() / 2
 
         if self._y == self.CENTRE:
-            y_pos = screen.get_height() / 2 - self._button.get_height() / 2
+            y_pos = screen.get_height() / 2 - button.get_height() / 2
 
-        self._button_rect = screen.blit(self._button, (int(x_pos), int(y_pos),))
+        self._set_rect(screen.blit(button, (int(x_pos), int(y_pos),)))
 
     def is_clicked(self, mouse_x, mouse_y):
-        return self._button_rect.collidepoint(mouse_x, mouse_y)
+        return self.rect.collidepoint(mouse_x, mouse_y)
 
 
 class Text(Element):
     CENTRE = -1
 
-    def __init__(self, text, x, y, font=None, colour=config.COLOUR_DEFAULT, *args, **kwargs):
+    def __init__(self, text, x, y, font='default', colour=config.COLOUR_DEFAULT, *args, **kwargs):
+        """
+        Positions are in design coordinates
+        :param font: name of the font in config.FONTS
+        """
         self._x = x
         self._y = y
+        self._text = text
+        self._font = font
+        self._colour = colour
+
+        # the rendered text at each scale it's been shown at, and where it goes in the current layout
+        self._images = {}
         self._coords = None
-        self._image = (font or config.FONTS['default']).render(text, True, colour)
+        self._layout_version = None
+
+    def _get_image(self):
+        try:
+            return self._images[layout.scale]
+        except KeyError:
+            image = self._images[layout.scale] = render_text(config.FONTS[self._font], self._text, self._colour)
+            return image
 
     def render(self, screen):
-        if not self._coords:
+        image = self._get_image()
+
+        if self._layout_version != layout.version:
             if self._x == self.CENTRE:
-                x_pos = screen.get_width() / 2 - self._image.get_width() / 2
+                x_pos = screen.get_width() / 2 - image.get_width() / 2
             else:
-                x_pos = self._x
+                x_pos = layout.x(self._x)
 
             if self._y == self.CENTRE:
-                y_pos = screen.get_height() / 2 - self._image.get_height() / 2
+                y_pos = screen.get_height() / 2 - image.get_height() / 2
             else:
-                y_pos = self._y
+                y_pos = layout.y(self._y)
 
             self._coords = (x_pos, y_pos)
+            self._layout_version = layout.version
 
-        screen.blit(self._image, self._coords)
+        self._set_rect(screen.blit(image, self._coords))
 
     def is_clicked(self, *args):
         return False
@@ -1,9 +1,19 @@
+from array import array
+from functools import lru_cache
+
 import constants as const
 
+# semitone above C of every note name, sharps and flats
+PITCH_CLASSES = {note: i for i, note in enumerate(const.NOTES)}
+PITCH_CLASSES.update({note: i for i, note in enumerate(const.NOTES_FLATS)})
+
+# frets covered by a compiled tuning unless asked for more, enough for a 24 fret neck
+DEFAULT_FRET_COUNT = 25
+
 
 class NoteIterator:
     def __init__(self, start_note, stop):
-        self._index = const.NOTES.index(start_note)
+        self._index = PITCH_CLASSES[start_note]
         self._required_notes = stop
 
     def __iter__(self):
@@ -26,9 +36,63 @@ class NoteIterator:
         return note
 
 
-def fretboard_indices_to_note(fret, string, tuning):
-    open_note = tuning[string]
+def open_string_midi_notes(tuning, lowest_octave=2):
+    """
+    MIDI note numbers of the open strings, listed highest string first like the tuning. The lowest
+    string is placed in `lowest_octave` and each string above is the next matching note up.
+    """
+    pitch_classes = [PITCH_CLASSES[note] for note in reversed(tuning)]
+    notes = [12 * (lowest_octave + 1) + pitch_classes[0]]
+
+    for pitch_class in pitch_classes[1:]:
+        notes.append(notes[-1] + ((pitch_class - notes[-1]) % 12 or 12))
+
+    return notes[::-1]
+
+
+class TuningTable:
+    """The pitch class of every position of a tuning, stored as a dense strings x frets array"""
+
+    def __init__(self, tuning, frets, lowest_octave=2):
+        self.tuning = tuning
+        self.strings = len(tuning)
+        self.frets = frets
+
+        self.open_pitch_classes = array('B', (PITCH_CLASSES[note] for note in tuning))
+        self.open_midi_notes = array('B', open_string_midi_notes(tuning, lowest_octave))
 
-    start_index = const.NOTES.index(open_note)
+        self.pitch_classes = array('B', (
+            (open_pitch_class + fret) % 12
+            for open_pitch_class in self.open_pitch_classes
+            for fret in range(frets)
+        ))
 
-    return const.NOTES[(start_index + fret) % 12]
\ No newline at end of file
+    def pitch_class(self, fret, string):
+        return self.pitch_classes[string * self.frets + fret]
+
+    def note(self, fret, string):
+        return const.NOTES[self.pitch_classes[string * self.frets + fret]]
+
+    def midi_note(self, fret, string):
+        return self.open_midi_notes[string] + fret
+
+    def fret_of(self, pitch_class, string, lowest_fret=0):
+        """Return the first fret at or above `lowest_fret` on `string` that plays `pitch_class`"""
+        return lowest_fret + (pitch_class - self.pitch_class(lowest_fret, string)) % 12
+
+
+@lru_cache(maxsize=None)
+def _compile_tuning(tuning, frets, lowest_octave):
+    return TuningTable(tuning, frets, lowest_octave)
+
+
+def compile_tuning(tuning, frets=DEFAULT_FRET_COUNT, lowest_octave=2):
+    """
+    Return the (memoized) lookup table for a tuning, given as a list of open string note names
+    :param lowest_octave: octave of the lowest string, only needed for MIDI note numbers
+    """
+    return _compile_tuning(tuple(tuning), max(frets, DEFAULT_FRET_COUNT), lowest_octave)
+
+
+def fretboard_indices_to_note(fret, string, tuning):
+    return compile_tuning(tuning, fret + 1).note(fret, string)
@@ -0,0 +1,242 @@
+"""
+Chord voicings: every playable way of fingering a chord on a fretboard, ranked easiest first
+"""
+from collections import namedtuple
+from functools import lru_cache
+import hashlib
+import logging
+import os
+import pickle
+
+import config
+import constants as const
+from pcset import PitchClassSet
+from utils import compile_tuning, PITCH_CLASSES
+
+logger = logging.getLogger(__name__)
+
+# frets holds the fret played on each string, highest string first like the tuning, None if muted
+Voicing = namedtuple('Voicing', ['frets', 'root', 'quality', 'score'])
+
+# bump whenever the search or the ranking changes, so stale disk caches are ignored
+CACHE_VERSION = 1
+
+# playability penalties, a voicing's score is the weighted sum and lower scores rank first
+SCORE_WEIGHTS = {
+    # frets between the lowest and highest fretted notes
+    'span': 1.0,
+    # fingers needed, a barre across the lowest fret counting as one
+    'fingers': 1.5,
+    # muted strings between sounding strings, and muted strings at either edge
+    'inner_mutes': 4.0,
+    'outer_mutes': 2.0,
+    # frets up the neck of the highest fretted note
+    'position': 1.0,
+    # open strings make chords easier to play
+    'open_strings': -0.5,
+    # chord tones left out
+    'omitted': 1.5,
+}
+
+_voicings = {}
+
+
+def chord_name(root, quality):
+    return root + const.CHORDS[quality][0]
+
+
+def _chord_masks(root, quality):
+    """The pitch classes of a chord as sets: all of them, and those that must be played"""
+    intervals = const.CHORDS[quality][1]
+    tones = PitchClassSet.from_pitch_classes(intervals).transpose(PITCH_CLASSES[root])
+
+    # a perfect fifth can be left out of chords of four or more notes
+    required = tones
+    if len(intervals) >= 4 and 7 in intervals:
+        required = PitchClassSet(tones & ~(1 << (PITCH_CLASSES[root] + 7) % 12))
+
+    return tones, required
+
+
+@lru_cache(maxsize=None)
+def _string_candidates(tuning, tones, frets):
+    """For each string from the lowest up, the (fret, pitch class bit) of every chord tone on it"""
+    table = compile_tuning(tuning, frets)
+    strings = len(tuning)
+
+    return [
+        [(fret, 1 << table.pitch_class(fret, string))
+         for fret in range(frets) if tones >> table.pitch_class(fret, string) & 1]
+        for string in reversed(range(strings))
+    ]
+
+
+def _fingers(frets):
+    """
+    Fingers needed to fret a voicing, counting the lowest fret as a single barre when it's played on
+    more than one string and there's no open string under the barre
+    """
+    fretted = [fret for fret in frets if fret]
+    if not fretted:
+        return 0
+
+    lowest = min(fretted)
+    barred = [string for string, fret in enumerate(frets) if fret == lowest]
+
+    if len(barred) > 1 and 0 not in frets[barred[0]:barred[-1]]:
+        return len(fretted) - len(barred) + 1
+
+    return len(fretted)
+
+
+def _search(tuning, root, quality, span, fingers, frets, min_strings, max_inner_mutes):
+    strings = len(tuning)
+    root_bit = 1 << PITCH_CLASSES[root]
+    tones, required = _chord_masks(root, quality)
+    candidates = _string_candidates(tuple(tuning), tones, frets)
+    weights = SCORE_WEIGHTS
+
+    found = []
+
+    def visit(depth, voicing, covered, lowest, highest, distinct, sounding, open_strings, muted_below,
+              pending_mutes, inner_mutes):
+        if depth == strings:
+            if covered & required != required or sounding < min_strings:
+                return
+
+            needed = _fingers(voicing)
+            if needed > fingers:
+                return
+
+            fretted = sounding - open_strings
+            found.append(Voicing(voicing, root, quality, (
+                weights['span'] * (highest - lowest if fretted else 0) +
+                weights['fingers'] * needed +
+                weights['inner_mutes'] * inner_mutes +
+                weights['outer_mutes'] * (muted_below + pending_mutes) +
+                weights['position'] * highest +
+                weights['open_strings'] * open_strings +
+                weights['omitted'] * bin(tones & ~covered).count('1')
+            )))
+            return
+
+        remaining = strings - depth
+        # every required tone still missing needs a string of its own
+        if bin(required & ~covered).count('1') > remaining or sounding + remaining < min_strings:
+            return
+
+        # mute this string, the voicing is built up from the lowest string so it's prepended
+        if not sounding:
+            visit(depth + 1, (None,) + voicing, covered, lowest, highest, distinct, sounding, open_strings,
+                  muted_below + 1, 0, inner_mutes)
+        else:
+            visit(depth + 1, (None,) + voicing, covered, lowest, highest, distinct, sounding, open_strings,
+                  muted_below, pending_mutes + 1, inner_mutes)
+
+        # muted strings between sounding strings count once another string sounds
+        if inner_mutes + pending_mutes > max_inner_mutes:
+            return
+
+        for fret, bit in candidates[depth]:
+            # the lowest sounding string plays the root
+            if not sounding and bit != root_bit:
+                continue
+
+            if fret:
+                new_lowest = fret if fret < lowest else lowest
+                new_highest = fret if fret > highest else highest
+                if new_highest - new_lowest >= span:
+                    continue
+
+                new_distinct = distinct | 1 << fret
+                # each distinct fret needs a finger of its own
+                if new_distinct != distinct and bin(new_distinct).count('1') > fingers:
+                    continue
+
+                visit(depth + 1, (fret,) + voicing, covered | bit, new_lowest, new_highest, new_distinct,
+                      sounding + 1, open_strings, muted_below, 0, inner_mutes + pending_mutes)
+            else:
+                visit(depth + 1, (0,) + voicing, covered | bit, lowest, highest, distinct,
+                      sounding + 1, open_strings + 1, muted_below, 0, inner_mutes + pending_mutes)
+
+    visit(0, (), 0, frets, 0, 0, 0, 0, 0, 0, 0)
+
+    found.sort(key=lambda voicing: voicing.score)
+    return tuple(found)
+
+
+def chord_voicings(tuning, root, quality, span=4, fingers=4, frets=13, min_strings=3, max_inner_mutes=1):
+    """
+    Return the (memoized) playable voicings of a chord, easiest first. The lowest sounding note of
+    each voicing is the root.
+    :param tuning: list of open string note names, highest string first
+    :param root: root note name
+    :param quality: name of a chord in const.CHORDS
+    :param span: most frets a voicing's fretted notes can spread across
+    :param fingers: most fingers a voicing can need
+    :param frets: frets on the neck, counting the open strings as fret 0
+    :param min_strings: fewest strings a voicing sounds
+    :param max_inner_mutes: most muted strings between sounding strings
+    """
+    key = (tuple(tuning), root, quality, span, fingers, frets, min_strings, max_inner_mutes)
+
+    if key not in _voicings:
+        _voicings[key] = _search(*key)
+
+    return _voicings[key]
+
+
+def _cache_path(key):
+    digest = hashlib.sha1(repr((CACHE_VERSION, SCORE_WEIGHTS, const.CHORDS, key)).encode()).hexdigest()
+    return os.path.join(config.VOICING_CACHE_DIR, 'voicings-{}.pickle'.format(digest[:16]))
+
+
+def _write_cache(path, chords):
+    """Save searched voicings to the disk cache. Failing to is only logged, the voicings are still good."""
+    temporary_path = path + '.tmp'
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # written under a temporary name and then moved, so a reader never sees half a file
+        with open(temporary_path, 'wb') as cache_file:
+            pickle.dump(chords, cache_file, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+    except OSError:
+        logger.exception('could not write the chord voicing cache %s', path)
+
+        try:
+            os.remove(temporary_path)
+        except OSError:
+            pass
+
+
+def all_voicings(tuning, span=4, fingers=4, frets=13, min_strings=3, max_inner_mutes=1):
+    """
+    Voicings of every chord in every key, as {(root, quality): voicings}. Read from the disk cache in
+    config.VOICING_CACHE_DIR when it's there, otherwise searched for and then written to it.
+    """
+    params = (tuple(tuning), span, fingers, frets, min_strings, max_inner_mutes)
+    path = _cache_path(params) if config.VOICING_CACHE_DIR else None
+
+    chords = None
+    if path is not None:
+        try:
+            with open(path, 'rb') as cache_file:
+                chords = pickle.load(cache_file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            chords = None
+
+    if chords is None:
+        chords = {
+            (root, quality): chord_voicings(tuning, root, quality, *params[1:])
+            for root in const.NOTES
+            for quality in const.CHORDS
+        }
+
+        if path is not None:
+            _write_cache(path, chords)
+    else:
+        for (root, quality), voicings in chords.items():
+            _voicings[(tuple(tuning), root, quality) + params[1:]] = voicings
+
+    return chords